@@ -0,0 +1,54 @@
+"""
+Compare two run_benchmarks result files.
+
+    python -m benchmarks.compare before.json after.json
+
+Prints p50/p99 latency and throughput for every stage present in both runs
+with the relative change.
+"""
+import argparse
+import json
+from typing import Dict, Any, Tuple
+
+METRICS = ["p50_ms", "p99_ms", "throughput_per_s", "peak_memory_bytes"]
+PARAMS = ["gallery_size", "format", "index", "course_size", "db_latency_ms"]
+
+
+def result_key(result: Dict[str, Any]) -> Tuple:
+    return (result["stage"],) + tuple((param, result[param]) for param in PARAMS if param in result)
+
+
+def load_results(path: str) -> Dict[Tuple, Dict[str, Any]]:
+    with open(path) as f:
+        report = json.load(f)
+    return {result_key(result): result for result in report["results"] if "skipped" not in result}
+
+
+def change(before, after) -> str:
+    if before in (None, 0) or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    before = load_results(args.before)
+    after = load_results(args.after)
+
+    for key in sorted(set(before) & set(after), key=str):
+        label = key[0] + "".join(f" {param}={value}" for param, value in key[1:])
+        print(label)
+        for metric in METRICS:
+            old, new = before[key].get(metric), after[key].get(metric)
+            print(f"    {metric:<18} {old!s:>14} -> {new!s:<14} {change(old, new)}")
+
+    for key in sorted(set(before) ^ set(after), key=str):
+        print(f"{key[0]} {dict(key[1:])}: only in {'before' if key in before else 'after'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import copy
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Callable
+
+
+class FakeResult:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Chainable query mirroring the subset of the supabase-py builder the service uses"""
+
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.operation = "select"
+        self.payload: Any = None
+        self.order_by: Optional[str] = None
+        self.order_desc = False
+        self.limit_count: Optional[int] = None
+        self.offset = 0
+        self.count: Optional[str] = None
+
+    def select(self, *columns, **kwargs) -> "FakeQuery":
+        # Rows are returned whole; extra columns are harmless to the callers
+        self.operation = "select"
+        self.count = kwargs.get("count")
+        return self
+
+    def insert(self, data) -> "FakeQuery":
+        self.operation = "insert"
+        self.payload = data
+        return self
+
+    def upsert(self, data, **kwargs) -> "FakeQuery":
+        self.operation = "upsert"
+        self.payload = data
+        return self
+
+    def update(self, data) -> "FakeQuery":
+        self.operation = "update"
+        self.payload = data
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self.operation = "delete"
+        return self
+
+    def eq(self, column: str, value) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column: str, value) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gt(self, column: str, value) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def gte(self, column: str, value) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def lt(self, column: str, value) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def lte(self, column: str, value) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    def in_(self, column: str, values) -> "FakeQuery":
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "FakeQuery":
+        self.order_by = column
+        self.order_desc = desc
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self.limit_count = count
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.offset = start
+        self.limit_count = end - start + 1
+        return self
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(check(row) for check in self.filters)
+
+    def execute(self) -> FakeResult:
+        self.client.round_trips += 1
+        if self.client.latency:
+            time.sleep(self.client.latency)
+
+        rows = self.client.tables.setdefault(self.table, [])
+
+        if self.operation in ("insert", "upsert"):
+            new_rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            new_rows = [dict(row) for row in new_rows]
+            for row in new_rows:
+                row.setdefault("id", self.client.next_id())
+            rows.extend(new_rows)
+            return FakeResult(copy.deepcopy(new_rows))
+
+        if self.operation == "update":
+            updated = []
+            for row in rows:
+                if self._matches(row):
+                    row.update(self.payload)
+                    updated.append(dict(row))
+            return FakeResult(updated)
+
+        if self.operation == "delete":
+            kept = [row for row in rows if not self._matches(row)]
+            deleted = [row for row in rows if self._matches(row)]
+            rows[:] = kept
+            return FakeResult(deleted)
+
+        data = [row for row in rows if self._matches(row)]
+        count = len(data) if self.count else None
+        if self.order_by:
+            data.sort(key=lambda row: (row.get(self.order_by) is None, row.get(self.order_by)), reverse=self.order_desc)
+        data = data[self.offset:]
+        if self.limit_count is not None:
+            data = data[:self.limit_count]
+        return FakeResult([dict(row) for row in data], count)
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the Supabase client.
+
+    Tables are plain lists of row dictionaries. Every execute() counts as
+    one round trip and can sleep for ``latency`` seconds to model the
+    network cost of a real database call.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.round_trips = 0
+        self._next_id = 0
+
+    def next_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def seed_course(self, course_code: str, reg_numbers: List[str], names: Optional[List[str]] = None,
+                    now: Optional[datetime] = None) -> None:
+        """
+        Add a course running right now with the given students enrolled
+
+        Args:
+            course_code: Course code
+            reg_numbers: Enrolled students
+            names: Student names, parallel to reg_numbers
+            now: Time the course should be running at (default: now)
+        """
+        now = now or datetime.now()
+        start = max(now - timedelta(minutes=30), datetime.combine(now.date(), datetime.min.time()))
+        end = min(now + timedelta(hours=2), datetime.combine(now.date(), datetime.max.time()))
+
+        self.tables.setdefault("Courses", []).append({
+            "course_code": course_code,
+            "course_name": f"Benchmark course {course_code}",
+            "day_of_week": now.strftime("%A"),
+            "start_time": start.strftime("%H:%M:%S"),
+            "end_time": end.strftime("%H:%M:%S")
+        })
+        self.tables.setdefault("Enrollments", []).extend(
+            {"id": self.next_id(), "reg_number": reg_number, "course_code": course_code}
+            for reg_number in reg_numbers
+        )
+        profiles = self.tables.setdefault("Student profiles", [])
+        known = {profile["reg_number"] for profile in profiles}
+        for i, reg_number in enumerate(reg_numbers):
+            if reg_number not in known:
+                profiles.append({"reg_number": reg_number, "name": names[i] if names else reg_number})
+
+    def seed_attendance(self, course_code: str, reg_numbers: List[str], now: Optional[datetime] = None) -> None:
+        """Mark the given students present for the course today"""
+        timestamp = (now or datetime.now()).isoformat()
+        self.tables.setdefault("Attendance logs", []).extend(
+            {
+                "attendance_id": self.next_id(),
+                "reg_number": reg_number,
+                "course_code": course_code,
+                "timestamp": timestamp,
+                "method": "face_recognition",
+                "status": "present"
+            }
+            for reg_number in reg_numbers
+        )
+
+    def clear(self, table: str) -> None:
+        self.tables[table] = []
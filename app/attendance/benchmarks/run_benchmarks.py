@@ -0,0 +1,361 @@
+"""
+Attendance pipeline benchmarks.
+
+Runs each stage of face recognition against synthetic galleries and an
+in-memory Supabase stand-in, and writes per-stage latency percentiles,
+throughput and memory as JSON so runs can be compared between versions
+(see benchmarks/compare.py).
+
+Run from app/attendance:
+
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --frames recorded/ --stages decode,encode
+
+Stages:
+    decode       decode_base64_image on the frame set
+    encode       extract_face_embedding on the decoded frames
+    codec        decoding stored embeddings (legacy JSON and compact formats)
+                 into a gallery matrix, for each gallery size
+    load         FaceGallery.load for each gallery size
+    match        FaceGallery.match (the recognize_faces matching step) for each gallery size
+    eligibility  can_mark_attendance_for_course_batch for one frame of faces
+    log          log_attendance_batch for one frame of faces
+    pipeline     match_faces: matching, eligibility and logging together
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Optional
+
+import numpy as np
+
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.synthetic import (
+    synthetic_gallery,
+    synthetic_queries,
+    synthetic_locations,
+    load_frames,
+    synthetic_frames,
+    to_base64
+)
+
+STAGES = ["decode", "encode", "codec", "load", "match", "eligibility", "log", "pipeline"]
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+COURSE_CODE = "BENCH101"
+
+
+def summarize(times: List[float], items_per_call: int) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput (items/s) of timed calls"""
+    ms = np.asarray(times) * 1000
+    total = float(np.sum(times))
+    return {
+        "iterations": len(times),
+        "items_per_call": items_per_call,
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p90_ms": round(float(np.percentile(ms, 90)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "throughput_per_s": round(items_per_call * len(times) / total, 2) if total else None
+    }
+
+
+def measure(fn: Callable[[int], Any], iterations: int, items_per_call: int = 1,
+            setup: Optional[Callable[[int], Any]] = None, warmup: int = 1) -> Dict[str, Any]:
+    """
+    Time fn(i) for i in range(iterations), then measure one call's peak memory
+
+    setup(i), if given, runs before each call outside the timed region.
+    Memory is measured in a separate call under tracemalloc so tracing does
+    not inflate the timings.
+    """
+    for i in range(warmup):
+        if setup:
+            setup(i)
+        fn(i)
+
+    times = []
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        start = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - start)
+
+    if setup:
+        setup(0)
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    fn(0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = summarize(times, items_per_call)
+    result["peak_memory_bytes"] = peak - baseline
+    return result
+
+
+def install_fake_supabase(latency: float) -> FakeSupabase:
+    """Point db.supabase at an in-memory FakeSupabase"""
+    # create_client() runs at import time and only validates its arguments
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_KEY", "benchmark.benchmark.benchmark")
+    import db.supabase
+
+    fake = FakeSupabase(latency=latency)
+    db.supabase.supabase = fake
+    return fake
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+class Benchmarks:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.results: List[Dict[str, Any]] = []
+        self._frames: Optional[List[str]] = None
+        self._fake: Optional[FakeSupabase] = None
+
+    def record(self, stage: str, result: Dict[str, Any], **params) -> None:
+        entry = {"stage": stage, **params, **result}
+        self.results.append(entry)
+        print(
+            f"{stage:<12} {json.dumps(params):<28} p50={result.get('p50_ms')}ms "
+            f"p99={result.get('p99_ms')}ms throughput={result.get('throughput_per_s')}/s",
+            file=sys.stderr
+        )
+
+    def skip(self, stage: str, reason: str, **params) -> None:
+        self.results.append({"stage": stage, **params, "skipped": reason})
+        print(f"{stage:<12} skipped: {reason}", file=sys.stderr)
+
+    def frames(self) -> List[str]:
+        if self._frames is None:
+            if self.args.frames:
+                raw = load_frames(self.args.frames)
+            else:
+                raw = synthetic_frames(self.args.synthetic_frames, self.args.frame_width, self.args.frame_height)
+            self._frames = to_base64(raw)
+        return self._frames
+
+    def fake(self) -> FakeSupabase:
+        if self._fake is None:
+            self._fake = install_fake_supabase(self.args.db_latency_ms / 1000)
+        return self._fake
+
+    def course_students(self, size: int) -> List[str]:
+        """Enroll the first course_size students of a gallery of the given size"""
+        fake = self.fake()
+        fake.tables.clear()
+        reg_numbers = [f"BENCH/{i:06d}" for i in range(min(size, self.args.course_size))]
+        fake.seed_course(COURSE_CODE, reg_numbers)
+        return reg_numbers
+
+    def run_decode(self) -> None:
+        from services.face_service import decode_base64_image
+
+        frames = self.frames()
+        self.record("decode", measure(lambda i: decode_base64_image(frames[i % len(frames)]), self.args.iterations))
+
+    def run_encode(self) -> None:
+        from services.face_service import decode_base64_image, extract_face_embedding
+
+        images = [decode_base64_image(frame) for frame in self.frames()]
+        faces = [0]
+
+        def encode(i):
+            embeddings, _ = extract_face_embedding(images[i % len(images)])
+            faces[0] += len(embeddings)
+
+        iterations = min(self.args.iterations, max(len(images), self.args.encode_iterations))
+        result = measure(encode, iterations)
+        result["faces_per_frame"] = round(faces[0] / (iterations + 2), 2)
+        self.record("encode", result)
+
+    def run_codec(self) -> None:
+        from utils.embedding_codec import STORAGE_FORMATS, encode_embedding, decode_embeddings
+
+        for size in self.args.sizes:
+            records = synthetic_gallery(size)
+            matrix = np.empty((size, len(records[0]["embedding"])), dtype=np.float32)
+            for storage_format in STORAGE_FORMATS:
+                stored = [encode_embedding(record["embedding"], storage_format) for record in records]
+                result = measure(lambda i: decode_embeddings(stored, out=matrix),
+                                 self.args.load_iterations, items_per_call=size, warmup=0)
+                result["stored_bytes"] = sum(len(value) for value in stored)
+                self.record("codec", result, gallery_size=size, format=storage_format)
+
+    def run_load(self) -> None:
+        from services.face_gallery import FaceGallery
+
+        for size in self.args.sizes:
+            records = synthetic_gallery(size)
+
+            def load(i):
+                FaceGallery(index_type=self.args.index, index_path=None).load(records)
+
+            self.record("load", measure(load, self.args.load_iterations, items_per_call=size, warmup=0),
+                        gallery_size=size, index=self.args.index)
+
+    def run_match(self) -> None:
+        from services.face_gallery import FaceGallery
+
+        for size in self.args.sizes:
+            records = synthetic_gallery(size)
+            gallery = FaceGallery(index_type=self.args.index, index_path=None)
+            gallery.load(records)
+            queries = synthetic_queries(records, self.args.iterations, self.args.faces_per_frame)
+
+            result = measure(lambda i: gallery.match(queries[i % len(queries)]),
+                             self.args.iterations, items_per_call=self.args.faces_per_frame)
+            state = gallery._state
+            result["gallery_bytes"] = int(state.embeddings.nbytes + state.sq_norms.nbytes)
+            result["ann_index"] = gallery._ann is not None
+            self.record("match", result, gallery_size=size, index=self.args.index)
+
+    def run_eligibility(self) -> None:
+        from services.attendace_logic import can_mark_attendance_for_course_batch
+
+        fake = self.fake()
+        reg_numbers = self.course_students(self.args.course_size)
+        # Half the class is already marked, so both outcomes are exercised
+        fake.seed_attendance(COURSE_CODE, reg_numbers[::2])
+        frames = [
+            [reg_numbers[(i * self.args.faces_per_frame + j) % len(reg_numbers)] for j in range(self.args.faces_per_frame)]
+            for i in range(self.args.iterations)
+        ]
+
+        round_trips = fake.round_trips
+        result = measure(lambda i: can_mark_attendance_for_course_batch(frames[i % len(frames)], COURSE_CODE),
+                         self.args.iterations, items_per_call=self.args.faces_per_frame)
+        result["round_trips_per_call"] = round((fake.round_trips - round_trips) / (self.args.iterations + 2), 2)
+        self.record("eligibility", result, course_size=len(reg_numbers), db_latency_ms=self.args.db_latency_ms)
+
+    def run_log(self) -> None:
+        from db.supabase import log_attendance_batch
+
+        fake = self.fake()
+        reg_numbers = self.course_students(self.args.course_size)
+        entries = [
+            {"reg_number": reg_numbers[j % len(reg_numbers)], "name": "Student", "status": "present"}
+            for j in range(self.args.faces_per_frame)
+        ]
+
+        result = measure(
+            lambda i: log_attendance_batch(entries, method="face_recognition", location="bench",
+                                           course_code=COURSE_CODE, validate_course=False),
+            self.args.iterations,
+            items_per_call=len(entries),
+            setup=lambda i: fake.clear("Attendance logs")
+        )
+        self.record("log", result, db_latency_ms=self.args.db_latency_ms)
+
+    def run_pipeline(self) -> None:
+        from services.face_gallery import face_gallery, course_galleries
+        from services.face_service import match_faces
+
+        fake = self.fake()
+        size = self.args.pipeline_size
+        records = synthetic_gallery(size)
+        face_gallery.load(records)
+        course_galleries.invalidate()
+        reg_numbers = self.course_students(size)
+        # Query only enrolled students (plus strangers)
+        queries = synthetic_queries(records[:len(reg_numbers)], self.args.iterations, self.args.faces_per_frame)
+        locations = synthetic_locations(self.args.faces_per_frame)
+
+        round_trips = fake.round_trips
+        result = measure(
+            lambda i: match_faces(queries[i % len(queries)], locations, location="bench",
+                                  course_code=COURSE_CODE, threshold=self.args.threshold),
+            self.args.iterations,
+            items_per_call=self.args.faces_per_frame,
+            # Every frame starts with nobody marked so logging is always exercised
+            setup=lambda i: fake.clear("Attendance logs")
+        )
+        result["round_trips_per_call"] = round((fake.round_trips - round_trips) / (self.args.iterations + 2), 2)
+        self.record("pipeline", result, gallery_size=size, course_size=len(reg_numbers),
+                    db_latency_ms=self.args.db_latency_ms)
+
+    def run(self) -> Dict[str, Any]:
+        for stage in self.args.stages:
+            try:
+                getattr(self, f"run_{stage}")()
+            except ImportError as e:
+                self.skip(stage, f"missing dependency: {e}")
+
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "args": {key: value for key, value in vars(self.args).items() if key != "output"}
+            },
+            # ru_maxrss is in KiB on Linux
+            "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "results": self.results
+        }
+
+
+def csv_list(cast):
+    return lambda value: [cast(item) for item in value.split(",") if item]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the face recognition attendance pipeline")
+    parser.add_argument("--stages", type=csv_list(str), default=STAGES, help="Comma separated stages to run")
+    parser.add_argument("--sizes", type=csv_list(int), default=DEFAULT_SIZES, help="Gallery sizes for load/match")
+    parser.add_argument("--index", default="ivf", choices=["ivf", "exact"], help="Gallery index type")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per stage")
+    parser.add_argument("--load-iterations", type=int, default=3, help="Timed gallery loads per size")
+    parser.add_argument("--encode-iterations", type=int, default=20, help="Timed encodes (at least one per frame)")
+    parser.add_argument("--faces-per-frame", type=int, default=5)
+    parser.add_argument("--course-size", type=int, default=300, help="Students enrolled in the benchmark course")
+    parser.add_argument("--pipeline-size", type=int, default=1000, help="Gallery size for the pipeline stage")
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Simulated latency of each database call")
+    parser.add_argument("--frames", help="Directory of recorded JPEG/PNG frames (default: synthetic frames)")
+    parser.add_argument("--synthetic-frames", type=int, default=10)
+    parser.add_argument("--frame-width", type=int, default=1280)
+    parser.add_argument("--frame-height", type=int, default=720)
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = Benchmarks(args).run()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
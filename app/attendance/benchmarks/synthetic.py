@@ -0,0 +1,107 @@
+import base64
+import os
+from typing import List, Dict, Any, Tuple
+import numpy as np
+
+EMBEDDING_DIM = 128
+# Scale random directions so distances between different "people" are
+# around 0.85, similar to dlib face encodings
+EMBEDDING_NORM = 0.6
+FRAME_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def synthetic_embeddings(count: int, seed: int = 0) -> np.ndarray:
+    """(count, 128) float32 embeddings of distinct synthetic people"""
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(count, EMBEDDING_DIM)).astype(np.float32)
+    embeddings *= EMBEDDING_NORM / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+
+def synthetic_gallery(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Gallery records shaped like get_all_face_embeddings() output
+
+    Args:
+        size: Number of students
+        seed: Random seed
+
+    Returns:
+        List of dictionaries with reg_number, name and embedding
+    """
+    embeddings = synthetic_embeddings(size, seed)
+    return [
+        {"reg_number": f"BENCH/{i:06d}", "name": f"Student {i}", "embedding": embeddings[i]}
+        for i in range(size)
+    ]
+
+
+def synthetic_queries(gallery: List[Dict[str, Any]], frames: int, faces_per_frame: int,
+                      unknown_ratio: float = 0.2, noise: float = 0.3,
+                      seed: int = 1) -> List[List[List[float]]]:
+    """
+    Face embeddings for a sequence of frames
+
+    Known faces are gallery embeddings plus noise of norm ``noise`` (so they
+    match with similarity about 1 - noise); a share of ``unknown_ratio``
+    faces belong to nobody in the gallery.
+
+    Returns:
+        One list of embeddings per frame
+    """
+    rng = np.random.default_rng(seed)
+    strangers = synthetic_embeddings(frames * faces_per_frame, seed + 1)
+    result = []
+    for frame in range(frames):
+        embeddings = []
+        for face in range(faces_per_frame):
+            if rng.random() < unknown_ratio:
+                embeddings.append(strangers[frame * faces_per_frame + face].tolist())
+                continue
+            offset = rng.normal(size=EMBEDDING_DIM).astype(np.float32)
+            offset *= noise / np.linalg.norm(offset)
+            embeddings.append((gallery[rng.integers(len(gallery))]["embedding"] + offset).tolist())
+        result.append(embeddings)
+    return result
+
+
+def synthetic_locations(faces_per_frame: int) -> List[Tuple[int, int, int, int]]:
+    """Non-overlapping face boxes for a frame"""
+    return [(100, 160 + 120 * i, 220, 40 + 120 * i) for i in range(faces_per_frame)]
+
+
+def load_frames(directory: str) -> List[bytes]:
+    """Read a recorded frame set: every JPEG/PNG file in a directory, sorted by name"""
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(FRAME_EXTENSIONS):
+            with open(os.path.join(directory, name), "rb") as f:
+                frames.append(f.read())
+    if not frames:
+        raise ValueError(f"No {'/'.join(FRAME_EXTENSIONS)} frames found in {directory}")
+    return frames
+
+
+def synthetic_frames(count: int, width: int = 1280, height: int = 720, seed: int = 0) -> List[bytes]:
+    """
+    JPEG frames of random noise
+
+    These exercise decoding and detection cost at a given resolution but
+    contain no faces; use load_frames with recorded frames to measure
+    encoding.
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        image = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        ok, encoded = cv2.imencode(".jpg", image)
+        if not ok:
+            raise ValueError("Could not encode synthetic frame")
+        frames.append(encoded.tobytes())
+    return frames
+
+
+def to_base64(frames: List[bytes]) -> List[str]:
+    return [base64.b64encode(frame).decode("ascii") for frame in frames]
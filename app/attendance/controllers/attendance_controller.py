@@ -1,9 +1,11 @@
 from fastapi import HTTPException, status
-from services.face_service import register_face, recognize_faces
+from services.face_service import detection_options
+from services.recognition_executor import recognition_executor
 from services.attendace_logic import can_mark_attendance
+from services.cached_lookups import get_cached_student_profile
+from utils.registration_archive import registration_items
 from db.supabase import (
     log_attendance, 
-    get_student_profile, 
     get_student_attendance_report,
     get_course_attendance_report,
     get_attendance_today
@@ -32,6 +34,8 @@ async def handle_attendance_message(action: str, payload: dict):
         return await handle_face_recognition(payload)
     elif action == "registerFace":
         return await handle_face_registration(payload)
+    elif action == "registerFaces":
+        return await handle_bulk_face_registration(payload)
     elif action == "getTodayAttendance":
         return await handle_today_attendance(payload)
     elif action == "getStudentReport":
@@ -44,15 +48,18 @@ async def handle_attendance_message(action: str, payload: dict):
 # Handlers
 
 async def handle_manual_attendance(data):
-    student = get_student_profile(data["reg_number"])
+    # Database calls block, so they run in the executor's I/O threads and
+    # other consumer workers keep going meanwhile
+    student = await recognition_executor.run_io(get_cached_student_profile, data["reg_number"])
     if not student["success"]:
         raise HTTPException(status_code=404, detail=student["message"])
 
-    attendance_check = can_mark_attendance(data["reg_number"])
+    attendance_check = await recognition_executor.run_io(can_mark_attendance, data["reg_number"])
     if not attendance_check["can_mark"]:
         return AttendanceResponse(success=False, message=attendance_check["message"])
 
-    result = log_attendance(
+    result = await recognition_executor.run_io(
+        log_attendance,
         reg_number=data["reg_number"],
         method=AttendanceMethod.MANUAL,
         status=data["status"],
@@ -71,7 +78,11 @@ async def handle_manual_attendance(data):
 
 
 async def handle_face_recognition(data):
-    result = recognize_faces(data["image_base64"], data["location"])
+    result = await recognition_executor.recognize(
+        data["image_base64"],
+        data["location"],
+        detection=detection_options(data)
+    )
     attendance_results = [
         AttendanceResult(
             reg_number=ar["reg_number"],
@@ -93,7 +104,9 @@ async def handle_face_recognition(data):
 
 
 async def handle_face_registration(data):
-    result = register_face(data["reg_number"], data["image_base64"])
+    result = await recognition_executor.register(
+        data["reg_number"], data["image_base64"], replace=bool(data.get("replace", False))
+    )
 
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
@@ -101,12 +114,28 @@ async def handle_face_registration(data):
     return ApiResponse(success=True, message=result["message"])
 
 
+async def handle_bulk_face_registration(data):
+    items = registration_items(data.get("faces", []), data.get("archive_base64"))
+    if not items:
+        raise HTTPException(status_code=400, detail="No faces to register")
+
+    result = await recognition_executor.register_many(items)
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=result["message"])
+
+    return ApiResponse(
+        success=True,
+        message=result["message"],
+        data={key: result[key] for key in ("registered", "failed", "results")}
+    )
+
+
 async def handle_today_attendance(data):
-    student = get_student_profile(data["reg_number"])
+    student = await recognition_executor.run_io(get_cached_student_profile, data["reg_number"])
     if not student["success"]:
         raise HTTPException(status_code=404, detail=student["message"])
 
-    result = get_attendance_today(data["reg_number"])
+    result = await recognition_executor.run_io(get_attendance_today, data["reg_number"])
     if not result["success"]:
         raise HTTPException(status_code=500, detail=result["message"])
 
@@ -122,11 +151,12 @@ async def handle_student_report(data):
     if not reg_number:
         raise HTTPException(status_code=400, detail="Registration number is required")
 
-    student = get_student_profile(reg_number)
+    student = await recognition_executor.run_io(get_cached_student_profile, reg_number)
     if not student["success"]:
         raise HTTPException(status_code=404, detail=student["message"])
 
-    result = get_student_attendance_report(
+    result = await recognition_executor.run_io(
+        get_student_attendance_report,
         reg_number=reg_number,
         start_date=data["start_date"],
         end_date=data["end_date"]
@@ -172,7 +202,8 @@ async def handle_course_report(data):
             detail="Course code is required"
         )
 
-    result = get_course_attendance_report(
+    result = await recognition_executor.run_io(
+        get_course_attendance_report,
         course_code=course_code,
         date_value=date_value
     )
@@ -0,0 +1,57 @@
+from typing import Dict, Any
+from services.attendace_logic import invalidate_course_schedule
+from services.cached_lookups import student_profiles
+from services.face_gallery import face_gallery, course_galleries
+from services.face_service import sync_face_gallery
+from utils.embedding_codec import decode_embedding, decode_embedding_list
+
+
+def handle_cache_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply a cache invalidation event from another service instance
+
+    Events:
+        face_registered: reg_number, optional name, embedding (the centroid)
+            and samples (encoded with utils.embedding_codec). The face is
+            added to the gallery directly, or fetched by a gallery sync if
+            the event carries no embedding.
+        faces_registered: reg_numbers. Bulk registration; the gallery
+            fetches the new rows with an incremental sync.
+        course_updated: course_code. Drops the cached course schedule.
+        enrollment_changed: course_code, optional reg_number. Drops the
+            course's face gallery view.
+
+    Args:
+        event: Decoded event message
+
+    Returns:
+        Dictionary with operation result
+    """
+    kind = event.get("event")
+    changed_at = event.get("timestamp")
+
+    if kind == "face_registered":
+        reg_number = event["reg_number"]
+        if event.get("embedding"):
+            samples = decode_embedding_list(event["samples"]) if event.get("samples") else None
+            face_gallery.upsert(reg_number, decode_embedding(event["embedding"]), event.get("name"), samples)
+        else:
+            sync_face_gallery()
+        student_profiles.invalidate(reg_number, changed_at)
+        return {"success": True, "message": f"Updated face of {reg_number}"}
+
+    if kind == "faces_registered":
+        sync_face_gallery()
+        for reg_number in event["reg_numbers"]:
+            student_profiles.invalidate(reg_number, changed_at)
+        return {"success": True, "message": f"Synced {len(event['reg_numbers'])} registered faces"}
+
+    if kind == "course_updated":
+        invalidate_course_schedule(event["course_code"], changed_at)
+        return {"success": True, "message": f"Invalidated course {event['course_code']}"}
+
+    if kind == "enrollment_changed":
+        course_galleries.invalidate(event["course_code"])
+        return {"success": True, "message": f"Invalidated enrollments of course {event['course_code']}"}
+
+    return {"success": False, "message": f"Unknown cache event: {kind}"}
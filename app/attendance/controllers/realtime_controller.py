@@ -1,18 +1,30 @@
 from typing import Dict, Any, Optional
-from services.face_service import recognize_faces
+from services.face_service import detection_options
+from services.recognition_executor import recognition_executor
 
-async def process_frame(image_base64: str, threshold: float = 0.6,
+async def process_frame(image_base64: Optional[str] = None, threshold: float = 0.6,
                         location: Optional[str] = None,
-                        course_code: Optional[str] = None) -> Dict[str, Any]:
+                        course_code: Optional[str] = None,
+                        global_fallback: bool = False,
+                        image_bytes=None,
+                        detection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
-    Process a frame using the recognize_faces function
+    Process a frame using the recognition executor
+    
+    The frame is either a base64 string (image_base64) or raw JPEG/PNG
+    bytes (image_bytes). detection holds optional per-request detection
+    options (see detection_options).
     """
     try:
-        result = recognize_faces(
+        result = await recognition_executor.recognize(
             image_base64=image_base64,
             location=location,
             threshold=threshold,
-            course_code=course_code
+            course_code=course_code,
+            global_fallback=global_fallback,
+            image_bytes=image_bytes,
+            detection=detection,
+            wait=True  # RabbitMQ already holds the backlog, so queue instead of rejecting
         )
 
         return {
@@ -46,9 +58,12 @@ async def handle_realtime_message(action: str, data: dict) -> dict:
     if action == "faceRecognition":
         result =  await process_frame(
             image_base64=data.get("image_base64"),
+            image_bytes=data.get("image_bytes"),
             threshold=float(data.get("threshold", 0.6)),
             location=data.get("location"),
-            course_code=data.get("course_code")
+            course_code=data.get("course_code"),
+            global_fallback=bool(data.get("global_fallback", False)),
+            detection=detection_options(data)
         )
         print(f"[Realtime Controller] Face recognition result: {result}")
         return result
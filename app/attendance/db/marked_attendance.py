@@ -0,0 +1,90 @@
+import threading
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+class MarkedAttendance:
+    """
+    In-memory record of who has attendance logged today, per course.
+
+    A course is seeded from the database once per day (seed) and then kept
+    current by mark() on every successful attendance insert, so repeat
+    "already marked?" checks are dictionary lookups. Everything is dropped
+    when the date changes. The database stays the source of truth: after a
+    restart courses are simply seeded again.
+    """
+
+    def __init__(self, today: Callable[[], date] = date.today):
+        self._today = today
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        # course_code -> reg_number -> timestamp of the latest log today
+        self._marked: Dict[str, Dict[str, str]] = {}
+        self._seeded = set()
+
+    def _rollover(self) -> None:
+        """Start a new day if the date changed (lock must be held)"""
+        day = self._today()
+        if day != self._day:
+            self._day = day
+            self._marked.clear()
+            self._seeded.clear()
+
+    def is_seeded(self, course_code: str) -> bool:
+        with self._lock:
+            self._rollover()
+            return course_code in self._seeded
+
+    def seed(self, course_code: str, records: Iterable[Tuple[str, str]]) -> None:
+        """
+        Load today's attendance for a course from the database
+
+        Args:
+            course_code: Course code
+            records: (reg_number, timestamp) pairs, newest first
+        """
+        with self._lock:
+            self._rollover()
+            marked = self._marked.setdefault(course_code, {})
+            for reg_number, timestamp in records:
+                if reg_number not in marked or timestamp > marked[reg_number]:
+                    marked[reg_number] = timestamp
+            self._seeded.add(course_code)
+
+    def mark(self, course_code: str, reg_number: str, timestamp: str) -> None:
+        """Record a successful attendance insert"""
+        with self._lock:
+            self._rollover()
+            # Kept even before the course is seeded, so an insert racing the
+            # seed query is not lost
+            self._marked.setdefault(course_code, {})[reg_number] = timestamp
+
+    def last_marked(self, course_code: str, reg_number: str) -> Optional[str]:
+        """Timestamp of the student's latest log for the course today, or None"""
+        with self._lock:
+            self._rollover()
+            return self._marked.get(course_code, {}).get(reg_number)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._rollover()
+            return {
+                "day": self._day.isoformat(),
+                "courses": len(self._marked),
+                "seeded_courses": len(self._seeded),
+                "students": sum(len(marked) for marked in self._marked.values())
+            }
+
+    def invalidate(self, course_code: Optional[str] = None) -> None:
+        """Forget a course (or all courses) so it is seeded again"""
+        with self._lock:
+            if course_code is None:
+                self._marked.clear()
+                self._seeded.clear()
+            else:
+                self._marked.pop(course_code, None)
+                self._seeded.discard(course_code)
+
+
+# Shared by every attendance path in this process
+marked_today = MarkedAttendance()
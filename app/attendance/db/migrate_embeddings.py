@@ -0,0 +1,32 @@
+"""
+Re-encode Face_embeddings rows in a compact storage format.
+
+Run from app/attendance:
+
+    python -m db.migrate_embeddings                  # EMBEDDING_STORAGE_FORMAT
+    python -m db.migrate_embeddings --format int8
+
+Legacy JSON rows stay readable without migrating, so this can run while
+the service is up.
+"""
+import argparse
+
+from config import EMBEDDING_STORAGE_FORMAT
+from db.supabase import migrate_face_embeddings
+from utils.embedding_codec import STORAGE_FORMATS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-encode stored face embeddings")
+    parser.add_argument("--format", default=EMBEDDING_STORAGE_FORMAT, choices=STORAGE_FORMATS)
+    args = parser.parse_args()
+
+    result = migrate_face_embeddings(args.format)
+    if result["success"]:
+        print(f"Migrated {result['migrated']} face embeddings to {args.format} ({result['skipped']} already up to date)")
+    else:
+        print(f"Migration failed: {result['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,28 @@ from supabase import create_client
 from datetime import datetime, date, timedelta, time
 import os
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
+import numpy as np
 from dotenv import load_dotenv
+from config import (
+    EMBEDDING_STORAGE_FORMAT,
+    FACE_EMBEDDING_PAGE_SIZE,
+    REPORT_PAGE_SIZE,
+    REPORT_IN_CHUNK_SIZE,
+    BULK_REGISTRATION_BATCH_SIZE,
+    FACE_MAX_SAMPLES
+)
+from db.marked_attendance import marked_today
+from utils.embedding_codec import (
+    EMBEDDING_DIM,
+    encode_embedding,
+    encode_embedding_list,
+    decode_embedding,
+    decode_embedding_into,
+    decode_embedding_list,
+    storage_format_of,
+    storage_formats_of_list
+)
 # from decouple import config
 
 
@@ -38,6 +58,31 @@ def get_student_profile(reg_number: str) -> Dict[str, Any]:
         print(f"Error getting student profile: {e}")
         return {"success": False, "message": str(e)}
 
+def get_student_profiles(reg_numbers: List[str], chunk_size: int = REPORT_IN_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Get the profiles of many students
+    
+    Args:
+        reg_numbers: Student registration numbers
+        chunk_size: reg_numbers per in_() filter
+        
+    Returns:
+        Dictionary with data mapping each reg_number found to its profile
+    """
+    try:
+        profiles = {}
+        unique = list(dict.fromkeys(reg_numbers))
+        for i in range(0, len(unique), chunk_size):
+            result = supabase.table("Student profiles") \
+                .select("*") \
+                .in_("reg_number", unique[i:i + chunk_size]) \
+                .execute()
+            profiles.update((profile["reg_number"], profile) for profile in result.data)
+        return {"success": True, "data": profiles}
+    except Exception as e:
+        print(f"Error getting student profiles: {e}")
+        return {"success": False, "message": str(e)}
+
 def get_student_courses(reg_number: str) -> Dict[str, Any]:
     """
     Get all courses a student is enrolled in
@@ -60,42 +105,143 @@ def get_student_courses(reg_number: str) -> Dict[str, Any]:
         print(f"Error getting student courses: {e}")
         return {"success": False, "message": str(e)}
 
-def save_face_embedding(reg_number: str, embedding: List[float], name: str = None) -> Dict[str, Any]:
+def get_course_enrollments(course_code: str) -> Dict[str, Any]:
+    """
+    Get the registration numbers of all students enrolled in a course
+    
+    Args:
+        course_code: The course code
+        
+    Returns:
+        Dictionary with list of reg_numbers
+    """
+    try:
+        result = supabase.table("Enrollments") \
+                 .select("reg_number") \
+                 .eq("course_code", course_code) \
+                 .execute()
+        
+        return {"success": True, "data": [enrollment["reg_number"] for enrollment in result.data]}
+    except Exception as e:
+        print(f"Error getting course enrollments: {e}")
+        return {"success": False, "message": str(e)}
+
+def _stored_samples(record: Optional[Dict[str, Any]]) -> np.ndarray:
+    """Samples of a Face_embeddings row; a row from before samples counts as one"""
+    if not record:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    if record.get('face_samples'):
+        return decode_embedding_list(record['face_samples'])
+    if record.get('face_embedding'):
+        return decode_embedding(record['face_embedding']).reshape(1, EMBEDDING_DIM)
+    return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+def _face_embedding_row(reg_number: str, samples: np.ndarray) -> Dict[str, Any]:
+    """Face_embeddings row holding the samples and their centroid"""
+    return {
+        'reg_number': reg_number,
+        'face_embedding': encode_embedding(samples.mean(axis=0), EMBEDDING_STORAGE_FORMAT),
+        'face_samples': encode_embedding_list(samples, EMBEDDING_STORAGE_FORMAT)
+    }
+
+def _add_sample(record: Optional[Dict[str, Any]], embedding: List[float],
+                max_samples: int, replace: bool) -> np.ndarray:
+    """The samples of a row after registering one photo's embedding, or a list of them (oldest dropped first)"""
+    new = np.asarray(embedding, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+    if replace:
+        return new
+    return np.concatenate([_stored_samples(record), new])[-max(1, max_samples):]
+
+def save_face_embedding(reg_number: str, embedding: List[float], name: str = None,
+                        replace: bool = False, max_samples: int = FACE_MAX_SAMPLES) -> Dict[str, Any]:
     """
     Save a face embedding to the database
     
+    The embedding is added to the student's samples (keeping the newest
+    max_samples) and the stored face_embedding becomes their centroid.
+    
     Args:
         reg_number: The student registration number
         embedding: The face embedding as a list of floats
         name: Optional student name
+        replace: Drop the student's previous samples
+        max_samples: Samples kept per student
         
     Returns:
-        Dictionary with operation result
+        Dictionary with operation result, plus the new centroid ("embedding")
+        and samples on success
     """
     try:
         # Check if student already has an embedding
         result = supabase.table('Face_embeddings').select('*').eq('reg_number', reg_number).execute()
         
-        # Convert the embedding list to a JSON string
-        embedding_json = json.dumps(embedding)
-        
-        data = {
-            'reg_number': reg_number,
-            'face_embedding': embedding_json
-        }
+        samples = _add_sample(result.data[0] if result.data else None, embedding, max_samples, replace)
+        data = _face_embedding_row(reg_number, samples)
             
         if result.data:
             # Update existing record
             update_result = supabase.table('Face_embeddings').update(data).eq('reg_number', reg_number).execute()
-            return {"success": True, "message": "Face embedding updated"}
+            message = "Face embedding updated"
         else:
             # Insert new record
             insert_result = supabase.table('Face_embeddings').insert(data).execute()
-            return {"success": True, "message": "Face embedding saved"}
+            message = "Face embedding saved"
+        return {"success": True, "message": message, "embedding": samples.mean(axis=0), "samples": samples}
     except Exception as e:
         print(f"Error saving face embedding: {e}")
         return {"success": False, "message": str(e)}
 
+def save_face_embeddings(entries: List[Dict[str, Any]],
+                         batch_size: int = BULK_REGISTRATION_BATCH_SIZE,
+                         max_samples: int = FACE_MAX_SAMPLES) -> Dict[str, Dict[str, Any]]:
+    """
+    Add many face embeddings, batch_size students per request
+    
+    Each batch reads the students' stored samples with one query and writes
+    the updated rows with one upsert, which needs the unique index on
+    Face_embeddings.reg_number (migration 003).
+    
+    Args:
+        entries: Dictionaries with reg_number and embeddings, the list of
+            new photos' embeddings (one entry per student)
+        batch_size: Students per request
+        max_samples: Samples kept per student
+        
+    Returns:
+        Dictionary mapping each reg_number to its operation result, with
+        the new centroid ("embedding") and samples on success
+    """
+    results = {}
+    for i in range(0, len(entries), batch_size):
+        batch = entries[i:i + batch_size]
+        try:
+            stored = supabase.table('Face_embeddings') \
+                .select('reg_number, face_embedding, face_samples') \
+                .in_('reg_number', [entry['reg_number'] for entry in batch]) \
+                .execute()
+            records = {record['reg_number']: record for record in stored.data}
+            
+            samples = {
+                entry['reg_number']: _add_sample(records.get(entry['reg_number']), entry['embeddings'], max_samples, False)
+                for entry in batch
+            }
+            supabase.table('Face_embeddings') \
+                .upsert([_face_embedding_row(reg_number, rows) for reg_number, rows in samples.items()],
+                        on_conflict='reg_number') \
+                .execute()
+            for reg_number, rows in samples.items():
+                results[reg_number] = {
+                    "success": True,
+                    "message": "Face embedding saved",
+                    "embedding": rows.mean(axis=0),
+                    "samples": rows
+                }
+        except Exception as e:
+            print(f"Error saving face embeddings: {e}")
+            for entry in batch:
+                results[entry['reg_number']] = {"success": False, "message": str(e)}
+    return results
+
 def get_all_face_embeddings() -> List[Dict[str, Any]]:
     """
     Get all face embeddings from the database
@@ -110,7 +256,7 @@ def get_all_face_embeddings() -> List[Dict[str, Any]]:
             .execute()
         
         processed_records = []
-        # Parse the face_embedding JSON string back to a list
+        # Decode the stored face_embedding (compact or legacy JSON)
         for record in result.data:
             if 'face_embedding' in record:
                 # Access the name from the nested "Student profiles" object
@@ -120,7 +266,7 @@ def get_all_face_embeddings() -> List[Dict[str, Any]]:
                 processed_record = {
                     'reg_number': record['reg_number'],
                     'name': student_name,
-                    'embedding': json.loads(record['face_embedding'])
+                    'embedding': decode_embedding(record['face_embedding'])
                 }
                 processed_records.append(processed_record)
                 
@@ -128,6 +274,143 @@ def get_all_face_embeddings() -> List[Dict[str, Any]]:
     except Exception as e:
         print(f"Error getting face embeddings: {e}")
         return []
+
+def get_face_embedding_matrix(page_size: int = FACE_EMBEDDING_PAGE_SIZE,
+                              since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get face embeddings decoded straight into one float32 matrix
+    
+    Rows are fetched a page at a time and decoded into a matrix allocated
+    up front from the row count, so no per-face Python lists are built.
+    
+    Args:
+        page_size: Rows fetched per request
+        since: Only fetch rows whose updated_at is at or after this timestamp
+        
+    Returns:
+        Dictionary with reg_numbers, names, an (N, 128) float32 embeddings
+        matrix (centroids), the (S, 128) samples behind them in row order
+        with the per-row sample_counts, and stamp, the newest updated_at
+        seen (or since when no rows were returned)
+    """
+    try:
+        embeddings = None
+        reg_numbers = []
+        names = []
+        stamp = since
+        samples = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        sample_counts = []
+        sample_total = 0
+        
+        offset = 0
+        while True:
+            query = supabase.table('Face_embeddings') \
+                .select('reg_number, face_embedding, face_samples, updated_at, "Student profiles"(name)', count='exact')
+            if since:
+                query = query.gte('updated_at', since)
+            result = query \
+                .order('reg_number') \
+                .range(offset, offset + page_size - 1) \
+                .execute()
+            
+            if embeddings is None:
+                embeddings = np.empty((result.count or len(result.data), EMBEDDING_DIM), dtype=np.float32)
+            
+            for record in result.data:
+                if not record.get('face_embedding'):
+                    continue
+                row = len(reg_numbers)
+                if row >= len(embeddings):
+                    # Rows were added while paging
+                    embeddings = np.resize(embeddings, (max(2 * len(embeddings), row + 1), EMBEDDING_DIM))
+                decode_embedding_into(record['face_embedding'], embeddings[row])
+                
+                row_samples = decode_embedding_list(record.get('face_samples'))
+                if sample_total + len(row_samples) > len(samples):
+                    samples = np.resize(samples, (max(2 * len(samples), sample_total + len(row_samples), 1024), EMBEDDING_DIM))
+                samples[sample_total:sample_total + len(row_samples)] = row_samples
+                sample_total += len(row_samples)
+                sample_counts.append(len(row_samples))
+                
+                student_profile = record.get('Student profiles', {})
+                reg_numbers.append(record['reg_number'])
+                names.append(student_profile.get('name', 'Unknown') if student_profile else 'Unknown')
+                if record.get('updated_at') and (stamp is None or record['updated_at'] > stamp):
+                    stamp = record['updated_at']
+            
+            if len(result.data) < page_size:
+                break
+            offset += page_size
+        
+        return {
+            "success": True,
+            "reg_numbers": reg_numbers,
+            "names": names,
+            "embeddings": embeddings[:len(reg_numbers)],
+            "samples": samples[:sample_total],
+            "sample_counts": np.asarray(sample_counts, dtype=np.int64),
+            "stamp": stamp
+        }
+    except Exception as e:
+        print(f"Error getting face embedding matrix: {e}")
+        return {"success": False, "message": str(e)}
+
+def migrate_face_embeddings(storage_format: str = EMBEDDING_STORAGE_FORMAT,
+                            page_size: int = FACE_EMBEDDING_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Re-encode stored face embeddings in the given storage format
+    
+    Both the centroid (face_embedding) and the samples (face_samples) are
+    re-encoded. Rows whose columns are already in the target format are
+    left alone, so the migration can be re-run safely.
+    
+    Args:
+        storage_format: Target format (see utils.embedding_codec)
+        page_size: Rows fetched per request
+        
+    Returns:
+        Dictionary with the number of rows migrated and skipped
+    """
+    try:
+        migrated = 0
+        skipped = 0
+        
+        offset = 0
+        while True:
+            result = supabase.table('Face_embeddings') \
+                .select('reg_number, face_embedding, face_samples') \
+                .order('reg_number') \
+                .range(offset, offset + page_size - 1) \
+                .execute()
+            
+            for record in result.data:
+                stored = record.get('face_embedding')
+                stored_samples = record.get('face_samples')
+                changes = {}
+                if stored and storage_format_of(stored) != storage_format:
+                    changes['face_embedding'] = encode_embedding(decode_embedding(stored), storage_format)
+                if storage_formats_of_list(stored_samples) - {storage_format}:
+                    changes['face_samples'] = encode_embedding_list(
+                        decode_embedding_list(stored_samples), storage_format
+                    )
+                if not changes:
+                    skipped += 1
+                    continue
+                
+                supabase.table('Face_embeddings') \
+                    .update(changes) \
+                    .eq('reg_number', record['reg_number']) \
+                    .execute()
+                migrated += 1
+            
+            if len(result.data) < page_size:
+                break
+            offset += page_size
+        
+        return {"success": True, "migrated": migrated, "skipped": skipped}
+    except Exception as e:
+        print(f"Error migrating face embeddings: {e}")
+        return {"success": False, "message": str(e)}
     
 
 def log_attendance(
@@ -181,6 +464,9 @@ def log_attendance(
         
         if not result.data:
             return {"success": False, "message": "Failed to log attendance"}
+        
+        if course_code:
+            marked_today.mark(course_code, reg_number, result.data[0].get("timestamp", timestamp))
             
         return {
             "success": True,
@@ -191,6 +477,77 @@ def log_attendance(
     except Exception as e:
         print(f"Error logging attendance: {e}")
         return {"success": False, "message": str(e)}
+
+def log_attendance_batch(
+    entries: List[Dict[str, str]],
+    method: str = "face_recognition",
+    location: str = None,
+    course_code: str = None,
+    validate_course: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Log attendance for many students with a single insert
+    
+    Args:
+        entries: List of dictionaries with reg_number and status
+        method: Method of attendance recording
+        location: Optional location information
+        course_code: Optional course code
+        validate_course: Check that the course exists first. Callers that
+            have just looked the course up can skip this query.
+        
+    Returns:
+        Dictionary mapping each reg_number to the same result structure as log_attendance
+    """
+    if not entries:
+        return {}
+    
+    try:
+        if course_code and validate_course:
+            course_check = supabase.table("Courses").select("course_code").eq("course_code", course_code).execute()
+            if not course_check.data:
+                failure = {
+                    "success": False,
+                    "message": f"Course with code '{course_code}' does not exist."
+                }
+                return {entry["reg_number"]: dict(failure) for entry in entries}
+        
+        timestamp = datetime.now().isoformat()
+        rows = []
+        for entry in entries:
+            data = {
+                "reg_number": entry["reg_number"],
+                "timestamp": timestamp,
+                "method": method,
+                "status": entry["status"]
+            }
+            if location:
+                data["location"] = location
+            if course_code:
+                data["course_code"] = course_code
+            rows.append(data)
+        
+        result = supabase.table("Attendance logs").insert(rows).execute()
+        
+        inserted = {row["reg_number"]: row for row in (result.data or [])}
+        results = {}
+        for entry in entries:
+            row = inserted.get(entry["reg_number"])
+            if row is None:
+                results[entry["reg_number"]] = {"success": False, "message": "Failed to log attendance"}
+            else:
+                if course_code:
+                    marked_today.mark(course_code, entry["reg_number"], row.get("timestamp", timestamp))
+                results[entry["reg_number"]] = {
+                    "success": True,
+                    "message": f"Attendance marked as {entry['status']}",
+                    "data": row
+                }
+        return results
+    
+    except Exception as e:
+        print(f"Error logging attendance batch: {e}")
+        return {entry["reg_number"]: {"success": False, "message": str(e)} for entry in entries}
     
 def get_attendance_today(reg_number: str) -> Dict[str, Any]:
     """
@@ -244,6 +601,36 @@ def get_student_course_attendance_today(reg_number: str, course_code: str) -> Di
         print(f"Error getting student course attendance: {e}")
         return {"success": False, "message": str(e), "data": None}
 
+def get_course_attendance_today(course_code: str, reg_numbers: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Get today's attendance records for a course, optionally limited to some students
+    
+    Args:
+        course_code: Course code
+        reg_numbers: Optional list of student registration numbers
+    
+    Returns:
+        Dictionary with attendance records, newest first
+    """
+    try:
+        today = datetime.now().date().isoformat()
+        
+        query = supabase.table("Attendance logs") \
+                .select("*") \
+                .eq("course_code", course_code) \
+                .gte("timestamp", f"{today}T00:00:00") \
+                .lte("timestamp", f"{today}T23:59:59")
+        if reg_numbers is not None:
+            if not reg_numbers:
+                return {"success": True, "data": []}
+            query = query.in_("reg_number", list(set(reg_numbers)))
+            
+        result = query.order("timestamp", desc=True).execute()
+        return {"success": True, "data": result.data}
+    except Exception as e:
+        print(f"Error getting course attendance: {e}")
+        return {"success": False, "message": str(e), "data": None}
+
 def get_course_details(course_code: str) -> Dict[str, Any]:
     """
     Get details for a specific course
@@ -268,6 +655,93 @@ def get_course_details(course_code: str) -> Dict[str, Any]:
         print(f"Error getting course details: {e}")
         return {"success": False, "message": str(e), "data": None}
 
+def _report_range(start_date: Optional[date], end_date: Optional[date]) -> tuple:
+    """Timestamp bounds of a student report (default: the last 30 days)"""
+    if not start_date:
+        start_date = datetime.now().date() - timedelta(days=30)
+    if not end_date:
+        end_date = datetime.now().date()
+    return start_date.isoformat(), end_date.isoformat() + "T23:59:59"
+
+def _chunks(items: List[str], size: int) -> Iterator[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def iter_attendance_log_pages(start_timestamp: str, end_timestamp: str,
+                              reg_numbers: Optional[List[str]] = None,
+                              columns: str = "*",
+                              page_size: int = REPORT_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Page through attendance logs in timestamp order with keyset pagination
+    
+    Each page starts after the last timestamp of the previous one instead of
+    at an offset, so deep pages cost the same as the first. Rows sharing the
+    timestamp at a page boundary (batch logs share one) are fetched
+    separately, ordered by attendance_id, so none are skipped or repeated.
+    
+    Args:
+        start_timestamp: Earliest timestamp (inclusive)
+        end_timestamp: Latest timestamp (inclusive)
+        reg_numbers: Only logs of these students (keep it to one in_() chunk)
+        columns: Columns to select
+        page_size: Rows fetched per request, at most the server's max rows
+            since a short page ends the iteration
+        
+    Yields:
+        Lists of attendance log rows
+    """
+    def query():
+        q = supabase.table("Attendance logs").select(columns).lte("timestamp", end_timestamp)
+        if reg_numbers is not None:
+            q = q.in_("reg_number", reg_numbers)
+        return q
+    
+    cursor = None
+    while True:
+        q = query()
+        q = q.gte("timestamp", start_timestamp) if cursor is None else q.gt("timestamp", cursor)
+        rows = q.order("timestamp").limit(page_size).execute().data
+        if len(rows) < page_size:
+            if rows:
+                yield rows
+            return
+        
+        # Hold back the last timestamp and fetch all of its rows, paging
+        # through them too since the server caps rows per request
+        cursor = rows[-1]["timestamp"]
+        page = [row for row in rows if row["timestamp"] != cursor]
+        offset = 0
+        while True:
+            tied = query().eq("timestamp", cursor).order("attendance_id") \
+                .range(offset, offset + page_size - 1).execute().data
+            page.extend(tied)
+            if page:
+                yield page
+            if len(tied) < page_size:
+                break
+            page = []
+            offset += page_size
+
+def iter_student_attendance_report(reg_number: str,
+                                   start_date: Optional[date] = None,
+                                   end_date: Optional[date] = None,
+                                   page_size: int = REPORT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a student's attendance logs within a date range, oldest first
+    
+    Args:
+        reg_number: The student registration number
+        start_date: Start date for the report (default: 30 days ago)
+        end_date: End date for the report (default: today)
+        page_size: Rows fetched per request
+        
+    Yields:
+        Attendance log rows
+    """
+    start_timestamp, end_timestamp = _report_range(start_date, end_date)
+    for page in iter_attendance_log_pages(start_timestamp, end_timestamp, [reg_number], page_size=page_size):
+        yield from page
+
 def get_student_attendance_report(reg_number: str, 
                                  start_date: Optional[date] = None, 
                                  end_date: Optional[date] = None) -> Dict[str, Any]:
@@ -283,24 +757,7 @@ def get_student_attendance_report(reg_number: str,
         Dictionary with attendance data
     """
     try:
-        if not start_date:
-            start_date = (datetime.now().date() - timedelta(days=30)).isoformat()
-        else:
-            start_date = start_date.isoformat()
-            
-        if not end_date:
-            end_date = datetime.now().date().isoformat()
-        else:
-            end_date = end_date.isoformat()
-        
-        result = supabase.table("Attendance logs") \
-                .select("*") \
-                .eq("reg_number", reg_number) \
-                .gte("timestamp", start_date) \
-                .lte("timestamp", end_date + "T23:59:59") \
-                .execute()
-                
-        return {"success": True, "data": result.data}
+        return {"success": True, "data": list(iter_student_attendance_report(reg_number, start_date, end_date))}
     except Exception as e:
         print(f"Error getting attendance report: {e}")
         return {"success": False, "message": str(e)}
@@ -352,6 +809,80 @@ def get_student_attendance_report(reg_number: str,
 
 
 
+def get_enrolled_reg_numbers(course_code: str, page_size: int = REPORT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Get the registration numbers of every student enrolled in a course
+    
+    Args:
+        course_code: The course code
+        page_size: Rows fetched per request
+        
+    Returns:
+        Dictionary with success flag and the list of reg_numbers
+    """
+    try:
+        reg_numbers = []
+        offset = 0
+        while True:
+            result = supabase.table("Enrollments") \
+                .select("reg_number") \
+                .eq("course_code", course_code) \
+                .order("reg_number") \
+                .range(offset, offset + page_size - 1) \
+                .execute()
+            reg_numbers.extend(enrollment["reg_number"] for enrollment in result.data)
+            if len(result.data) < page_size:
+                break
+            offset += page_size
+        
+        if not reg_numbers:
+            return {"success": False, "message": "No students enrolled in this course"}
+        return {"success": True, "data": reg_numbers}
+    except Exception as e:
+        print(f"Error getting course enrollments: {e}")
+        return {"success": False, "message": str(e)}
+
+def iter_course_attendance_report(reg_numbers: List[str], date_value: Optional[date] = None,
+                                  page_size: int = REPORT_PAGE_SIZE,
+                                  chunk_size: int = REPORT_IN_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a course's attendance logs for a date, with student names
+    
+    Students are queried chunk_size at a time so no in_() filter grows with
+    the course; rows are in timestamp order within each chunk.
+    
+    Args:
+        reg_numbers: Students enrolled in the course (see get_enrolled_reg_numbers)
+        date_value: The date for the report (default: today)
+        page_size: Rows fetched per request
+        chunk_size: reg_numbers per in_() filter
+        
+    Yields:
+        Attendance log rows with a "name" field
+    """
+    if not date_value:
+        date_value = datetime.now().date()
+    start_datetime = datetime.combine(date_value, time.min).isoformat()
+    end_datetime = datetime.combine(date_value, time.max).isoformat()
+    
+    for chunk in _chunks(reg_numbers, chunk_size):
+        reg_to_name = None
+        for page in iter_attendance_log_pages(
+            start_datetime, end_datetime, chunk,
+            columns="attendance_id, reg_number, timestamp, method, status, location",
+            page_size=page_size
+        ):
+            if reg_to_name is None:
+                # Only look up names for chunks that have attendance
+                student_profiles = supabase.table("Student profiles") \
+                    .select("reg_number, name") \
+                    .in_("reg_number", chunk) \
+                    .execute()
+                reg_to_name = {student["reg_number"]: student["name"] for student in student_profiles.data}
+            for record in page:
+                record["name"] = reg_to_name.get(record["reg_number"], "Unknown")
+                yield record
+
 def get_course_attendance_report(course_code: str, date_value: Optional[date] = None) -> Dict[str, Any]:
     """
     Get attendance report for a specific course on a specific date
@@ -364,50 +895,113 @@ def get_course_attendance_report(course_code: str, date_value: Optional[date] =
         Dictionary with attendance data
     """
     try:
-        # Use today's date if none is provided
-        if not date_value:
-            date_value = datetime.now().date()
-
-        # Create full-day datetime range for the given date
-        start_datetime = datetime.combine(date_value, time.min).isoformat()
-        end_datetime = datetime.combine(date_value, time.max).isoformat()
-
-        # Step 1: Get all students enrolled in the course
-        enrollments = supabase.table("Enrollments") \
-            .select("reg_number") \
-            .eq("course_code", course_code) \
-            .execute()
-
-        if not enrollments.data:
-            return {"success": False, "message": "No students enrolled in this course"}
-
-        # Extract reg_numbers of enrolled students
-        reg_numbers = [en["reg_number"] for en in enrollments.data]
+        enrollments = get_enrolled_reg_numbers(course_code)
+        if not enrollments["success"]:
+            return enrollments
 
-        # Step 2: Get attendance records for those students on the given date
-        attendance_records = supabase.table("Attendance logs") \
-            .select("attendance_id, reg_number, timestamp, method, status, location") \
-            .in_("reg_number", reg_numbers) \
-            .gte("timestamp", start_datetime) \
-            .lte("timestamp", end_datetime) \
-            .execute()
-
-        # Step 3: Get student names from the Student profiles table
-        student_profiles = supabase.table("Student profiles") \
-            .select("reg_number, name") \
-            .in_("reg_number", reg_numbers) \
-            .execute()
+        return {"success": True, "data": list(iter_course_attendance_report(enrollments["data"], date_value))}
 
-        # Build mapping from reg_number to student name
-        reg_to_name = {student["reg_number"]: student["name"] for student in student_profiles.data}
+    except Exception as e:
+        print(f"Error getting course attendance report: {e}")
+        return {"success": False, "message": str(e)}
 
-        # Step 4: Merge names into attendance records
-        for record in attendance_records.data:
-            record["name"] = reg_to_name.get(record["reg_number"], "Unknown")
+def get_course_daily_stats(course_code: str, start_date: Optional[date] = None,
+                           end_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Get the per-day attendance counters of a course
+    
+    Args:
+        course_code: The course code
+        start_date: First day to include (default: all)
+        end_date: Last day to include (default: all)
+        
+    Returns:
+        Dictionary with one row per course day, oldest first
+    """
+    try:
+        query = supabase.table("Attendance daily stats") \
+            .select("day, present, late, absent, excused, total") \
+            .eq("course_code", course_code)
+        if start_date:
+            query = query.gte("day", start_date.isoformat())
+        if end_date:
+            query = query.lte("day", end_date.isoformat())
+        result = query.order("day").execute()
+        return {"success": True, "data": result.data}
+    except Exception as e:
+        print(f"Error getting course attendance stats: {e}")
+        return {"success": False, "message": str(e)}
 
-        return {"success": True, "data": attendance_records.data}
+def get_course_session_counts(course_codes: List[str], page_size: int = REPORT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Count the days each course has attendance logged on
+    
+    Args:
+        course_codes: Course codes
+        page_size: Rows fetched per request
+        
+    Returns:
+        Dictionary with data mapping course_code to its number of sessions
+    """
+    try:
+        sessions = {course_code: 0 for course_code in course_codes}
+        if not sessions:
+            return {"success": True, "data": sessions}
+
+        # One query for all the courses; days whose records were all removed don't count
+        offset = 0
+        while True:
+            result = supabase.table("Attendance daily stats") \
+                .select("course_code, day") \
+                .in_("course_code", list(sessions)) \
+                .gt("total", 0) \
+                .order("course_code") \
+                .order("day") \
+                .range(offset, offset + page_size - 1) \
+                .execute()
+            for row in result.data:
+                sessions[row["course_code"]] += 1
+            if len(result.data) < page_size:
+                break
+            offset += page_size
+        return {"success": True, "data": sessions}
+    except Exception as e:
+        print(f"Error counting course sessions: {e}")
+        return {"success": False, "message": str(e)}
 
+def get_student_course_stats(reg_number: Optional[str] = None, course_code: Optional[str] = None,
+                             page_size: int = REPORT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Get per-student, per-course attendance counters
+    
+    Args:
+        reg_number: Only this student's courses
+        course_code: Only this course's students
+        page_size: Rows fetched per request
+        
+    Returns:
+        Dictionary with the matching counter rows
+    """
+    try:
+        rows = []
+        offset = 0
+        while True:
+            query = supabase.table("Attendance student stats") \
+                .select("reg_number, course_code, present, late, absent, excused, total, last_marked")
+            if reg_number:
+                query = query.eq("reg_number", reg_number)
+            if course_code:
+                query = query.eq("course_code", course_code)
+            result = query \
+                .order("reg_number") \
+                .range(offset, offset + page_size - 1) \
+                .execute()
+            rows.extend(result.data)
+            if len(result.data) < page_size:
+                break
+            offset += page_size
+        return {"success": True, "data": rows}
     except Exception as e:
-        print(f"Error getting course attendance report: {e}")
+        print(f"Error getting student attendance stats: {e}")
         return {"success": False, "message": str(e)}
 
@@ -12,11 +12,15 @@ from dotenv import load_dotenv
 
 from rabbitMQ.attendance_consumer import attendance_consume  # import your consumer
 from rabbitMQ.realtime_consumer import consume_realtime
+from rabbitMQ.cache_events import consume_cache_events
+from services.face_service import load_face_gallery, sync_face_gallery
+from services.recognition_executor import recognition_executor
 
 
 from routes.attendance_routes import router as attendance_router
 #from routes.students_routes import router as student_router
 from routes.realtime import router as realtime_router
+from config import FACE_GALLERY_SYNC_INTERVAL
 
 # Load environment variables from .env
 load_dotenv()
@@ -75,10 +79,32 @@ async def root():
 #     loop = asyncio.get_event_loop()
 #     loop.create_task(consume())  # Run the consumer in background
 
+async def sync_face_gallery_periodically():
+    """Catch up on registrations whose cache events were missed"""
+    while True:
+        await asyncio.sleep(FACE_GALLERY_SYNC_INTERVAL)
+        try:
+            await asyncio.to_thread(sync_face_gallery)
+        except Exception as e:
+            logger.error(f"Face gallery sync failed: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
+    # Load registered faces once so recognition never hits the database per frame
+    await asyncio.to_thread(load_face_gallery)
+    # Detection/encoding runs in worker processes, DB I/O in threads
+    recognition_executor.start()
     asyncio.create_task(attendance_consume())
     asyncio.create_task(consume_realtime())
+    asyncio.create_task(consume_cache_events())
+    if FACE_GALLERY_SYNC_INTERVAL > 0:
+        asyncio.create_task(sync_face_gallery_periodically())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    recognition_executor.shutdown()
 
 
 if __name__ == "__main__":
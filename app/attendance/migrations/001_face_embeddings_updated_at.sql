@@ -0,0 +1,19 @@
+-- Track when each face embedding last changed so the attendance service
+-- can sync its local gallery snapshot incrementally
+ALTER TABLE "Face_embeddings" ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION set_face_embeddings_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS face_embeddings_updated_at ON "Face_embeddings";
+CREATE TRIGGER face_embeddings_updated_at
+    BEFORE UPDATE ON "Face_embeddings"
+    FOR EACH ROW EXECUTE FUNCTION set_face_embeddings_updated_at();
+
+-- Faster "changed since" queries
+CREATE INDEX IF NOT EXISTS idx_face_embeddings_updated_at ON "Face_embeddings"(updated_at);
@@ -0,0 +1,111 @@
+-- Attendance counters kept up to date as "Attendance logs" rows are written,
+-- so the stats endpoints read one small row per course day / student
+-- instead of scanning the logs
+CREATE TABLE IF NOT EXISTS "Attendance daily stats" (
+    course_code TEXT NOT NULL,
+    day DATE NOT NULL,
+    present INTEGER NOT NULL DEFAULT 0,
+    late INTEGER NOT NULL DEFAULT 0,
+    absent INTEGER NOT NULL DEFAULT 0,
+    excused INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (course_code, day)
+);
+
+CREATE TABLE IF NOT EXISTS "Attendance student stats" (
+    reg_number TEXT NOT NULL,
+    course_code TEXT NOT NULL,
+    present INTEGER NOT NULL DEFAULT 0,
+    late INTEGER NOT NULL DEFAULT 0,
+    absent INTEGER NOT NULL DEFAULT 0,
+    excused INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    last_marked TIMESTAMP,
+    PRIMARY KEY (reg_number, course_code)
+);
+
+CREATE INDEX IF NOT EXISTS idx_attendance_student_stats_course ON "Attendance student stats"(course_code);
+
+-- Add (delta = 1) or remove (delta = -1) one log from the counters
+CREATE OR REPLACE FUNCTION apply_attendance_stats(
+    p_reg_number TEXT, p_course_code TEXT, p_timestamp TIMESTAMP, p_status TEXT, delta INTEGER
+) RETURNS VOID AS $$
+DECLARE
+    d_present INTEGER := CASE WHEN p_status = 'present' THEN delta ELSE 0 END;
+    d_late INTEGER := CASE WHEN p_status = 'late' THEN delta ELSE 0 END;
+    d_absent INTEGER := CASE WHEN p_status = 'absent' THEN delta ELSE 0 END;
+    d_excused INTEGER := CASE WHEN p_status = 'excused' THEN delta ELSE 0 END;
+BEGIN
+    IF p_course_code IS NULL OR p_timestamp IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO "Attendance daily stats" AS s (course_code, day, present, late, absent, excused, total)
+    VALUES (p_course_code, p_timestamp::DATE, d_present, d_late, d_absent, d_excused, delta)
+    ON CONFLICT (course_code, day) DO UPDATE SET
+        present = s.present + EXCLUDED.present,
+        late = s.late + EXCLUDED.late,
+        absent = s.absent + EXCLUDED.absent,
+        excused = s.excused + EXCLUDED.excused,
+        total = s.total + EXCLUDED.total;
+
+    INSERT INTO "Attendance student stats" AS s (reg_number, course_code, present, late, absent, excused, total, last_marked)
+    VALUES (p_reg_number, p_course_code, d_present, d_late, d_absent, d_excused, delta,
+            CASE WHEN delta > 0 THEN p_timestamp END)
+    ON CONFLICT (reg_number, course_code) DO UPDATE SET
+        present = s.present + EXCLUDED.present,
+        late = s.late + EXCLUDED.late,
+        absent = s.absent + EXCLUDED.absent,
+        excused = s.excused + EXCLUDED.excused,
+        total = s.total + EXCLUDED.total,
+        last_marked = GREATEST(s.last_marked, EXCLUDED.last_marked);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_attendance_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_attendance_stats(OLD.reg_number, OLD.course_code, OLD.timestamp::TIMESTAMP, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_attendance_stats(NEW.reg_number, NEW.course_code, NEW.timestamp::TIMESTAMP, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS attendance_logs_stats ON "Attendance logs";
+CREATE TRIGGER attendance_logs_stats
+    AFTER INSERT OR UPDATE OR DELETE ON "Attendance logs"
+    FOR EACH ROW EXECUTE FUNCTION update_attendance_stats();
+
+-- Backfill from the existing logs (safe to re-run: counters are recomputed)
+INSERT INTO "Attendance daily stats" (course_code, day, present, late, absent, excused, total)
+SELECT course_code, timestamp::DATE,
+       COUNT(*) FILTER (WHERE status = 'present'),
+       COUNT(*) FILTER (WHERE status = 'late'),
+       COUNT(*) FILTER (WHERE status = 'absent'),
+       COUNT(*) FILTER (WHERE status = 'excused'),
+       COUNT(*)
+FROM "Attendance logs"
+WHERE course_code IS NOT NULL
+GROUP BY course_code, timestamp::DATE
+ON CONFLICT (course_code, day) DO UPDATE SET
+    present = EXCLUDED.present, late = EXCLUDED.late, absent = EXCLUDED.absent,
+    excused = EXCLUDED.excused, total = EXCLUDED.total;
+
+INSERT INTO "Attendance student stats" (reg_number, course_code, present, late, absent, excused, total, last_marked)
+SELECT reg_number, course_code,
+       COUNT(*) FILTER (WHERE status = 'present'),
+       COUNT(*) FILTER (WHERE status = 'late'),
+       COUNT(*) FILTER (WHERE status = 'absent'),
+       COUNT(*) FILTER (WHERE status = 'excused'),
+       COUNT(*),
+       MAX(timestamp::TIMESTAMP)
+FROM "Attendance logs"
+WHERE course_code IS NOT NULL
+GROUP BY reg_number, course_code
+ON CONFLICT (reg_number, course_code) DO UPDATE SET
+    present = EXCLUDED.present, late = EXCLUDED.late, absent = EXCLUDED.absent,
+    excused = EXCLUDED.excused, total = EXCLUDED.total, last_marked = EXCLUDED.last_marked;
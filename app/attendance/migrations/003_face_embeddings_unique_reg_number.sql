@@ -0,0 +1,8 @@
+-- Bulk registration upserts on reg_number, which needs one row per student.
+-- Keep the most recently written row of any duplicates first.
+DELETE FROM "Face_embeddings" a
+USING "Face_embeddings" b
+WHERE a.reg_number = b.reg_number
+  AND (a.updated_at, a.ctid) < (b.updated_at, b.ctid);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_face_embeddings_reg_number ON "Face_embeddings"(reg_number);
@@ -0,0 +1,4 @@
+-- Several registration photos per student: face_embedding holds their
+-- centroid and face_samples the (up to FACE_MAX_SAMPLES) embeddings behind
+-- it, encoded with utils.embedding_codec.encode_embedding_list
+ALTER TABLE "Face_embeddings" ADD COLUMN IF NOT EXISTS face_samples TEXT;
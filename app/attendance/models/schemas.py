@@ -15,6 +15,12 @@ class AttendanceStatus(str, Enum):
     LATE = "late"
     EXCUSED = "excused"
 
+
+class ReportFormat(str, Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+    CSV = "csv"
+
 class ManualAttendanceRequest(BaseModel):
     reg_number: str
     status: AttendanceStatus = AttendanceStatus.PRESENT
@@ -64,6 +70,12 @@ class AttendanceResponse(BaseModel):
 class FaceRegisterRequest(BaseModel):
     reg_number: str
     image_base64: str
+    replace: bool = False  # drop previously registered photos instead of adding this one
+
+
+class BulkFaceRegisterRequest(BaseModel):
+    faces: List[FaceRegisterRequest] = []
+    archive_base64: Optional[str] = None  # zip of <reg_number>.jpg/.png images
 
 
 class FaceEmbedding(BaseModel):
@@ -76,6 +88,10 @@ class FaceRecognitionRequest(BaseModel):
     image_base64: str
     location: Optional[str] = None
     course_code: str
+    global_fallback: bool = False
+    detection_model: Optional[str] = None  # "hog" or "cnn"
+    upsample: Optional[int] = None
+    detection_max_size: Optional[int] = None
 
 class RecognizedStudent(BaseModel):
     reg_number: str
@@ -1,54 +1,22 @@
 import aio_pika
-import asyncio
 import json
 from config import ATTENDANCE_QUEUE
 from controllers.attendance_controller import handle_attendance_message
-from .connection import get_connection
+from .worker_pool import consume_concurrently
 
-async def attendance_consume():
-    connection = None
-    try:
-        connection = await get_connection()
-        channel = await connection.channel()
-        queue = await channel.declare_queue(ATTENDANCE_QUEUE, durable=True)
-        print("✅ Attendance consumer started...")
-
-        async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                async with message.process():
-                    payload = json.loads(message.body.decode())
-
-                    action = payload.get("action")
-                    data = payload.get("payload")
-
-                    print(f"📨 Received action: {action}, payload: {data}")
+# Actions that run face detection/encoding; the rest are database lookups
+HEAVY_ACTIONS = {"recognizeFace", "registerFace", "registerFaces"}
 
-                    try:
-                        result = await handle_attendance_message(action, data)
-                    except Exception as e:
-                        result = {"error": str(e)}
 
-                    # Reply back if needed
-                    reply_to = message.reply_to
-                    correlation_id = message.correlation_id
+def parse_attendance_message(message: aio_pika.abc.AbstractIncomingMessage):
+    payload = json.loads(message.body.decode())
+    return payload.get("action"), payload.get("payload")
 
-                    if reply_to and correlation_id:
-                        await channel.default_exchange.publish(
-                            aio_pika.Message(
-                                body=json.dumps({
-                                    "status": "success" if "error" not in result else "error",
-                                    "result": result
-                                }).encode(),
-                                correlation_id=correlation_id
-                            ),
-                            routing_key=reply_to
-                        )
-
-                    print("✅ Response sent.")
-
-    except Exception as e:
-        print(f"Error in attendance consumer: {str(e)}")
-    finally:
-        if connection and not connection.is_closed:
-            await connection.close()
-            print("RabbitMQ connection closed.")
\ No newline at end of file
+async def attendance_consume():
+    await consume_concurrently(
+        ATTENDANCE_QUEUE,
+        "Attendance",
+        parse_attendance_message,
+        handle_attendance_message,
+        HEAVY_ACTIONS
+    )
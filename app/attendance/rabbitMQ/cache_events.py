@@ -0,0 +1,111 @@
+import aio_pika
+import asyncio
+import json
+import time
+import uuid
+from typing import Optional
+from config import CACHE_EVENTS_EXCHANGE
+from controllers.cache_controller import handle_cache_event
+from .connection import get_connection
+
+# Identifies this process so it can skip the events it published itself
+INSTANCE_ID = uuid.uuid4().hex
+
+_connection = None
+_exchange = None
+_exchange_lock: Optional[asyncio.Lock] = None
+# Event loop the exchange is used from, so synchronous code can publish too
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def _declare_exchange(channel):
+    return await channel.declare_exchange(CACHE_EVENTS_EXCHANGE, aio_pika.ExchangeType.FANOUT, durable=True)
+
+
+async def _get_exchange():
+    global _connection, _exchange, _exchange_lock, _loop
+    _loop = asyncio.get_running_loop()
+    if _exchange_lock is None:
+        _exchange_lock = asyncio.Lock()
+    async with _exchange_lock:
+        if _exchange is None:
+            _connection = await get_connection()
+            channel = await _connection.channel()
+            _exchange = await _declare_exchange(channel)
+    return _exchange
+
+
+async def publish_cache_event(event: str, **data) -> bool:
+    """
+    Broadcast a cache invalidation event to every service instance
+
+    Args:
+        event: "face_registered", "faces_registered", "course_updated" or
+            "enrollment_changed"
+        **data: Event fields (reg_number, course_code, ...)
+
+    Returns:
+        True if the event was published
+    """
+    try:
+        exchange = await _get_exchange()
+        body = {"event": event, "origin": INSTANCE_ID, "timestamp": time.time(), **data}
+        await exchange.publish(
+            aio_pika.Message(body=json.dumps(body).encode(), content_type="application/json"),
+            routing_key=""
+        )
+        return True
+    except Exception as e:
+        print(f"Error publishing cache event {event}: {str(e)}")
+        return False
+
+
+def publish_cache_event_threadsafe(event: str, **data) -> bool:
+    """
+    Broadcast a cache invalidation event from synchronous code
+
+    The event is handed to the service's event loop (see publish_cache_event)
+    without waiting for it to be published.
+
+    Returns:
+        True if the event was scheduled
+    """
+    if _loop is None or _loop.is_closed():
+        print(f"Error publishing cache event {event}: no event loop running")
+        return False
+    asyncio.run_coroutine_threadsafe(publish_cache_event(event, **data), _loop)
+    return True
+
+
+async def consume_cache_events():
+    global _loop
+    _loop = asyncio.get_running_loop()
+    connection = None
+    try:
+        connection = await get_connection()
+        channel = await connection.channel()
+        exchange = await _declare_exchange(channel)
+        # One private queue per instance, so every instance sees every event
+        queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+        await queue.bind(exchange)
+        print("✅ Cache event consumer started...")
+
+        async with queue.iterator() as queue_iter:
+            async for message in queue_iter:
+                async with message.process():
+                    try:
+                        event = json.loads(message.body.decode())
+                        if event.get("origin") == INSTANCE_ID:
+                            continue
+                        # Gallery updates copy the embedding matrix, keep them off the event loop
+                        result = await asyncio.to_thread(handle_cache_event, event)
+                        print(f"📨 Cache event {event.get('event')}: {result['message']}")
+                    except Exception as e:
+                        print(f"Error handling cache event: {str(e)}")
+
+    except Exception as e:
+        print(f"Error in cache event consumer: {str(e)}")
+    finally:
+        if connection and not connection.is_closed:
+            await connection.close()
+            print("RabbitMQ connection closed.")
@@ -1,52 +1,38 @@
 import aio_pika
-import asyncio
 import json
 from config import REALTIME_QUEUE
 from controllers.realtime_controller import handle_realtime_message
-from .connection import get_connection
+from .worker_pool import consume_concurrently
 
-async def consume_realtime():
-    connection = None
-
-    try:
-        connection = await get_connection()
-        channel = await connection.channel()
-        queue = await channel.declare_queue(REALTIME_QUEUE, durable=True)
-        print("✅ Realtime WebSocket consumer started...")
-
-        async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                async with message.process():
-                    payload = json.loads(message.body.decode())
+# Every realtime action runs recognition
+HEAVY_ACTIONS = {"faceRecognition"}
 
-                    action = payload.get("action")
-                    data = payload.get("payload")
 
-                    try:
-                        result = await handle_realtime_message(action, data)
-                    except Exception as e:
-                        result = {"error": str(e)}
+def parse_realtime_message(message: aio_pika.abc.AbstractIncomingMessage):
+    """
+    Extract the action and payload of a realtime queue message
 
-                    reply_to = message.reply_to
-                    correlation_id = message.correlation_id
+    JSON messages carry {"action": ..., "payload": {...}} with a base64 image.
+    Binary messages (content type image/*) carry the raw JPEG/PNG bytes as the
+    body and the action and payload fields as message headers.
+    """
+    if message.content_type and message.content_type.startswith("image/"):
+        data = {
+            key: value.decode() if isinstance(value, bytes) else value
+            for key, value in (message.headers or {}).items()
+        }
+        action = data.pop("action", "faceRecognition")
+        data["image_bytes"] = message.body
+        return action, data
 
-                    if reply_to and correlation_id:
-                        await channel.default_exchange.publish(
-                            aio_pika.Message(
-                                body=json.dumps({
-                                    "status": "success" if "error" not in result else "error",
-                                    "result": result
-                                }).encode(),
-                                correlation_id=correlation_id
-                            ),
-                            routing_key=reply_to
-                        )
+    payload = json.loads(message.body.decode())
+    return payload.get("action"), payload.get("payload")
 
-                    print("✅ [Realtime] Response sent.")
-
-    except Exception as e:
-        print(f"Error in realtime consumer: {str(e)}")
-    finally:
-        if connection and not connection.is_closed:
-            await connection.close()
-            print("RabbitMQ connection closed.")
\ No newline at end of file
+async def consume_realtime():
+    await consume_concurrently(
+        REALTIME_QUEUE,
+        "Realtime",
+        parse_realtime_message,
+        handle_realtime_message,
+        HEAVY_ACTIONS
+    )
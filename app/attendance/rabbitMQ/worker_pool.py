@@ -0,0 +1,151 @@
+import aio_pika
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Collection, Dict, Tuple
+from fastapi.encoders import jsonable_encoder
+from config import CONSUMER_PREFETCH, CONSUMER_LIGHT_WORKERS, CONSUMER_HEAVY_WORKERS
+from .connection import get_connection
+
+Parser = Callable[[aio_pika.abc.AbstractIncomingMessage], Tuple[str, Any]]
+Handler = Callable[[str, Any], Awaitable[Any]]
+
+
+async def send_reply(channel, message: aio_pika.abc.AbstractIncomingMessage, result: Any) -> None:
+    """Publish a handler result to the message's reply_to queue, if it has one"""
+    if not (message.reply_to and message.correlation_id):
+        return
+
+    result = jsonable_encoder(result)
+    failed = isinstance(result, dict) and "error" in result
+    await channel.default_exchange.publish(
+        aio_pika.Message(
+            body=json.dumps({
+                "status": "error" if failed else "success",
+                "result": result
+            }).encode(),
+            correlation_id=message.correlation_id
+        ),
+        routing_key=message.reply_to
+    )
+
+
+async def _worker(label: str, lane: asyncio.Queue, channel, handle: Handler) -> None:
+    while True:
+        message, action, data = await lane.get()
+        try:
+            async with message.process():
+                try:
+                    result = await handle(action, data)
+                except Exception as e:
+                    result = {"error": str(e)}
+                await send_reply(channel, message, result)
+            print(f"✅ [{label}] Response sent for {action}.")
+        except Exception as e:
+            # process() has already rejected the message; keep the worker alive
+            print(f"[{label}] Error processing {action}: {e}")
+        finally:
+            lane.task_done()
+
+
+async def _forward(channel, message: aio_pika.abc.AbstractIncomingMessage, routing_key: str) -> None:
+    """Move a message to another queue, keeping its reply_to and correlation_id"""
+    await channel.default_exchange.publish(
+        aio_pika.Message(
+            body=message.body,
+            headers=message.headers,
+            content_type=message.content_type,
+            correlation_id=message.correlation_id,
+            reply_to=message.reply_to,
+            delivery_mode=message.delivery_mode
+        ),
+        routing_key=routing_key
+    )
+    await message.ack()
+
+
+async def _dispatch(label: str, queue, parse: Parser, route: Callable[[Any, str, Any], Awaitable[None]]) -> None:
+    """Parse each message of a queue and hand it to route(message, action, data)"""
+    async with queue.iterator() as queue_iter:
+        async for message in queue_iter:
+            try:
+                action, data = parse(message)
+            except Exception as e:
+                print(f"[{label}] Dropping unreadable message: {e}")
+                await message.reject(requeue=False)
+                continue
+            await route(message, action, data)
+
+
+async def consume_concurrently(queue_name: str, label: str, parse: Parser, handle: Handler,
+                               heavy_actions: Collection[str],
+                               prefetch: int = CONSUMER_PREFETCH,
+                               light_workers: int = CONSUMER_LIGHT_WORKERS,
+                               heavy_workers: int = CONSUMER_HEAVY_WORKERS) -> None:
+    """
+    Consume a queue with a pool of worker tasks
+
+    Each message goes to one of two lanes by action: ``heavy_actions``
+    (face recognition and registration) run on ``heavy_workers`` tasks,
+    everything else on ``light_workers`` tasks. Messages are acknowledged
+    when their handler finishes, in any order.
+
+    Heavy messages are moved to a "<queue_name>.heavy" queue consumed on its
+    own channel, with a prefetch of ``heavy_workers``. A recognition backlog
+    therefore waits in the broker instead of filling the main queue's
+    prefetch window, and light messages keep being delivered however many
+    recognitions are queued. Moving a message costs one extra publish.
+
+    Args:
+        queue_name: Durable queue to consume
+        label: Name used in log lines
+        parse: Returns (action, payload) for a message
+        handle: Coroutine run for each (action, payload)
+        heavy_actions: Actions routed to the heavy lane
+        prefetch: Broker prefetch count of the main queue, which bounds the
+            light messages in flight
+        light_workers: Concurrent light messages
+        heavy_workers: Concurrent heavy messages
+    """
+    connection = None
+    workers = []
+    heavy_queue_name = f"{queue_name}.heavy"
+    try:
+        connection = await get_connection()
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=prefetch)
+        queue = await channel.declare_queue(queue_name, durable=True)
+        heavy_channel = await connection.channel()
+        await heavy_channel.set_qos(prefetch_count=max(1, heavy_workers))
+        heavy_queue = await heavy_channel.declare_queue(heavy_queue_name, durable=True)
+
+        # Unbounded here: each channel's prefetch already caps how many messages are held
+        lanes: Dict[str, asyncio.Queue] = {"light": asyncio.Queue(), "heavy": asyncio.Queue()}
+        for lane_name, count in (("light", light_workers), ("heavy", heavy_workers)):
+            workers.extend(
+                asyncio.create_task(_worker(f"{label}/{lane_name}", lanes[lane_name], channel, handle))
+                for _ in range(max(1, count))
+            )
+
+        async def route(message, action, data):
+            if action in heavy_actions:
+                await _forward(channel, message, heavy_queue_name)
+            else:
+                lanes["light"].put_nowait((message, action, data))
+
+        async def route_heavy(message, action, data):
+            lanes["heavy"].put_nowait((message, action, data))
+
+        print(f"✅ {label} consumer started (prefetch {prefetch}, {light_workers} light / {heavy_workers} heavy workers)...")
+        await asyncio.gather(
+            _dispatch(label, queue, parse, route),
+            _dispatch(f"{label}/heavy", heavy_queue, parse, route_heavy)
+        )
+
+    except Exception as e:
+        print(f"Error in {label} consumer: {str(e)}")
+    finally:
+        for worker in workers:
+            worker.cancel()
+        if connection and not connection.is_closed:
+            await connection.close()
+            print("RabbitMQ connection closed.")
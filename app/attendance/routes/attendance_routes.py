@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import date
 
@@ -6,6 +7,7 @@ from datetime import date
 from pydantic import BaseModel, Field
 from models.schemas import (
     FaceRegisterRequest, 
+    BulkFaceRegisterRequest,
     FaceRecognitionRequest,
     ManualAttendanceRequest, 
     FaceRecognitionResponse, 
@@ -18,28 +20,50 @@ from models.schemas import (
     CourseAttendanceReport, 
     AttendanceReportRequest,
     AttendanceResult,
+    ReportFormat,
     courseReportRequest
 )
 
-from services.face_service import register_face, recognize_faces
+from services.face_service import detection_options
+from services.recognition_executor import recognition_executor, RecognitionBusy
+from db.marked_attendance import marked_today
 from db.supabase import (
     log_attendance, 
-    get_student_profile, 
     get_student_attendance_report,
     get_course_attendance_report,
+    get_enrolled_reg_numbers,
+    iter_student_attendance_report,
+    iter_course_attendance_report,
     get_attendance_today
 )
 from services.attendace_logic import can_mark_attendance,can_mark_attendance_for_course
+from services.attendance_stats import get_course_summary, get_course_student_summary, get_student_summary
+from services.cached_lookups import get_cached_student_profile
+from services.face_service import face_gallery_stats
+from utils.registration_archive import registration_items
+from utils.report_stream import MEDIA_TYPES, stream_lines
+from utils.ttl_cache import cache_stats
 
 router = APIRouter(prefix="/attendance", tags=["attendance"])
 
+STUDENT_REPORT_COLUMNS = ["attendance_id", "reg_number", "course_code", "timestamp", "method", "status", "location"]
+COURSE_REPORT_COLUMNS = ["attendance_id", "reg_number", "name", "timestamp", "method", "status", "location"]
+
+def _report_stream(rows, report_format: ReportFormat, columns: List[str], filename: str) -> StreamingResponse:
+    """Stream report rows as NDJSON or CSV; blocking reads run in Starlette's thread pool"""
+    return StreamingResponse(
+        stream_lines(rows, report_format.value, columns),
+        media_type=MEDIA_TYPES[report_format.value],
+        headers={"Content-Disposition": f'attachment; filename="{filename.replace("/", "_")}.{report_format.value}"'}
+    )
+
 @router.post("/manual", response_model=AttendanceResponse)
 async def mark_manual_attendance(request: ManualAttendanceRequest):
     """
     Manually mark attendance for a student based on course schedule
     """
     # Verify student exists
-    student = get_student_profile(request.reg_number)
+    student = get_cached_student_profile(request.reg_number)
     if not student["success"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -99,8 +123,75 @@ async def recognize_student_faces(request: FaceRecognitionRequest):
     """
     Recognize students in an image and mark attendance if applicable
     """
-    result = recognize_faces(request.image_base64, request.location, request.course_code)
+    try:
+        result = await recognition_executor.recognize(
+            image_base64=request.image_base64,
+            location=request.location,
+            course_code=request.course_code,
+            global_fallback=request.global_fallback,
+            detection=detection_options(request.model_dump()),
+            wait=False
+        )
+    except RecognitionBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    
+    return build_recognition_response(result)
+
+@router.post("/recognize-binary", response_model=FaceRecognitionResponse)
+async def recognize_student_faces_binary(
+    request: Request,
+    course_code: str,
+    location: Optional[str] = None,
+    threshold: float = 0.6,
+    global_fallback: bool = False,
+    detection_model: Optional[str] = None,
+    upsample: Optional[int] = None,
+    detection_max_size: Optional[int] = None
+):
+    """
+    Recognize students in a raw JPEG/PNG request body and mark attendance if applicable
     
+    Same as /recognize without the base64/JSON overhead: the image is the
+    request body and the other fields are query parameters.
+    """
+    image_bytes = await request.body()
+    if not image_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Request body must contain the image"
+        )
+    
+    try:
+        result = await recognition_executor.recognize(
+            image_bytes=image_bytes,
+            location=location,
+            course_code=course_code,
+            threshold=threshold,
+            global_fallback=global_fallback,
+            detection=detection_options({
+                "detection_model": detection_model,
+                "upsample": upsample,
+                "detection_max_size": detection_max_size
+            }),
+            wait=False
+        )
+    except RecognitionBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    
+    return build_recognition_response(result)
+
+def build_recognition_response(result: dict) -> FaceRecognitionResponse:
+    """
+    Build the API response for a recognize_faces result
+    """
     # Convert raw attendance results to proper model objects
     attendance_results = []
     if "attendance_results" in result and result["attendance_results"]:
@@ -129,7 +220,16 @@ async def register_student_face(request: FaceRegisterRequest):
     """
     Register a student's face for facial recognition attendance
     """
-    result = register_face(request.reg_number, request.image_base64)
+    try:
+        result = await recognition_executor.register(
+            request.reg_number, request.image_base64, wait=False, replace=request.replace
+        )
+    except RecognitionBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     
     if not result["success"]:
         raise HTTPException(
@@ -138,6 +238,39 @@ async def register_student_face(request: FaceRegisterRequest):
         )
     
     return ApiResponse(success=True, message=result["message"])
+
+@router.post("/register-faces", response_model=ApiResponse)
+async def register_student_faces(request: BulkFaceRegisterRequest):
+    """
+    Register many students' faces at once from a list of images and/or a
+    zip archive of <reg_number>.jpg files
+    """
+    try:
+        items = registration_items([face.model_dump() for face in request.faces], request.archive_base64)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid registration archive: {e}"
+        )
+    
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No faces to register"
+        )
+    
+    result = await recognition_executor.register_many(items)
+    if not result["success"]:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=result["message"]
+        )
+    
+    return ApiResponse(
+        success=True,
+        message=result["message"],
+        data={key: result[key] for key in ("registered", "failed", "results")}
+    )
 # Get today's attendance for a student
 
 
@@ -147,7 +280,7 @@ async def get_today_attendance(reg_number: str):
     Get today's attendance records for a specific student
     """
     # Verify student exists
-    student = get_student_profile(reg_number)
+    student = get_cached_student_profile(reg_number)
     if not student["success"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -170,9 +303,13 @@ async def get_today_attendance(reg_number: str):
 
 # Get student attendance report
 @router.post("/report/student", response_model=ApiResponse)
-async def get_student_report(request: AttendanceReportRequest):
+async def get_student_report(request: AttendanceReportRequest,
+                             format: ReportFormat = Query(ReportFormat.JSON)):
     """
     Get attendance report for a specific student within a date range
+    
+    With format=ndjson or format=csv the records are streamed page by page
+    instead of being returned in one JSON body.
     """
     if not request.reg_number:
         raise HTTPException(
@@ -181,13 +318,21 @@ async def get_student_report(request: AttendanceReportRequest):
         )
     
     # Verify student exists
-    student = get_student_profile(request.reg_number)
+    student = get_cached_student_profile(request.reg_number)
     if not student["success"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=student["message"]
         )
     
+    if format != ReportFormat.JSON:
+        return _report_stream(
+            iter_student_attendance_report(request.reg_number, request.start_date, request.end_date),
+            format,
+            STUDENT_REPORT_COLUMNS,
+            f"attendance_{request.reg_number}"
+        )
+    
     result = get_student_attendance_report(
         reg_number=request.reg_number,
         start_date=request.start_date,
@@ -253,9 +398,13 @@ async def get_student_report(request: AttendanceReportRequest):
 #     )
 
 @router.post("/report/course", response_model=ApiResponse)
-async def get_course_report(request: courseReportRequest):
+async def get_course_report(request: courseReportRequest,
+                            format: ReportFormat = Query(ReportFormat.JSON)):
     """
     Get attendance report for a specific course on a specific date
+    
+    With format=ndjson or format=csv the records are streamed page by page
+    instead of being returned in one JSON body.
     """
     if not request.course_code:
         raise HTTPException(
@@ -263,6 +412,20 @@ async def get_course_report(request: courseReportRequest):
             detail="Course code is required"
         )
     
+    if format != ReportFormat.JSON:
+        enrollments = get_enrolled_reg_numbers(request.course_code)
+        if not enrollments["success"]:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=enrollments["message"]
+            )
+        return _report_stream(
+            iter_course_attendance_report(enrollments["data"], request.start_date),
+            format,
+            COURSE_REPORT_COLUMNS,
+            f"attendance_{request.course_code}_{request.start_date or date.today()}"
+        )
+    
     result = get_course_attendance_report(
         course_code=request.course_code,
         date_value=request.start_date
@@ -279,3 +442,56 @@ async def get_course_report(request: courseReportRequest):
         message=f"Retrieved attendance report for course {request.course_code}",
         data=result["data"]
     )
+
+def _stats_response(result, message: str) -> ApiResponse:
+    if not result["success"]:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=result["message"]
+        )
+    return ApiResponse(success=True, message=message, data=result["data"])
+
+@router.get("/stats/course/{course_code}", response_model=ApiResponse)
+async def get_course_stats(course_code: str, start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """
+    Attendance and late rates of a course, overall and per day
+    """
+    return _stats_response(
+        get_course_summary(course_code, start_date, end_date),
+        f"Retrieved attendance stats for course {course_code}"
+    )
+
+@router.get("/stats/course/{course_code}/students", response_model=ApiResponse)
+async def get_course_student_stats(course_code: str):
+    """
+    Attendance percentage of every student in a course
+    """
+    return _stats_response(
+        get_course_student_summary(course_code),
+        f"Retrieved student attendance stats for course {course_code}"
+    )
+
+@router.get("/stats/student/{reg_number}", response_model=ApiResponse)
+async def get_student_stats(reg_number: str, course_code: Optional[str] = None):
+    """
+    Attendance percentage of a student in each of their courses
+    """
+    return _stats_response(
+        get_student_summary(reg_number, course_code),
+        f"Retrieved attendance stats for student {reg_number}"
+    )
+
+@router.get("/cache-metrics", response_model=ApiResponse)
+async def get_cache_metrics():
+    """
+    Hit rate and staleness of the attendance service caches
+    """
+    return ApiResponse(
+        success=True,
+        message="Retrieved cache metrics",
+        data={
+            "caches": cache_stats(),
+            "face_gallery": face_gallery_stats(),
+            "marked_today": marked_today.stats()
+        }
+    )
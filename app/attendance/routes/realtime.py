@@ -4,7 +4,11 @@ import asyncio
 from typing import List, Dict, Any, Optional
 import numpy as np
 
-from services.face_service import recognize_faces
+from services.face_service import detection_options
+from services.recognition_executor import recognition_executor, RecognitionBusy
+from services.face_tracker import FaceTracker
+from config import REALTIME_TARGET_FPS, REALTIME_MAX_IN_FLIGHT, RECOGNITION_MAX_PENDING
+from utils.frame_codec import parse_binary_frame
 
 router = APIRouter(prefix="/realtime", tags=["realtime"])
 
@@ -25,21 +29,201 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
-async def process_frame(image_base64: str, threshold: float = 0.6,
+
+async def receive_frame(websocket: WebSocket) -> Dict[str, Any]:
+    """
+    Receive one frame request from a WebSocket
+
+    Text messages are JSON with an image_base64 field. Binary messages use the
+    utils.frame_codec layout (length-prefixed JSON metadata followed by raw
+    JPEG/PNG bytes); the image is returned as image_bytes without copying.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+
+    if message.get("bytes") is not None:
+        metadata, image_bytes = parse_binary_frame(message["bytes"])
+        metadata["image_bytes"] = image_bytes
+        return metadata
+
+    return json.loads(message["text"])
+
+
+def frame_image_args(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick the image of a received frame, raising KeyError if there is none"""
+    if data.get("image_bytes") is not None:
+        return {"image_bytes": data["image_bytes"]}
+    return {"image_base64": data["image_base64"]}
+
+
+class LatestFrameSession:
+    """
+    Latest-frame-wins processing for one WebSocket connection.
+
+    Incoming frames overwrite a single pending slot, so a frame that is
+    still waiting when a newer one arrives is dropped instead of queued.
+    At most ``max_in_flight`` frames are recognized at once and new work is
+    started at most ``target_fps`` times per second (0 = no limit), which
+    keeps result latency bounded when the client sends faster than we can
+    recognize. Every result carries the session's frame counters.
+    ``max_in_flight`` is capped at RECOGNITION_MAX_PENDING, beyond which
+    the executor would only turn frames away as busy.
+    With a tracker, frames are recognized one at a time whatever
+    ``max_in_flight`` is, since tracking needs them in order.
+    """
+
+    def __init__(self, websocket: WebSocket, target_fps: float = REALTIME_TARGET_FPS,
+                 max_in_flight: int = REALTIME_MAX_IN_FLIGHT,
+                 tracker: Optional[FaceTracker] = None):
+        self.websocket = websocket
+        self.tracker = tracker
+        self.min_interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self.max_in_flight = min(max(1, max_in_flight), RECOGNITION_MAX_PENDING)
+        if tracker is not None:
+            # Tracked frames are recognized in order; more workers would only
+            # take frames off the pending slot to queue them on the tracker
+            self.max_in_flight = 1
+        self._latest: Optional[Dict[str, Any]] = None
+        self._frame_ready = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+        self._send_lock = asyncio.Lock()
+        self._next_start = 0.0
+        self.received_frames = 0
+        self.processed_frames = 0
+        self.dropped_frames = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "received_frames": self.received_frames,
+            "processed_frames": self.processed_frames,
+            "dropped_frames": self.dropped_frames
+        }
+
+    def submit(self, data: Dict[str, Any]) -> None:
+        """Make a frame the pending one, dropping any frame it replaces"""
+        self.received_frames += 1
+        if self._latest is not None:
+            self.dropped_frames += 1
+        self._latest = data
+        self._frame_ready.set()
+
+    async def _next_frame(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        while True:
+            while self._latest is None:
+                self._frame_ready.clear()
+                await self._frame_ready.wait()
+
+            async with self._start_lock:
+                # Pace to the target FPS. Frames arriving while we wait replace
+                # the pending one, so we always start on the newest frame.
+                delay = self._next_start - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                data = self._latest
+                if data is None:
+                    continue
+                self._latest = None
+                self._next_start = loop.time() + self.min_interval
+                return data
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def _send_error(self, message: str) -> None:
+        try:
+            await self.send({"success": False, "message": message})
+        except Exception as e:
+            print(f"Error sending frame result: {e}")
+
+    async def _worker(self) -> None:
+        while True:
+            data = await self._next_frame()
+            try:
+                image_args = frame_image_args(data)
+            except KeyError:
+                await self._send_error("Missing required field 'image_base64'")
+                continue
+
+            # A bad frame or a failed send must not stop the worker
+            try:
+                result = await process_frame(
+                    **image_args,
+                    threshold=float(data.get("threshold", 0.6)),
+                    location=data.get("location"),
+                    course_code=data.get("course_code"),
+                    global_fallback=bool(data.get("global_fallback", False)),
+                    detection=detection_options(data),
+                    tracker=self.tracker
+                )
+                if result.get("busy"):
+                    self.dropped_frames += 1
+                else:
+                    self.processed_frames += 1
+
+                result["frame_stats"] = self.stats()
+                if "frame_id" in data:
+                    result["frame_id"] = data["frame_id"]
+                await self.send(result)
+            except (ValueError, TypeError):
+                await self._send_error("Invalid frame data received")
+            except Exception as e:
+                print(f"Error processing frame: {e}")
+                await self._send_error(str(e))
+
+    async def run(self) -> None:
+        """Receive frames until the client disconnects"""
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.max_in_flight)]
+        try:
+            while True:
+                self.submit(await receive_frame(self.websocket))
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+async def process_frame(image_base64: Optional[str] = None, threshold: float = 0.6,
                         location: Optional[str] = None,
-                        course_code: Optional[str] = None) -> Dict[str, Any]:
+                        course_code: Optional[str] = None,
+                        global_fallback: bool = False,
+                        image_bytes=None,
+                        detection: Optional[Dict[str, Any]] = None,
+                        tracker: Optional[FaceTracker] = None) -> Dict[str, Any]:
     """
-    Process a frame using the recognize_faces function
+    Process a frame using the recognition executor
+    
+    The frame is either a base64 string (image_base64) or raw JPEG/PNG
+    bytes (image_bytes). detection holds optional per-request detection
+    options (see detection_options). With a tracker, faces already
+    identified in earlier frames are not recognized again.
     """
     try:
-        result = recognize_faces(
-            image_base64=image_base64,
-            location=location,
-            threshold=threshold,
-            course_code=course_code  
-        )
+        if tracker is not None:
+            result = await recognition_executor.recognize_tracked(
+                tracker,
+                image_base64=image_base64,
+                location=location,
+                threshold=threshold,
+                course_code=course_code,
+                global_fallback=global_fallback,
+                image_bytes=image_bytes,
+                detection=detection,
+                wait=False
+            )
+        else:
+            result = await recognition_executor.recognize(
+                image_base64=image_base64,
+                location=location,
+                threshold=threshold,
+                course_code=course_code,
+                global_fallback=global_fallback,
+                image_bytes=image_bytes,
+                detection=detection,
+                wait=False
+            )
         
-        return {
+        response = {
             "success": result.get("success", False),
             "message": result.get("message", ""),
             "students": result.get("students", []),
@@ -49,7 +233,22 @@ async def process_frame(image_base64: str, threshold: float = 0.6,
             "recognized_count": len(result.get("students", [])),
             "unknown_count": len(result.get("unknown_faces", []))
         }
+        if tracker is not None:
+            response["tracked_count"] = result.get("tracked_count", 0)
+        return response
         
+    except RecognitionBusy as e:
+        return {
+            "success": False,
+            "busy": True,
+            "message": str(e),
+            "students": [],
+            "unknown_faces": [],
+            "attendance_results": [],
+            "total_faces_detected": 0,
+            "recognized_count": 0,
+            "unknown_count": 0
+        }
     except Exception as e:
         print(f"Error processing frame: {e}")
         return {
@@ -65,27 +264,55 @@ async def process_frame(image_base64: str, threshold: float = 0.6,
 
 @router.websocket("/face-recognition")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Recognize faces in frames sent over a WebSocket
+
+    Frames are JSON text messages with image_base64, or binary messages with
+    raw image bytes (see receive_frame).
+
+    Query parameters:
+        mode: "sequential" (default) answers every frame in order;
+            "latest" only processes the newest frame and drops stale ones
+        target_fps: Maximum frames started per second in "latest" mode
+        max_in_flight: Frames recognized concurrently in "latest" mode
+        tracking: "true" to follow faces across frames, so a face that was
+            already identified is not encoded, matched or checked for
+            attendance again until its track's confidence decays
+    """
     await websocket.accept()
+    tracker = FaceTracker() if websocket.query_params.get("tracking", "").lower() in ("1", "true", "yes") else None
     try:
-        while True:
-            data = await websocket.receive_json()
-            
-            result = await process_frame(
-                image_base64=data["image_base64"],
-                threshold=float(data.get("threshold", 0.6)),
-                location=data.get("location"),
-                course_code=data.get("course_code")  # Extract course_code from request
+        if websocket.query_params.get("mode") == "latest":
+            session = LatestFrameSession(
+                websocket,
+                target_fps=float(websocket.query_params.get("target_fps", REALTIME_TARGET_FPS)),
+                max_in_flight=int(websocket.query_params.get("max_in_flight", REALTIME_MAX_IN_FLIGHT)),
+                tracker=tracker
             )
+            await session.run()
+        else:
+            while True:
+                data = await receive_frame(websocket)
+            
+                result = await process_frame(
+                    **frame_image_args(data),
+                    threshold=float(data.get("threshold", 0.6)),
+                    location=data.get("location"),
+                    course_code=data.get("course_code"),  # Extract course_code from request
+                    global_fallback=bool(data.get("global_fallback", False)),
+                    detection=detection_options(data),
+                    tracker=tracker
+                )
             
-            await websocket.send_json(result)
+                await websocket.send_json(result)
             
     except WebSocketDisconnect:
         manager.disconnect(websocket)
         print("WebSocket disconnected")
-    except json.JSONDecodeError:
+    except ValueError:  # includes json.JSONDecodeError
         await websocket.send_json({
             "success": False,
-            "message": "Invalid JSON data received"
+            "message": "Invalid frame data received"
         })
     except KeyError:
         await websocket.send_json({
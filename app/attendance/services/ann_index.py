@@ -0,0 +1,245 @@
+import os
+import threading
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+EMBEDDING_DIM = 128
+
+
+def _sq_distances(queries: np.ndarray, vectors: np.ndarray, sq_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """Squared Euclidean distance between every query and every vector"""
+    if sq_norms is None:
+        sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+    sq_dist = np.einsum("ij,ij->i", queries, queries)[:, None] + sq_norms[None, :]
+    sq_dist -= 2.0 * (queries @ vectors.T)
+    return np.maximum(sq_dist, 0.0, out=sq_dist)
+
+
+def _top_k(sq_dist: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Pick the k smallest distances of a single query, padded with -1/inf"""
+    out_ids = np.full(k, -1, dtype=np.int64)
+    out_dist = np.full(k, np.inf, dtype=np.float32)
+    n = min(k, len(ids))
+    if n == 0:
+        return out_ids, out_dist
+    best = np.argpartition(sq_dist, n - 1)[:n] if n < len(ids) else np.arange(len(ids))
+    best = best[np.argsort(sq_dist[best])]
+    out_ids[:n] = ids[best]
+    out_dist[:n] = np.sqrt(sq_dist[best])
+    return out_ids, out_dist
+
+
+class IVFIndex:
+    """
+    Inverted-file index in pure NumPy.
+
+    A k-means coarse quantizer splits the gallery into ``nlist`` cells and a
+    query is only compared against the vectors of its ``nprobe`` closest
+    cells, so per-query cost is roughly N * nprobe / nlist instead of N.
+    Vectors are stored uncompressed, so the distances returned are exact for
+    the candidates that were visited.
+
+    Knobs:
+        nlist: number of cells. More cells means smaller scans but lower recall
+            for the same nprobe. Around sqrt(N) is a good starting point.
+        nprobe: number of cells visited per query. Raising it trades latency
+            for recall; nprobe == nlist is an exact search.
+        train_iters: k-means iterations used when training the quantizer.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim: int = EMBEDDING_DIM, nlist: int = 64, nprobe: int = 8,
+                 train_iters: int = 20, seed: int = 0):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iters = train_iters
+        self.seed = seed
+        self._lock = threading.RLock()
+        self.centroids: Optional[np.ndarray] = None
+        self._centroid_norms: Optional[np.ndarray] = None
+        self._lists: list = []
+        self._id_to_list: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._id_to_list)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, max_points_per_cell: int = 256) -> None:
+        """
+        Train the coarse quantizer with k-means
+
+        Args:
+            vectors: (N, dim) training vectors, usually the gallery itself
+            max_points_per_cell: Subsample the training set to at most
+                nlist * max_points_per_cell vectors to bound training time
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        rng = np.random.default_rng(self.seed)
+
+        nlist = min(self.nlist, len(vectors))
+        if nlist == 0:
+            raise ValueError("Cannot train an IVF index without vectors")
+        if len(vectors) > nlist * max_points_per_cell:
+            vectors = vectors[rng.choice(len(vectors), nlist * max_points_per_cell, replace=False)]
+
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(self.train_iters):
+            assign = np.argmin(_sq_distances(vectors, centroids), axis=1)
+            counts = np.bincount(assign, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            if empty.any():
+                # Re-seed empty cells with random training points
+                centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+
+        with self._lock:
+            self.nlist = nlist
+            self.centroids = centroids
+            self._centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+            self._lists = [
+                (np.empty((0, self.dim), dtype=np.float32), np.empty(0, dtype=np.int64))
+                for _ in range(nlist)
+            ]
+            self._id_to_list = {}
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmin(_sq_distances(vectors, self.centroids, self._centroid_norms), axis=1)
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Insert vectors, replacing any existing entries with the same ids
+
+        Args:
+            vectors: (N, dim) vectors to insert
+            ids: (N,) integer ids returned by search
+        """
+        if not self.is_trained:
+            raise RuntimeError("IVF index must be trained before adding vectors")
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        assign = self._assign(vectors)
+
+        with self._lock:
+            self.remove(ids)
+            for cell in np.unique(assign):
+                mask = assign == cell
+                cell_vectors, cell_ids = self._lists[cell]
+                # Swap in a new tuple so concurrent searches see either the old
+                # or the new cell contents, never a partial update
+                self._lists[cell] = (
+                    np.vstack([cell_vectors, vectors[mask]]),
+                    np.concatenate([cell_ids, ids[mask]])
+                )
+                for vector_id in ids[mask]:
+                    self._id_to_list[int(vector_id)] = int(cell)
+
+    def remove(self, ids: np.ndarray) -> None:
+        with self._lock:
+            cells = {self._id_to_list.pop(int(i)) for i in np.asarray(ids).reshape(-1) if int(i) in self._id_to_list}
+            for cell in cells:
+                cell_vectors, cell_ids = self._lists[cell]
+                keep = ~np.isin(cell_ids, ids)
+                self._lists[cell] = (cell_vectors[keep], cell_ids[keep])
+
+    def search(self, queries: np.ndarray, k: int = 1, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the approximate k nearest stored vectors for each query
+
+        Args:
+            queries: (M, dim) array of query vectors
+            k: Number of neighbours to return
+            nprobe: Optional override of the number of cells to visit
+
+        Returns:
+            Tuple of (ids, distances), both (M, k). Missing neighbours are -1/inf.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        out_dist = np.full((len(queries), k), np.inf, dtype=np.float32)
+        if not self.is_trained or not len(queries):
+            return out_ids, out_dist
+
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_dist = _sq_distances(queries, self.centroids, self._centroid_norms)
+        if nprobe < self.nlist:
+            probes = np.argpartition(centroid_dist, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), (len(queries), self.nlist))
+
+        lists = self._lists
+        for m, query in enumerate(queries):
+            cells = [lists[cell] for cell in probes[m]]
+            cell_ids = np.concatenate([cell[1] for cell in cells])
+            if not len(cell_ids):
+                continue
+            cell_vectors = np.concatenate([cell[0] for cell in cells])
+            sq_dist = _sq_distances(query[None, :], cell_vectors)[0]
+            out_ids[m], out_dist[m] = _top_k(sq_dist, cell_ids, k)
+        return out_ids, out_dist
+
+    def save(self, path: str) -> None:
+        """Persist the quantizer and inverted lists to a local .npz file"""
+        lists = self._lists
+        vectors = np.concatenate([cell[0] for cell in lists]) if lists else np.empty((0, self.dim), dtype=np.float32)
+        ids = np.concatenate([cell[1] for cell in lists]) if lists else np.empty(0, dtype=np.int64)
+        offsets = np.cumsum([0] + [len(cell[1]) for cell in lists])
+
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            kind=self.kind,
+            params=np.array([self.dim, self.nlist, self.nprobe, self.train_iters, self.seed]),
+            centroids=self.centroids if self.centroids is not None else np.empty((0, self.dim), dtype=np.float32),
+            vectors=vectors,
+            ids=ids,
+            offsets=offsets
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path) as data:
+            dim, nlist, nprobe, train_iters, seed = (int(v) for v in data["params"])
+            index = cls(dim=dim, nlist=nlist, nprobe=nprobe, train_iters=train_iters, seed=seed)
+            centroids = data["centroids"]
+            if len(centroids):
+                index.centroids = centroids
+                index._centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+                vectors, ids, offsets = data["vectors"], data["ids"], data["offsets"]
+                index._lists = [
+                    (vectors[offsets[c]:offsets[c + 1]], ids[offsets[c]:offsets[c + 1]])
+                    for c in range(len(centroids))
+                ]
+                index._id_to_list = {
+                    int(vector_id): c
+                    for c in range(len(centroids))
+                    for vector_id in ids[offsets[c]:offsets[c + 1]]
+                }
+        return index
+
+    def reset(self) -> None:
+        """Drop all stored vectors but keep the trained quantizer"""
+        with self._lock:
+            self._lists = [
+                (np.empty((0, self.dim), dtype=np.float32), np.empty(0, dtype=np.int64))
+                for _ in range(self.nlist)
+            ]
+            self._id_to_list = {}
+
+
+def load_index(path: str) -> IVFIndex:
+    """Load a persisted IVFIndex"""
+    with np.load(path) as data:
+        kind = str(data["kind"])
+    if kind != IVFIndex.kind:
+        raise ValueError(f"Unknown face index kind: {kind}")
+    return IVFIndex.load(path)
@@ -1,6 +1,13 @@
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-from db.supabase import get_attendance_today,get_course_details,get_student_course_attendance_today
+from typing import Dict, Any, List, Optional
+from db.supabase import get_attendance_today,get_course_details,get_course_attendance_today
+from db.marked_attendance import marked_today
+from utils.ttl_cache import TTLCache
+from config import COURSE_SCHEDULE_CACHE_TTL
+
+# Parsed course schedules shared by the manual, face and realtime paths.
+# Schedules rarely change; course_updated cache events drop them early.
+course_schedules = TTLCache("course_schedules", COURSE_SCHEDULE_CACHE_TTL)
 
 def can_mark_attendance(reg_number: str, attendance_window_hours: int = 2) -> Dict[str, Any]:
     """
@@ -86,6 +93,251 @@ def can_mark_attendance(reg_number: str, attendance_window_hours: int = 2) -> Di
         print(traceback.format_exc())
         return {"can_mark": False, "message": f"Error: {str(e)}"}  
 
+def _parse_course_time(value: Any, label: str) -> Dict[str, Any]:
+    """
+    Parse a course start/end time from the database
+    
+    Args:
+        value: Time as an "HH:MM" / "HH:MM:SS" string or a time object
+        label: "start" or "end", used in the error message
+        
+    Returns:
+        Dictionary with the parsed time, or an attendance check error
+    """
+    if not isinstance(value, str):
+        # If it's already a time object
+        return {"success": True, "time": value}
+    
+    if ":" not in value:
+        # If it's just a number of seconds or other format
+        print(f"Warning: Unexpected time format: {value}")
+        return {
+            "success": False,
+            "check": {
+                "can_mark": False,
+                "status": None,
+                "message": f"Invalid time format for course {label} time: {value}"
+            }
+        }
+    
+    # Handle different time formats
+    if value.count(":") == 1:  # HH:MM
+        return {"success": True, "time": datetime.strptime(value, "%H:%M").time()}
+    return {"success": True, "time": datetime.strptime(value, "%H:%M:%S").time()}  # HH:MM:SS
+
+
+def _load_course_schedule(course_code: str) -> Dict[str, Any]:
+    """
+    Fetch a course and parse its schedule once, for the schedule cache
+    
+    Args:
+        course_code: Course code
+        
+    Returns:
+        Dictionary with day_of_week, the parsed start/end times (results of
+        _parse_course_time) and the raw time strings, or an attendance
+        check error under "check"
+    """
+    course_details = get_course_details(course_code)
+    if not course_details["success"]:
+        return {
+            "success": False,
+            "check": {
+                "can_mark": False,
+                "status": None,
+                "message": f"Error fetching course details: {course_details['message']}"
+            }
+        }
+    
+    start_time_str = course_details["data"]["start_time"]
+    end_time_str = course_details["data"]["end_time"]
+    return {
+        "success": True,
+        "day_of_week": course_details["data"]["day_of_week"],
+        "start_time": _parse_course_time(start_time_str, "start"),
+        "end_time": _parse_course_time(end_time_str, "end"),
+        "start_time_str": start_time_str,
+        "end_time_str": end_time_str
+    }
+
+
+def get_course_schedule(course_code: str) -> Dict[str, Any]:
+    """
+    Get a course's parsed schedule from the shared schedule cache
+    
+    Args:
+        course_code: Course code
+        
+    Returns:
+        See _load_course_schedule. Failed lookups are not cached.
+    """
+    return course_schedules.get(course_code, _load_course_schedule, cache_if=lambda schedule: schedule["success"])
+
+
+def invalidate_course_schedule(course_code: Optional[str] = None, changed_at: Optional[float] = None) -> None:
+    """
+    Drop a cached course schedule, or all of them
+    
+    Args:
+        course_code: Course code (default: every course)
+        changed_at: Unix time the course changed, for the cache metrics
+    """
+    course_schedules.invalidate(course_code, changed_at)
+
+
+def _get_course_window(course_code: str, current_time: datetime) -> Dict[str, Any]:
+    """
+    Look up a course and work out today's attendance window
+    
+    Args:
+        course_code: Course code to check attendance for
+        current_time: Current time
+        
+    Returns:
+        Dictionary with course_start/course_end datetimes and the raw time
+        strings, or an attendance check error under "check"
+    """
+    # Get today's day of week
+    day_of_week = current_time.strftime("%A")  # Returns Monday, Tuesday, etc.
+    
+    # Get course schedule for the given course code
+    schedule = get_course_schedule(course_code)
+    if not schedule["success"]:
+        return schedule
+        
+    # Check if course is scheduled for today
+    if schedule["day_of_week"] != day_of_week:
+        return {
+            "success": False,
+            "check": {
+                "can_mark": False,
+                "status": None,
+                "message": f"Course {course_code} is not scheduled for today ({day_of_week})"
+            }
+        }
+        
+    # Start and end times were parsed when the schedule was cached
+    start_time = schedule["start_time"]
+    if not start_time["success"]:
+        return start_time
+    end_time = schedule["end_time"]
+    if not end_time["success"]:
+        return end_time
+    
+    # Create datetime objects for today's course start and end times
+    course_date = current_time.date()
+    return {
+        "success": True,
+        "course_start": datetime.combine(course_date, start_time["time"]),
+        "course_end": datetime.combine(course_date, end_time["time"]),
+        "start_time_str": schedule["start_time_str"],
+        "end_time_str": schedule["end_time_str"]
+    }
+
+
+def _check_course_window(window: Dict[str, Any], current_time: datetime) -> Dict[str, Any]:
+    """
+    Decide the attendance status for the current time within a course window
+    
+    Args:
+        window: Result of _get_course_window
+        current_time: Current time
+        
+    Returns:
+        Dictionary with result indicating if attendance can be marked and status
+    """
+    course_start = window["course_start"]
+    course_end = window["course_end"]
+    
+    # Define time windows
+    one_hour_before_start = course_start - timedelta(hours=1)
+    one_hour_after_start = course_start + timedelta(hours=1)
+    
+    # Determine attendance status based on current time
+    if one_hour_before_start <= current_time < course_start:
+        # Within one hour before course starts - mark as "present"
+        return {
+            "can_mark": True,
+            "status": "present",
+            "message": "Can mark attendance as present"
+        }
+    elif course_start <= current_time < one_hour_after_start:
+        # Within one hour after course starts - also mark as "present"
+        return {
+            "can_mark": True,
+            "status": "present",
+            "message": "Can mark attendance as present"
+        }
+    elif one_hour_after_start <= current_time < course_end:
+        # After one hour from start but before end - mark as "late"
+        return {
+            "can_mark": True,
+            "status": "late",
+            "message": "Can mark attendance as late"
+        }
+    else:
+        # Outside valid attendance windows
+        if current_time < one_hour_before_start:
+            return {
+                "can_mark": False,
+                "status": None,
+                "message": f"Too early to mark attendance. Course starts at {window['start_time_str']}"
+            }
+        else:
+            return {
+                "can_mark": False,
+                "status": None,
+                "message": f"Too late to mark attendance. Course ended at {window['end_time_str']}"
+            }
+
+
+def _last_marked_today(course_code: str, reg_numbers: List[str], confirm: List[str]) -> Dict[str, Any]:
+    """
+    Find which students already have attendance for a course today
+    
+    The course is seeded into marked_today with one query the first time it
+    is seen each day; after that known students are a set lookup. Students
+    in ``confirm`` that the set does not know about are re-checked against
+    the database, since another instance may have marked them.
+    
+    Args:
+        course_code: Course code
+        reg_numbers: Students to look up
+        confirm: Students the caller is about to mark
+        
+    Returns:
+        Dictionary with success flag and data mapping reg_number to the
+        timestamp of its latest log today (only students that have one)
+    """
+    seeded_now = False
+    if not marked_today.is_seeded(course_code):
+        attendance_today = get_course_attendance_today(course_code)
+        if not attendance_today["success"]:
+            return attendance_today
+        marked_today.seed(
+            course_code,
+            ((record["reg_number"], record["timestamp"]) for record in attendance_today["data"])
+        )
+        seeded_now = True
+    
+    last_marked = {}
+    for reg_number in reg_numbers:
+        timestamp = marked_today.last_marked(course_code, reg_number)
+        if timestamp:
+            last_marked[reg_number] = timestamp
+    
+    unknown = [reg_number for reg_number in confirm if reg_number not in last_marked]
+    if unknown and not seeded_now:
+        attendance_today = get_course_attendance_today(course_code, unknown)
+        if not attendance_today["success"]:
+            return attendance_today
+        for record in attendance_today["data"]:
+            if record["reg_number"] not in last_marked:
+                last_marked[record["reg_number"]] = record["timestamp"]
+                marked_today.mark(course_code, record["reg_number"], record["timestamp"])
+    
+    return {"success": True, "data": last_marked}
+
 def can_mark_attendance_for_course(
     reg_number: str, 
     course_code: str = None,
@@ -113,76 +365,17 @@ def can_mark_attendance_for_course(
                 "status": None,
                 "message": "No course code provided"
             }
-            
-        # Get today's day of week
-        day_of_week = current_time.strftime("%A")  # Returns Monday, Tuesday, etc.
         
-        # Get course schedule for the given course code
-        course_details = get_course_details(course_code)
-        if not course_details["success"]:
-            return {
-                "can_mark": False,
-                "status": None,
-                "message": f"Error fetching course details: {course_details['message']}"
-            }
-            
-        # Check if course is scheduled for today
-        if course_details["data"]["day_of_week"] != day_of_week:
-            return {
-                "can_mark": False,
-                "status": None,
-                "message": f"Course {course_code} is not scheduled for today ({day_of_week})"
-            }
-            
-        # Parse course start and end times
-        start_time_str = course_details["data"]["start_time"]
-        end_time_str = course_details["data"]["end_time"]
-        
-        # Create datetime objects for today's course start and end times
-        course_date = current_time.date()
-        
-        # Handle time format (assuming HH:MM:SS format, but being flexible)
-        if isinstance(start_time_str, str):
-            if ":" in start_time_str:
-                # Handle different time formats
-                if start_time_str.count(":") == 1:  # HH:MM
-                    start_time = datetime.strptime(start_time_str, "%H:%M").time()
-                else:  # HH:MM:SS
-                    start_time = datetime.strptime(start_time_str, "%H:%M:%S").time()
-            else:
-                # If it's just a number of seconds or other format
-                print(f"Warning: Unexpected time format: {start_time_str}")
-                return {
-                    "can_mark": False,
-                    "status": None,
-                    "message": f"Invalid time format for course start time: {start_time_str}"
-                }
-        else:
-            # If it's already a time object
-            start_time = start_time_str
-            
-        # Same for end time
-        if isinstance(end_time_str, str):
-            if ":" in end_time_str:
-                if end_time_str.count(":") == 1:  # HH:MM
-                    end_time = datetime.strptime(end_time_str, "%H:%M").time()
-                else:  # HH:MM:SS
-                    end_time = datetime.strptime(end_time_str, "%H:%M:%S").time()
-            else:
-                print(f"Warning: Unexpected time format: {end_time_str}")
-                return {
-                    "can_mark": False,
-                    "status": None,
-                    "message": f"Invalid time format for course end time: {end_time_str}"
-                }
-        else:
-            end_time = end_time_str
-            
-        course_start = datetime.combine(course_date, start_time)
-        course_end = datetime.combine(course_date, end_time)
+        window = _get_course_window(course_code, current_time)
+        if not window["success"]:
+            return window["check"]
+        
+        window_check = _check_course_window(window, current_time)
         
         # Check if student has already marked attendance for this course today
-        attendance_today = get_student_course_attendance_today(reg_number, course_code)
+        attendance_today = _last_marked_today(
+            course_code, [reg_number], [reg_number] if window_check["can_mark"] else []
+        )
         if not attendance_today["success"]:
             return {
                 "can_mark": False,
@@ -190,61 +383,91 @@ def can_mark_attendance_for_course(
                 "message": f"Error checking attendance: {attendance_today['message']}"
             }
             
-        if attendance_today["data"]:
+        if reg_number in attendance_today["data"]:
             # Student has already marked attendance for this course today
             return {
                 "can_mark": False,
                 "status": None,
                 "message": "Attendance already marked for this course today",
-                "last_marked": attendance_today["data"][0]["timestamp"]
+                "last_marked": attendance_today["data"][reg_number]
             }
-            
-        # Define time windows
-        one_hour_before_start = course_start - timedelta(hours=1)
-        one_hour_after_start = course_start + timedelta(hours=1)
         
-        # Determine attendance status based on current time
-        if one_hour_before_start <= current_time < course_start:
-            # Within one hour before course starts - mark as "present"
-            return {
-                "can_mark": True,
-                "status": "present",
-                "message": "Can mark attendance as present"
-            }
-        elif course_start <= current_time < one_hour_after_start:
-            # Within one hour after course starts - also mark as "present"
-            return {
-                "can_mark": True,
-                "status": "present",
-                "message": "Can mark attendance as present"
-            }
-        elif one_hour_after_start <= current_time < course_end:
-            # After one hour from start but before end - mark as "late"
-            return {
-                "can_mark": True,
-                "status": "late",
-                "message": "Can mark attendance as late"
+        return window_check
+    
+    except Exception as e:
+        import traceback
+        print(f"Error checking if attendance can be marked for course: {e}")
+        print(traceback.format_exc())
+        return {"can_mark": False, "status": None, "message": f"Error: {str(e)}"}
+
+def can_mark_attendance_for_course_batch(
+    reg_numbers: List[str],
+    course_code: str,
+    current_time: datetime = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Check attendance eligibility for many students of one course at once
+    
+    Uses the cached course schedule and the in-memory marked_today set, so
+    students seen again after marking cost no database round-trip.
+    
+    Args:
+        reg_numbers: Student registration numbers
+        course_code: Course code to check attendance for
+        current_time: Current time (defaults to now if not provided)
+        
+    Returns:
+        Dictionary mapping each reg_number to the same result structure as
+        can_mark_attendance_for_course
+    """
+    try:
+        if not current_time:
+            current_time = datetime.now()
+        
+        if not course_code:
+            check = {"can_mark": False, "status": None, "message": "No course code provided"}
+            return {reg_number: dict(check) for reg_number in reg_numbers}
+        
+        window = _get_course_window(course_code, current_time)
+        if not window["success"]:
+            return {reg_number: dict(window["check"]) for reg_number in reg_numbers}
+        
+        window_check = _check_course_window(window, current_time)
+        
+        # Check which students already marked attendance for this course today
+        attendance_today = _last_marked_today(
+            course_code, reg_numbers, reg_numbers if window_check["can_mark"] else []
+        )
+        if not attendance_today["success"]:
+            check = {
+                "can_mark": False,
+                "status": None,
+                "message": f"Error checking attendance: {attendance_today['message']}"
             }
-        else:
-            # Outside valid attendance windows
-            if current_time < one_hour_before_start:
-                return {
+            return {reg_number: dict(check) for reg_number in reg_numbers}
+        
+        last_marked = attendance_today["data"]
+        results = {}
+        for reg_number in reg_numbers:
+            if reg_number in last_marked:
+                results[reg_number] = {
                     "can_mark": False,
                     "status": None,
-                    "message": f"Too early to mark attendance. Course starts at {start_time_str}"
+                    "message": "Attendance already marked for this course today",
+                    "last_marked": last_marked[reg_number]
                 }
             else:
-                return {
-                    "can_mark": False,
-                    "status": None,
-                    "message": f"Too late to mark attendance. Course ended at {end_time_str}"
-                }
+                results[reg_number] = dict(window_check)
+        return results
     
     except Exception as e:
         import traceback
         print(f"Error checking if attendance can be marked for course: {e}")
         print(traceback.format_exc())
-        return {"can_mark": False, "status": None, "message": f"Error: {str(e)}"}
+        return {
+            reg_number: {"can_mark": False, "status": None, "message": f"Error: {str(e)}"}
+            for reg_number in reg_numbers
+        }
 
 def get_attendance_stats(reg_number: str, days: int = 30) -> Dict[str, Any]:
     """
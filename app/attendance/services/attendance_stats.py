@@ -0,0 +1,98 @@
+from datetime import date
+from typing import Dict, Any, Optional
+
+from db.supabase import get_course_daily_stats, get_course_session_counts, get_student_course_stats
+from utils.attendance_rates import summarize_counters, with_percentage
+
+
+def get_course_summary(course_code: str, start_date: Optional[date] = None,
+                       end_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Attendance rates of a course, overall and per day
+    
+    Args:
+        course_code: Course code
+        start_date: First day to include (default: all)
+        end_date: Last day to include (default: all)
+        
+    Returns:
+        Dictionary with the course totals, the number of sessions and a
+        per-day breakdown
+    """
+    result = get_course_daily_stats(course_code, start_date, end_date)
+    if not result["success"]:
+        return result
+    
+    days = [dict(row, **summarize_counters([row])) for row in result["data"]]
+    return {
+        "success": True,
+        "data": {
+            "course_code": course_code,
+            "sessions": len(days),
+            **summarize_counters(result["data"]),
+            "days": days
+        }
+    }
+
+
+def get_course_student_summary(course_code: str) -> Dict[str, Any]:
+    """
+    Per-student attendance percentages for a course
+    
+    Args:
+        course_code: Course code
+        
+    Returns:
+        Dictionary with the course's number of sessions and one entry per
+        student who has attendance logged
+    """
+    sessions = get_course_session_counts([course_code])
+    if not sessions["success"]:
+        return sessions
+    
+    students = get_student_course_stats(course_code=course_code)
+    if not students["success"]:
+        return students
+    
+    course_sessions = sessions["data"][course_code]
+    return {
+        "success": True,
+        "data": {
+            "course_code": course_code,
+            "sessions": course_sessions,
+            "students": [with_percentage(row, course_sessions) for row in students["data"]]
+        }
+    }
+
+
+def get_student_summary(reg_number: str, course_code: Optional[str] = None) -> Dict[str, Any]:
+    """
+    A student's attendance percentage in each of their courses
+    
+    Args:
+        reg_number: Student registration number
+        course_code: Only this course
+        
+    Returns:
+        Dictionary with the student's overall counters and a per-course
+        breakdown
+    """
+    students = get_student_course_stats(reg_number=reg_number, course_code=course_code)
+    if not students["success"]:
+        return students
+    
+    sessions = get_course_session_counts([row["course_code"] for row in students["data"]])
+    if not sessions["success"]:
+        return sessions
+    
+    return {
+        "success": True,
+        "data": {
+            "reg_number": reg_number,
+            **summarize_counters(students["data"]),
+            "courses": [
+                with_percentage(row, sessions["data"][row["course_code"]])
+                for row in students["data"]
+            ]
+        }
+    }
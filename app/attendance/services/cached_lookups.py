@@ -0,0 +1,17 @@
+from typing import Dict, Any
+from db.supabase import get_student_profile
+from utils.ttl_cache import TTLCache
+from config import STUDENT_PROFILE_CACHE_TTL
+
+# Invalidated by cache events (see controllers/cache_controller.py); the TTL
+# only matters when an event is lost
+student_profiles = TTLCache("student_profiles", STUDENT_PROFILE_CACHE_TTL)
+
+
+def _succeeded(result: Dict[str, Any]) -> bool:
+    return bool(result.get("success"))
+
+
+def get_cached_student_profile(reg_number: str) -> Dict[str, Any]:
+    """Cached get_student_profile (lookup failures are not cached)"""
+    return student_profiles.get(reg_number, get_student_profile, cache_if=_succeeded)
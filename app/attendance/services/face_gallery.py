@@ -0,0 +1,649 @@
+import os
+import time
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple, Callable
+from config import (
+    FACE_INDEX_TYPE,
+    FACE_INDEX_MIN_SIZE,
+    FACE_INDEX_NLIST,
+    FACE_INDEX_NPROBE,
+    FACE_INDEX_PATH,
+    FACE_REFINE_CANDIDATES,
+    COURSE_GALLERY_TTL
+)
+from services.ann_index import IVFIndex, load_index
+
+EMBEDDING_DIM = 128
+
+
+class GalleryState(NamedTuple):
+    embeddings: np.ndarray  # (N, 128) float32, C-contiguous; each student's centroid
+    sq_norms: np.ndarray    # (N,) float32, squared L2 norm of each row
+    reg_numbers: List[str]
+    names: List[str]
+    index: Dict[str, int]   # reg_number -> row
+    samples: np.ndarray         # (S, 128) float32, the embeddings behind each centroid
+    sample_sq_norms: np.ndarray  # (S,) float32
+    sample_starts: np.ndarray   # (N,) first samples row of each student
+    sample_counts: np.ndarray   # (N,) number of samples of each student (0 = centroid only)
+
+
+def _empty_samples(rows: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    return (
+        np.empty((0, EMBEDDING_DIM), dtype=np.float32),
+        np.empty(0, dtype=np.float32),
+        np.zeros(rows, dtype=np.int64),
+        np.zeros(rows, dtype=np.int64)
+    )
+
+
+def _empty_state() -> GalleryState:
+    return GalleryState(
+        np.empty((0, EMBEDDING_DIM), dtype=np.float32),
+        np.empty(0, dtype=np.float32),
+        [],
+        [],
+        {},
+        *_empty_samples()
+    )
+
+
+def sample_rows(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Indices of the samples of several students, student by student
+
+    Args:
+        starts: First samples row of each student
+        counts: Number of samples of each student
+
+    Returns:
+        1-D int64 array of sum(counts) sample rows
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    packed_starts = np.cumsum(counts) - counts
+    return np.repeat(np.asarray(starts, dtype=np.int64) - packed_starts, counts) + np.arange(total)
+
+
+def _sample_arrays(samples: Optional[np.ndarray], sample_counts: Optional[np.ndarray],
+                   rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Validate samples given in row order; returns (samples, counts)"""
+    if samples is None or sample_counts is None:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32), np.zeros(rows, dtype=np.int64)
+    samples = np.ascontiguousarray(samples, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+    counts = np.asarray(sample_counts, dtype=np.int64).reshape(-1)
+    if len(counts) != rows or int(counts.sum()) != len(samples):
+        raise ValueError("sample_counts does not match the samples")
+    return samples, counts
+
+
+class FaceGallery:
+    """
+    Resident copy of the Face_embeddings table used for matching.
+
+    Embeddings are kept as one contiguous float32 matrix with parallel
+    reg_number/name lists, so a whole frame can be matched with a single
+    matrix product instead of one face_distance call per stored face.
+    Writers build a new state and swap it in, so readers never see a
+    half-updated gallery and never need to take the lock.
+
+    Once the gallery reaches ``index_min_size`` faces and ``index_type`` is
+    "ivf", matching goes through an approximate IVF index instead of the
+    full scan. Queries the index cannot answer fall back to exact search.
+
+    A student may have several sample embeddings behind their row, which
+    holds their centroid. Matching searches the centroids for the
+    ``refine_candidates`` closest students and then compares the query with
+    those students' samples only, so extra photos per student improve
+    matches without multiplying the per-frame cost by the number of photos.
+    """
+
+    def __init__(self, index_type: str = FACE_INDEX_TYPE, index_min_size: int = FACE_INDEX_MIN_SIZE,
+                 nlist: int = FACE_INDEX_NLIST, nprobe: int = FACE_INDEX_NPROBE,
+                 index_path: Optional[str] = FACE_INDEX_PATH or None,
+                 refine_candidates: int = FACE_REFINE_CANDIDATES):
+        self._lock = threading.Lock()
+        # Serializes index writes to index_path, which happen outside _lock
+        self._save_lock = threading.Lock()
+        self._state = _empty_state()
+        self._ann: Optional[IVFIndex] = None
+        self._building = False
+        # Loads in progress, and the upserts made meanwhile for them to reapply
+        self._loading = 0
+        self._replay: List[Tuple[List[str], List[Optional[str]], np.ndarray, np.ndarray, np.ndarray]] = []
+        self.index_type = index_type
+        self.index_min_size = index_min_size
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.index_path = index_path
+        self.refine_candidates = refine_candidates
+        self.loaded = False
+        # Newest Face_embeddings.updated_at applied, and when the gallery was last synced (Unix time)
+        self.stamp: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        # Bumped on every write so derived views (e.g. per-course galleries) can tell they are stale
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._state.reg_numbers)
+
+    def load(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Replace the gallery contents
+
+        Args:
+            records: List of dictionaries with reg_number, name, and embedding
+        """
+        embeddings = np.empty((len(records), EMBEDDING_DIM), dtype=np.float32)
+        for row, record in enumerate(records):
+            embeddings[row] = record["embedding"]
+
+        self.load_matrix(
+            reg_numbers=[record["reg_number"] for record in records],
+            names=[record.get("name", "Unknown") for record in records],
+            embeddings=embeddings
+        )
+
+    def load_matrix(self, reg_numbers: List[str], names: List[str], embeddings: np.ndarray,
+                    samples: Optional[np.ndarray] = None, sample_counts: Optional[np.ndarray] = None) -> None:
+        """
+        Replace the gallery contents with an already decoded embedding matrix
+
+        Args:
+            reg_numbers: Registration number of each row
+            names: Student name of each row
+            embeddings: (N, 128) float32 matrix, used without copying when it
+                is already contiguous float32
+            samples: Optional (S, 128) sample embeddings, student by student
+                in row order
+            sample_counts: Number of samples of each row (with samples)
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        samples, counts = _sample_arrays(samples, sample_counts, len(reg_numbers))
+        starts = np.cumsum(counts) - counts
+
+        index = {}
+        for row, reg_number in enumerate(reg_numbers):
+            index[reg_number] = row
+
+        if len(index) < len(reg_numbers):
+            # Keep the last embedding seen for a student
+            rows = sorted(index.values())
+            embeddings = np.ascontiguousarray(embeddings[rows])
+            reg_numbers = [reg_numbers[row] for row in rows]
+            names = [names[row] for row in rows]
+            index = {reg_number: i for i, reg_number in enumerate(reg_numbers)}
+            samples = samples[sample_rows(starts[rows], counts[rows])]
+            counts = counts[rows]
+            starts = np.cumsum(counts) - counts
+
+        state = GalleryState(
+            embeddings=embeddings,
+            sq_norms=np.einsum("ij,ij->i", embeddings, embeddings),
+            reg_numbers=list(reg_numbers),
+            names=list(names),
+            index=index,
+            samples=samples,
+            sample_sq_norms=np.einsum("ij,ij->i", samples, samples),
+            sample_starts=starts,
+            sample_counts=counts
+        )
+        # Train outside the lock so writers are not held up by k-means;
+        # upserts made meanwhile are reapplied on top of the new state
+        with self._lock:
+            self._loading += 1
+            replay_from = len(self._replay)
+        try:
+            ann = self._build_index(state)
+            with self._lock:
+                self._state = state
+                self._ann = ann
+                self.loaded = True
+                self.version += 1
+                for reg_numbers, names, vectors, new_samples, new_counts in self._replay[replay_from:]:
+                    rows = self._apply_upsert(reg_numbers, names, vectors, new_samples, new_counts)
+                    if ann is not None:
+                        ann.add(vectors, rows)
+        finally:
+            with self._lock:
+                self._loading -= 1
+                if not self._loading:
+                    self._replay = []
+        self.save_index()
+
+    def _build_index(self, state: GalleryState) -> Optional[IVFIndex]:
+        """Build the approximate index for a state, or None when it should brute-force (no lock needed)"""
+        if self.index_type != "ivf" or len(state.reg_numbers) < self.index_min_size:
+            return None
+
+        nlist = self.nlist or max(1, int(np.sqrt(len(state.reg_numbers))))
+        index = None
+        if self.index_path and os.path.exists(self.index_path):
+            # Reuse the persisted quantizer so restarts skip k-means training
+            try:
+                stored = load_index(self.index_path)
+                if isinstance(stored, IVFIndex) and stored.is_trained and stored.nlist == nlist:
+                    index = stored
+                    index.reset()
+            except Exception as e:
+                print(f"Error loading face index from {self.index_path}: {e}")
+
+        if index is None:
+            index = IVFIndex(nlist=nlist, nprobe=self.nprobe)
+            index.train(state.embeddings)
+
+        index.nprobe = self.nprobe
+        index.add(state.embeddings, np.arange(len(state.reg_numbers)))
+        return index
+
+    def _start_index(self, state: GalleryState) -> None:
+        """Build the first index once upserts grow the gallery past index_min_size"""
+        try:
+            index = self._build_index(state)
+            while index is not None:
+                with self._lock:
+                    if self._ann is not None:
+                        # A concurrent load already built one
+                        return
+                    if self._state is state:
+                        self._ann = index
+                        break
+                    state = self._state
+                # Rows were upserted while training: index the current state instead
+                index.reset()
+                index.add(state.embeddings, np.arange(len(state.reg_numbers)))
+        finally:
+            self._building = False
+        self.save_index()
+
+    def save_index(self) -> None:
+        """Persist the approximate index, if any, to index_path"""
+        ann = self._ann
+        if ann is None or not self.index_path:
+            return
+        with self._save_lock:
+            try:
+                ann.save(self.index_path)
+            except Exception as e:
+                print(f"Error saving face index to {self.index_path}: {e}")
+
+    def upsert(self, reg_number: str, embedding: List[float], name: Optional[str] = None,
+               samples: Optional[np.ndarray] = None) -> None:
+        """
+        Add or replace the embedding for a single student
+
+        Args:
+            reg_number: Student registration number
+            embedding: The face embedding (centroid) as a list of floats
+            name: Optional student name
+            samples: Optional (K, 128) sample embeddings behind the centroid
+        """
+        if samples is not None:
+            samples = np.asarray(samples, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        self.upsert_many(
+            [reg_number], [name], np.asarray(embedding, dtype=np.float32).reshape(1, EMBEDDING_DIM),
+            samples, None if samples is None else [len(samples)]
+        )
+
+    def upsert_many(self, reg_numbers: List[str], names: List[Optional[str]], embeddings: np.ndarray,
+                    samples: Optional[np.ndarray] = None, sample_counts: Optional[np.ndarray] = None) -> None:
+        """
+        Add or replace the embeddings for several students with one copy of the gallery
+
+        Args:
+            reg_numbers: Student registration numbers
+            names: Student names (None keeps the stored name)
+            embeddings: (len(reg_numbers), 128) face embeddings (centroids)
+            samples: Optional sample embeddings, student by student; a
+                student's previous samples are replaced (dropped when
+                samples is None)
+            sample_counts: Number of samples of each student
+        """
+        if not len(reg_numbers):
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        new_samples, new_counts = _sample_arrays(samples, sample_counts, len(reg_numbers))
+
+        # Keep the last embedding given for a student
+        latest = {reg_number: i for i, reg_number in enumerate(reg_numbers)}
+        if len(latest) < len(reg_numbers):
+            keep = sorted(latest.values())
+            new_samples = new_samples[sample_rows((np.cumsum(new_counts) - new_counts)[keep], new_counts[keep])]
+            new_counts = new_counts[keep]
+            reg_numbers = [reg_numbers[i] for i in keep]
+            names = [names[i] for i in keep]
+            vectors = vectors[keep]
+
+        with self._lock:
+            rows = self._apply_upsert(reg_numbers, names, vectors, new_samples, new_counts)
+            if self._loading:
+                # A load is building its state; it applies these rows again
+                self._replay.append((reg_numbers, names, vectors, new_samples, new_counts))
+
+            indexed = self._ann is not None
+            if indexed:
+                self._ann.add(vectors, rows)
+            build = (not indexed and not self._building and self.index_type == "ivf"
+                     and len(self._state.reg_numbers) >= self.index_min_size)
+            if build:
+                self._building = True
+            state = self._state
+
+        if indexed:
+            self.save_index()
+        elif build:
+            self._start_index(state)
+
+    def _apply_upsert(self, reg_numbers: List[str], names: List[Optional[str]], vectors: np.ndarray,
+                      new_samples: np.ndarray, new_counts: np.ndarray) -> List[int]:
+        """Swap in a state with the given rows added or replaced; returns their rows (lock must be held)"""
+        state = self._state
+        index = dict(state.index)
+        all_reg_numbers = list(state.reg_numbers)
+        all_names = list(state.names)
+
+        rows = []
+        for reg_number, name in zip(reg_numbers, names):
+            row = index.get(reg_number)
+            if row is None:
+                row = index[reg_number] = len(all_reg_numbers)
+                all_reg_numbers.append(reg_number)
+                all_names.append(name or "Unknown")
+            elif name:
+                all_names[row] = name
+            rows.append(row)
+
+        # Always build a new matrix: the current one may be a read-only memory map
+        embeddings = np.empty((len(all_reg_numbers), EMBEDDING_DIM), dtype=np.float32)
+        embeddings[:len(state.reg_numbers)] = state.embeddings
+        embeddings[rows] = vectors
+        sq_norms = np.empty(len(all_reg_numbers), dtype=np.float32)
+        sq_norms[:len(state.reg_numbers)] = state.sq_norms
+        sq_norms[rows] = np.einsum("ij,ij->i", vectors, vectors)
+
+        # New samples go after the existing ones; the replaced ones are
+        # dropped once they make up most of the matrix
+        starts = np.zeros(len(all_reg_numbers), dtype=np.int64)
+        counts = np.zeros(len(all_reg_numbers), dtype=np.int64)
+        starts[:len(state.reg_numbers)] = state.sample_starts
+        counts[:len(state.reg_numbers)] = state.sample_counts
+        starts[rows] = len(state.samples) + np.cumsum(new_counts) - new_counts
+        counts[rows] = new_counts
+        all_samples = np.concatenate([state.samples, new_samples])
+        all_sample_sq_norms = np.concatenate([
+            state.sample_sq_norms, np.einsum("ij,ij->i", new_samples, new_samples)
+        ])
+        if counts.sum() * 2 < len(all_samples):
+            live = sample_rows(starts, counts)
+            all_samples, all_sample_sq_norms = all_samples[live], all_sample_sq_norms[live]
+            starts = np.cumsum(counts) - counts
+
+        self._state = GalleryState(
+            embeddings, sq_norms, all_reg_numbers, all_names, index,
+            all_samples, all_sample_sq_norms, starts, counts
+        )
+        self.version += 1
+        return rows
+
+    def use_mapped(self, state: GalleryState, embeddings: np.ndarray, samples: np.ndarray) -> bool:
+        """
+        Swap the matrices of a state for identical ones read from a snapshot
+
+        Lets the gallery go back to sharing the memory-mapped snapshot pages
+        after upserts gave it a private copy. Nothing changes when the
+        gallery has moved on from ``state`` in the meantime.
+
+        Args:
+            state: The state the snapshot was written from
+            embeddings: (N, 128) centroids of that state, e.g. a read-only memmap
+            samples: Its samples in row order, as returned by packed_samples
+
+        Returns:
+            True if the matrices were swapped in
+        """
+        counts = state.sample_counts
+        if embeddings.shape != state.embeddings.shape or len(samples) != int(counts.sum()):
+            return False
+        sample_sq_norms = state.sample_sq_norms[sample_rows(state.sample_starts, counts)]
+        with self._lock:
+            if self._state is not state:
+                return False
+            # Same contents, so views and caches keyed on version stay valid
+            self._state = state._replace(
+                embeddings=embeddings,
+                samples=samples,
+                sample_sq_norms=sample_sq_norms,
+                sample_starts=np.cumsum(counts) - counts
+            )
+        return True
+
+    def snapshot(self) -> GalleryState:
+        """The current gallery state (treat as read-only)"""
+        return self._state
+
+    def packed_samples(self, state: Optional[GalleryState] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The samples of every student in row order, without replaced ones
+
+        Returns:
+            Tuple of ((S, 128) samples, (N,) sample counts), as taken by
+            load_matrix
+        """
+        state = state if state is not None else self._state
+        return state.samples[sample_rows(state.sample_starts, state.sample_counts)], state.sample_counts
+
+    def distances(self, queries: np.ndarray, state: Optional[GalleryState] = None) -> np.ndarray:
+        """
+        Euclidean distance from every query to every stored embedding
+
+        Args:
+            queries: (M, 128) array of face encodings
+            state: Optional gallery state to use (defaults to the current one)
+
+        Returns:
+            (M, N) float32 array of distances
+        """
+        state = state if state is not None else self._state
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+
+        # ||q - g||^2 = ||q||^2 + ||g||^2 - 2 q.g
+        sq_dist = np.einsum("ij,ij->i", queries, queries)[:, None] + state.sq_norms[None, :]
+        sq_dist -= 2.0 * (queries @ state.embeddings.T)
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        return np.sqrt(sq_dist, out=sq_dist)
+
+    def match(self, queries: List[List[float]]) -> List[Tuple[Optional[Dict[str, Any]], float]]:
+        """
+        Find the closest stored face for each query embedding
+
+        Args:
+            queries: List of face embeddings
+
+        Returns:
+            List of (best_match, similarity) tuples, one per query. best_match is a
+            dictionary with reg_number and name, or None if the gallery is empty.
+            similarity is 1 - face distance, as used by recognize_faces.
+        """
+        state = self._state
+        if not queries:
+            return []
+        if not state.reg_numbers:
+            return [(None, -1) for _ in queries]
+
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        best_rows, best_dist = self._search(queries, state)
+
+        return [
+            (
+                {"reg_number": state.reg_numbers[row], "name": state.names[row]},
+                float(1 - distance)
+            )
+            for row, distance in zip(best_rows, best_dist)
+        ]
+
+    def subset(self, reg_numbers: List[str]) -> "FaceGallery":
+        """
+        Build a small exact-search gallery holding only the given students
+
+        Args:
+            reg_numbers: Registration numbers to keep. Students without a
+                registered face are skipped.
+
+        Returns:
+            A new FaceGallery sharing no state with this one
+        """
+        state = self._state
+        rows = [state.index[reg_number] for reg_number in dict.fromkeys(reg_numbers) if reg_number in state.index]
+        embeddings = np.ascontiguousarray(state.embeddings[rows])
+        samples = sample_rows(state.sample_starts[rows], state.sample_counts[rows])
+        counts = state.sample_counts[rows]
+
+        view = FaceGallery(index_type="exact", index_path=None, refine_candidates=self.refine_candidates)
+        view._state = GalleryState(
+            embeddings=embeddings,
+            sq_norms=state.sq_norms[rows],
+            reg_numbers=[state.reg_numbers[row] for row in rows],
+            names=[state.names[row] for row in rows],
+            index={state.reg_numbers[row]: i for i, row in enumerate(rows)},
+            samples=np.ascontiguousarray(state.samples[samples]),
+            sample_sq_norms=state.sample_sq_norms[samples],
+            sample_starts=np.cumsum(counts) - counts,
+            sample_counts=counts
+        )
+        view.loaded = True
+        return view
+
+    def _search(self, queries: np.ndarray, state: GalleryState) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest gallery row and its distance for each query"""
+        # Candidates worth refining only exist when some student has samples
+        k = min(max(1, self.refine_candidates), len(state.reg_numbers)) if len(state.samples) else 1
+
+        ann = self._ann
+        if ann is not None:
+            try:
+                ids, dist = ann.search(queries, k=k)
+                # Rows the index could not answer (empty cells, or rows newer than
+                # this state) are resolved with an exact scan
+                missing = (ids[:, 0] < 0) | (ids[:, 0] >= len(state.reg_numbers))
+                if missing.any():
+                    exact_ids, exact_dist = self._exact_candidates(queries[missing], state, k)
+                    ids[missing, :k] = exact_ids
+                    dist[missing, :k] = exact_dist
+                return self._best(queries, state, ids[:, :k], dist[:, :k])
+            except Exception as e:
+                print(f"Error searching face index, falling back to exact search: {e}")
+
+        return self._best(queries, state, *self._exact_candidates(queries, state, k))
+
+    def _exact_candidates(self, queries: np.ndarray, state: GalleryState, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The k nearest rows (unordered) and their distances for each query"""
+        dist = self.distances(queries, state)
+        if k == 1:
+            ids = np.argmin(dist, axis=1)[:, None]
+        else:
+            ids = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        return ids, np.take_along_axis(dist, ids, axis=1)
+
+    def _best(self, queries: np.ndarray, state: GalleryState, ids: np.ndarray,
+              dist: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pick each query's match among its candidate rows
+
+        A candidate's distance is the smallest of its centroid distance and
+        its distances to its own samples.
+        """
+        if ids.shape[1] == 1:
+            return ids[:, 0].copy(), dist[:, 0].astype(np.float32)
+
+        best_rows = np.empty(len(queries), dtype=np.int64)
+        best_dist = np.empty(len(queries), dtype=np.float32)
+        for i, query in enumerate(queries):
+            valid = (ids[i] >= 0) & (ids[i] < len(state.reg_numbers))
+            rows = ids[i][valid]
+            candidate_dist = dist[i][valid].astype(np.float32)
+
+            counts = state.sample_counts[rows]
+            if counts.any():
+                samples = sample_rows(state.sample_starts[rows], counts)
+                sq_dist = float(query @ query) + state.sample_sq_norms[samples] - 2.0 * (state.samples[samples] @ query)
+                sample_dist = np.sqrt(np.maximum(sq_dist, 0.0))
+                np.minimum.at(candidate_dist, np.repeat(np.arange(len(rows)), counts), sample_dist)
+
+            best = int(np.argmin(candidate_dist))
+            best_rows[i] = rows[best]
+            best_dist[i] = candidate_dist[best]
+        return best_rows, best_dist
+
+
+class CourseGalleryCache:
+    """
+    Per-course views of a FaceGallery restricted to the enrolled students.
+
+    Views are built from the course's enrollment list and rebuilt when the
+    enrollment list is older than ``ttl_seconds``, when invalidate() is
+    called for the course, or when a face is added to the parent gallery.
+    """
+
+    def __init__(self, gallery: FaceGallery, ttl_seconds: float = COURSE_GALLERY_TTL):
+        self.gallery = gallery
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # course_code -> (view, enrolled reg_numbers, gallery version, loaded at)
+        self._views: Dict[str, Tuple[FaceGallery, List[str], int, float]] = {}
+
+    def get(self, course_code: str, load_enrollments: Callable[[str], Optional[List[str]]]) -> Optional[FaceGallery]:
+        """
+        Get the gallery view for a course
+
+        Args:
+            course_code: Course code
+            load_enrollments: Called with the course code to fetch the enrolled
+                reg_numbers; returns None if they could not be fetched
+
+        Returns:
+            The course gallery, or None if the enrollments are unavailable
+        """
+        now = time.monotonic()
+        cached = self._views.get(course_code)
+
+        if cached and now - cached[3] < self.ttl_seconds:
+            view, reg_numbers, version, loaded_at = cached
+            if version == self.gallery.version:
+                return view
+            # New faces were registered: rebuild from the cached enrollment list
+            version = self.gallery.version
+            view = self.gallery.subset(reg_numbers)
+            with self._lock:
+                self._views[course_code] = (view, reg_numbers, version, loaded_at)
+            return view
+
+        reg_numbers = load_enrollments(course_code)
+        if reg_numbers is None:
+            return None
+
+        version = self.gallery.version
+        view = self.gallery.subset(reg_numbers)
+        with self._lock:
+            self._views[course_code] = (view, list(reg_numbers), version, now)
+        return view
+
+    def invalidate(self, course_code: Optional[str] = None) -> None:
+        """
+        Drop the cached view for a course, or for every course
+
+        Args:
+            course_code: Course code to drop (default: all courses)
+        """
+        with self._lock:
+            if course_code is None:
+                self._views.clear()
+            else:
+                self._views.pop(course_code, None)
+
+
+# Shared gallery for the attendance service
+face_gallery = FaceGallery()
+course_galleries = CourseGalleryCache(face_gallery)
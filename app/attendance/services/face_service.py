@@ -5,10 +5,185 @@ from typing import List, Dict, Any, Optional, Tuple
 import json
 from io import BytesIO
 from PIL import Image
-from db.supabase import get_all_face_embeddings, save_face_embedding, log_attendance, get_student_profile
+from db.supabase import (
+    get_face_embedding_matrix,
+    save_face_embedding,
+    save_face_embeddings,
+    log_attendance_batch,
+    get_student_profile,
+    get_course_enrollments
+)
 import face_recognition
-from services.attendace_logic import can_mark_attendance,can_mark_attendance_for_course
+from services.attendace_logic import can_mark_attendance, can_mark_attendance_for_course_batch
+from services.face_gallery import face_gallery, course_galleries, FaceGallery
+from utils.image_processing import resize_image
+from services.face_tracker import FaceTracker, associate
+from services.gallery_snapshot import load_gallery_snapshot, save_gallery_snapshot
+from config import (
+    FACE_DETECTION_MAX_SIZE,
+    FACE_DETECTION_MODEL,
+    FACE_DETECTION_UPSAMPLE,
+    TRACK_IOU_THRESHOLD,
+    FACE_GALLERY_SNAPSHOT_PATH,
+    FACE_GALLERY_LOAD_RETRY,
+    EMBEDDING_STORAGE_FORMAT
+)
+from utils.embedding_codec import encode_embedding, encode_embedding_list
 from datetime import datetime
+import time
+
+
+def load_face_gallery() -> int:
+    """
+    Load all stored face embeddings into the in-memory gallery
+    
+    When a local gallery snapshot exists it is memory-mapped and only the
+    rows changed since its stamp are fetched from the database; otherwise
+    the whole table is fetched and a snapshot is written for next time.
+    
+    Returns:
+        Number of faces loaded
+    """
+    snapshot = load_gallery_snapshot(FACE_GALLERY_SNAPSHOT_PATH) if FACE_GALLERY_SNAPSHOT_PATH else None
+    
+    if snapshot is not None:
+        face_gallery.load_matrix(
+            snapshot["reg_numbers"], snapshot["names"], snapshot["embeddings"],
+            snapshot["samples"], snapshot["sample_counts"]
+        )
+        face_gallery.stamp = snapshot["stamp"]
+        
+        changed = sync_face_gallery()
+        print(f"Loaded {len(face_gallery)} face embeddings from the gallery snapshot "
+              + (f"({changed} changed since {snapshot['stamp']})" if changed >= 0 else "(sync failed)"))
+        return len(face_gallery)
+    
+    result = get_face_embedding_matrix()
+    if result["success"]:
+        face_gallery.load_matrix(
+            result["reg_numbers"], result["names"], result["embeddings"],
+            result["samples"], result["sample_counts"]
+        )
+        face_gallery.stamp = result["stamp"]
+        face_gallery.synced_at = time.time()
+        if FACE_GALLERY_SNAPSHOT_PATH:
+            _save_gallery_snapshot(result["stamp"])
+    else:
+        # Leave the gallery unloaded so get_face_gallery retries later
+        print(f"Error loading face embeddings: {result['message']}")
+        return 0
+    print(f"Loaded {len(face_gallery)} face embeddings into the gallery")
+    return len(face_gallery)
+
+
+def sync_face_gallery() -> int:
+    """
+    Apply rows changed since the gallery's stamp
+    
+    Catches up on registrations whose cache events were missed, and
+    refreshes the local snapshot when anything changed.
+    
+    Returns:
+        Number of changed faces applied, or -1 if the sync failed
+    """
+    changes = get_face_embedding_matrix(since=face_gallery.stamp)
+    if not changes["success"]:
+        return -1
+    
+    if changes["reg_numbers"]:
+        if face_gallery.stamp is None:
+            # Nothing to be incremental against: the whole table was fetched
+            face_gallery.load_matrix(
+                changes["reg_numbers"], changes["names"], changes["embeddings"],
+                changes["samples"], changes["sample_counts"]
+            )
+        else:
+            face_gallery.upsert_many(
+                changes["reg_numbers"], changes["names"], changes["embeddings"],
+                changes["samples"], changes["sample_counts"]
+            )
+        if FACE_GALLERY_SNAPSHOT_PATH:
+            _save_gallery_snapshot(changes["stamp"])
+    
+    face_gallery.stamp = changes["stamp"]
+    face_gallery.synced_at = time.time()
+    return len(changes["reg_numbers"])
+
+
+def face_gallery_stats() -> Dict[str, Any]:
+    """Size and freshness of the in-memory face gallery"""
+    return {
+        "size": len(face_gallery),
+        "version": face_gallery.version,
+        "stamp": face_gallery.stamp,
+        "seconds_since_sync": round(time.time() - face_gallery.synced_at, 3) if face_gallery.synced_at else None
+    }
+
+
+def _save_gallery_snapshot(stamp: Optional[str]) -> None:
+    state = face_gallery.snapshot()
+    samples, sample_counts = face_gallery.packed_samples(state)
+    if not save_gallery_snapshot(
+        FACE_GALLERY_SNAPSHOT_PATH, state.reg_numbers, state.names, state.embeddings, stamp,
+        samples, sample_counts
+    ):
+        return
+    
+    # Match on the mapped copy just written rather than the private one
+    # upserts built, so the pages stay shared with the other workers
+    snapshot = load_gallery_snapshot(FACE_GALLERY_SNAPSHOT_PATH)
+    if snapshot is not None and snapshot["stamp"] == stamp and snapshot["reg_numbers"] == state.reg_numbers:
+        face_gallery.use_mapped(state, snapshot["embeddings"], snapshot["samples"])
+
+
+# When get_face_gallery last tried to load the gallery (Unix time)
+_last_load_attempt = 0.0
+
+
+def get_face_gallery() -> FaceGallery:
+    """
+    Get the in-memory face gallery, loading it on first use
+    
+    A failed load is retried at most every FACE_GALLERY_LOAD_RETRY seconds;
+    a successfully loaded but empty gallery is not reloaded.
+    
+    Returns:
+        The shared FaceGallery
+    """
+    global _last_load_attempt
+    if not face_gallery.loaded and time.time() - _last_load_attempt >= FACE_GALLERY_LOAD_RETRY:
+        _last_load_attempt = time.time()
+        load_face_gallery()
+    return face_gallery
+
+
+def _load_course_enrollments(course_code: str) -> Optional[List[str]]:
+    result = get_course_enrollments(course_code)
+    return result["data"] if result["success"] else None
+
+
+def get_course_gallery(course_code: str) -> Optional[FaceGallery]:
+    """
+    Get the gallery of faces of the students enrolled in a course
+    
+    Args:
+        course_code: Course code
+        
+    Returns:
+        The course gallery, or None if enrollments could not be loaded
+    """
+    get_face_gallery()
+    return course_galleries.get(course_code, _load_course_enrollments)
+
+
+def invalidate_course_gallery(course_code: Optional[str] = None) -> None:
+    """
+    Drop the cached course gallery after enrollments change
+    
+    Args:
+        course_code: Course code (default: all courses)
+    """
+    course_galleries.invalidate(course_code)
 
 
 def decode_base64_image(base64_string: str) -> np.ndarray:
@@ -38,18 +213,112 @@ def decode_base64_image(base64_string: str) -> np.ndarray:
     return np.array(image)
 
 
-def extract_face_embedding(image: np.ndarray) -> Tuple[List[float], List[List[int]]]:
+def decode_image_bytes(image_bytes) -> np.ndarray:
+    """
+    Decode raw JPEG/PNG bytes to an RGB numpy array
+    
+    Args:
+        image_bytes: Encoded image as bytes, bytearray or memoryview. The
+            buffer is decoded in place without an intermediate copy.
+        
+    Returns:
+        numpy array representing the image
+    """
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image bytes")
+    
+    # OpenCV decodes to BGR, face_recognition expects RGB
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def detection_options(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pick the per-request face detection options out of a request payload
+    
+    Args:
+        data: Request payload with optional detection_model, upsample and
+            detection_max_size fields
+        
+    Returns:
+        Keyword arguments for extract_face_embedding
+    """
+    options = {}
+    if data.get("detection_model"):
+        options["model"] = data["detection_model"]
+    if data.get("upsample") is not None:
+        options["upsample"] = int(data["upsample"])
+    if data.get("detection_max_size") is not None:
+        options["detection_max_size"] = int(data["detection_max_size"])
+    return options
+
+
+def detect_faces(image: np.ndarray, detection_max_size: Optional[int] = None,
+                 model: Optional[str] = None, upsample: Optional[int] = None) -> List[Tuple[int, int, int, int]]:
+    """
+    Find face locations, running the detector on a downscaled copy of large images
+    
+    Args:
+        image: Image as numpy array
+        detection_max_size: Longest side of the image given to the detector
+            (0 = full resolution, default FACE_DETECTION_MAX_SIZE)
+        model: "hog" (fast, CPU) or "cnn" (more accurate, needs GPU to be fast)
+        upsample: How many times the detector upsamples the image to find
+            smaller faces
+        
+    Returns:
+        List of (top, right, bottom, left) boxes in full-resolution coordinates
+    """
+    if detection_max_size is None:
+        detection_max_size = FACE_DETECTION_MAX_SIZE
+    model = model or FACE_DETECTION_MODEL
+    if upsample is None:
+        upsample = FACE_DETECTION_UPSAMPLE
+    if model not in ("hog", "cnn"):
+        raise ValueError(f"Unknown face detection model: {model}")
+    
+    height, width = image.shape[:2]
+    small = resize_image(image, detection_max_size) if detection_max_size else image
+    
+    face_locations = face_recognition.face_locations(small, number_of_times_to_upsample=upsample, model=model)
+    if small is image:
+        return face_locations
+    
+    # Map the boxes back to the original image
+    scale_y = height / small.shape[0]
+    scale_x = width / small.shape[1]
+    return [
+        (
+            max(0, int(round(top * scale_y))),
+            min(width, int(round(right * scale_x))),
+            min(height, int(round(bottom * scale_y))),
+            max(0, int(round(left * scale_x)))
+        )
+        for top, right, bottom, left in face_locations
+    ]
+
+
+def extract_face_embedding(image: np.ndarray, detection_max_size: Optional[int] = None,
+                           model: Optional[str] = None,
+                           upsample: Optional[int] = None) -> Tuple[List[float], List[List[int]]]:
     """
     Extract face embedding from an image
     
+    Faces are detected on a downscaled copy (see detect_faces) but encoded
+    from the full-resolution image.
+    
     Args:
         image: Image as numpy array
+        detection_max_size: See detect_faces
+        model: See detect_faces
+        upsample: See detect_faces
         
     Returns:
         Tuple of (list of face embeddings, list of face locations)
     """
     # Find face locations in the image
-    face_locations = face_recognition.face_locations(image)
+    face_locations = detect_faces(image, detection_max_size, model, upsample)
     
     # If no faces found, return empty lists
     if not face_locations:
@@ -62,10 +331,127 @@ def extract_face_embedding(image: np.ndarray) -> Tuple[List[float], List[List[in
     return [encoding.tolist() for encoding in face_encodings], face_locations
 
 
+def encode_faces_base64(image_base64: str, **detection) -> Tuple[List[List[float]], List[List[int]]]:
+    """
+    Decode a base64 image and extract its face embeddings
+    
+    This is the CPU-heavy part of recognition and registration. It touches no
+    shared state, so it can run in a worker process.
+    
+    Args:
+        image_base64: Base64 encoded image
+        **detection: Detection options for extract_face_embedding
+        
+    Returns:
+        Tuple of (list of face embeddings, list of face locations)
+    """
+    image = decode_base64_image(image_base64)
+    return extract_face_embedding(image, **detection)
+
+
+def encode_faces_bytes(image_bytes, **detection) -> Tuple[List[List[float]], List[List[int]]]:
+    """
+    Decode raw image bytes and extract their face embeddings
+    
+    Binary counterpart of encode_faces_base64.
+    
+    Args:
+        image_bytes: Encoded JPEG/PNG image
+        **detection: Detection options for extract_face_embedding
+        
+    Returns:
+        Tuple of (list of face embeddings, list of face locations)
+    """
+    image = decode_image_bytes(image_bytes)
+    return extract_face_embedding(image, **detection)
+
+
+def registration_face_error(face_embeddings: List[List[float]]) -> Optional[str]:
+    """Why the faces found in a registration image cannot be registered, or None"""
+    if not face_embeddings:
+        return "No face detected in the image"
+    if len(face_embeddings) > 1:
+        return "Multiple faces detected. Please provide an image with only one face."
+    return None
+
+
+def save_registered_face(reg_number: str, student: Dict[str, Any],
+                         face_embeddings: List[List[float]], replace: bool = False) -> Dict[str, Any]:
+    """
+    Store the face extracted from a registration image
+    
+    The face is added to the student's samples unless replace is set.
+    
+    Args:
+        reg_number: Student registration number
+        student: Result of get_student_profile for the student
+        face_embeddings: Embeddings extracted from the registration image
+        replace: Drop the student's previously registered photos
+        
+    Returns:
+        Dictionary with operation result
+    """
+    try:
+        error = registration_face_error(face_embeddings)
+        if error:
+            return {"success": False, "message": error}
+        
+        # Save face embedding
+        result = save_face_embedding(
+            reg_number=reg_number,
+            embedding=face_embeddings[0],
+            name=student["data"].get("name"),
+            replace=replace
+        )
+        
+        # Keep the in-memory gallery in sync with the database
+        if result["success"]:
+            get_face_gallery().upsert(
+                reg_number=reg_number,
+                embedding=result["embedding"],
+                name=student["data"].get("name"),
+                samples=result["samples"]
+            )
+        
+        return result
+    except Exception as e:
+        print(f"Error registering face: {e}")
+        return {"success": False, "message": str(e)}
+
+
+def save_registered_faces(entries: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Store many registered faces with bulk upserts
+    
+    Args:
+        entries: Dictionaries with reg_number, name and embeddings (the
+            new photos of one student each)
+        
+    Returns:
+        Dictionary mapping each reg_number to its operation result
+    """
+    results = save_face_embeddings(entries)
+    
+    saved = [entry for entry in entries if results[entry["reg_number"]]["success"]]
+    if saved:
+        samples = [results[entry["reg_number"]]["samples"] for entry in saved]
+        get_face_gallery().upsert_many(
+            [entry["reg_number"] for entry in saved],
+            [entry.get("name") for entry in saved],
+            np.asarray([results[entry["reg_number"]]["embedding"] for entry in saved], dtype=np.float32),
+            np.concatenate(samples),
+            [len(rows) for rows in samples]
+        )
+    return results
+
+
 def register_face(reg_number: str, image_base64: str) -> Dict[str, Any]:
     """
     Register a face for a student
     
+    Like RecognitionExecutor.register, a face_registered cache event is
+    published so the other service instances update their galleries.
+    
     Args:
         reg_number: Student registration number
         image_base64: Base64 encoded image
@@ -79,25 +465,20 @@ def register_face(reg_number: str, image_base64: str) -> Dict[str, Any]:
         if not student["success"]:
             return {"success": False, "message": "Student not found"}
         
-        # Decode image
-        image = decode_base64_image(image_base64)
-        
-        # Extract face embedding
-        face_embeddings, face_locations = extract_face_embedding(image)
-        
-        if not face_embeddings:
-            return {"success": False, "message": "No face detected in the image"}
-        
-        if len(face_embeddings) > 1:
-            return {"success": False, "message": "Multiple faces detected. Please provide an image with only one face."}
-        
-        # Save face embedding
-        result = save_face_embedding(
-            reg_number=reg_number,
-            embedding=face_embeddings[0],
-            name=student["data"].get("name")
-        )
+        # Decode image and extract face embedding
+        face_embeddings, face_locations = encode_faces_base64(image_base64)
         
+        result = save_registered_face(reg_number, student, face_embeddings)
+        if result["success"]:
+            # Same event as RecognitionExecutor.register, so the other instances see the face
+            from rabbitMQ.cache_events import publish_cache_event_threadsafe
+            publish_cache_event_threadsafe(
+                "face_registered",
+                reg_number=reg_number,
+                name=student["data"].get("name"),
+                embedding=encode_embedding(result["embedding"], EMBEDDING_STORAGE_FORMAT),
+                samples=encode_embedding_list(result["samples"], EMBEDDING_STORAGE_FORMAT)
+            )
         return result
     except Exception as e:
         print(f"Error registering face: {e}")
@@ -105,33 +486,78 @@ def register_face(reg_number: str, image_base64: str) -> Dict[str, Any]:
     
 
 def recognize_faces(image_base64: str, location: Optional[str] = None, 
-                   course_code: Optional[str] = None, threshold: float = 0.6,) -> Dict[str, Any]:
+                   course_code: Optional[str] = None, threshold: float = 0.6,
+                   global_fallback: bool = False,
+                   detection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Recognize faces in an image and mark attendance based on course schedule
     
+    When a course code is given, faces are only matched against the students
+    enrolled in that course.
+    
     Args:
         image_base64: Base64 encoded image
         location: Optional location information for attendance logging
         threshold: Similarity threshold (lower is more strict)
         course_code: Optional course code for attendance
+        global_fallback: Also search all registered faces for faces that match
+            no enrolled student. Such students are identified, but attendance
+            is not marked for them.
+        detection: Optional detection options (see detection_options)
         
     Returns:
         Dictionary with recognized students
     """
     try:
-        # Decode image
-        image = decode_base64_image(image_base64)
-        
-        # Extract face embedding
-        face_embeddings, face_locations = extract_face_embedding(image)
+        # Decode image and extract face embedding
+        face_embeddings, face_locations = encode_faces_base64(image_base64, **(detection or {}))
+    except Exception as e:
+        print(f"Error recognizing faces: {e}")
+        return {
+            "success": False, 
+            "message": str(e), 
+            "students": [],
+            "unknown_faces": [],
+            "attendance_results": []
+        }
+    
+    return match_faces(
+        face_embeddings=face_embeddings,
+        face_locations=face_locations,
+        location=location,
+        course_code=course_code,
+        threshold=threshold,
+        global_fallback=global_fallback
+    )
+
+
+def match_faces(face_embeddings: List[List[float]], face_locations: List[List[int]],
+                location: Optional[str] = None, course_code: Optional[str] = None,
+                threshold: float = 0.6, global_fallback: bool = False) -> Dict[str, Any]:
+    """
+    Match extracted faces against registered students and mark attendance
+    
+    This is the second half of recognize_faces: gallery matching plus the
+    attendance database calls, without any image processing.
+    
+    Args:
+        face_embeddings: Embeddings extracted from the image
+        face_locations: Face locations matching face_embeddings
+        location: Optional location information for attendance logging
+        course_code: Optional course code for attendance
+        threshold: Similarity threshold (lower is more strict)
+        global_fallback: See recognize_faces
         
+    Returns:
+        Dictionary with recognized students
+    """
+    try:
         if not face_embeddings:
             return {"success": False, "message": "No face detected in the image", "students": []}
         
-        # Get all stored face embeddings
-        stored_embeddings = get_all_face_embeddings()
-        #print(f"Stored embeddings: {stored_embeddings}")
-        if not stored_embeddings:
+        # Match against the in-memory gallery
+        gallery = get_face_gallery()
+        if not len(gallery):
             return {"success": False, "message": "No registered faces found in the database", "students": []}
         
         recognized_students = []
@@ -141,32 +567,60 @@ def recognize_faces(image_base64: str, location: Optional[str] = None,
         # Current time for attendance checking
         current_time = datetime.now()
         
-        for i, face_embedding in enumerate(face_embeddings):
-            best_match = None
-            best_similarity = -1
-            
-            for stored_record in stored_embeddings:
-                stored_embedding = stored_record["embedding"]
-                
-                similarity = face_recognition.face_distance([np.array(stored_embedding)], np.array(face_embedding))
-                similarity = 1 - similarity[0]
-                
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match = stored_record
-            
+        # Restrict candidates to the course's enrolled students when possible
+        search_gallery = gallery
+        if course_code:
+            course_gallery = get_course_gallery(course_code)
+            if course_gallery is not None:
+                search_gallery = course_gallery
+        
+        # Compare every detected face against every candidate face in one pass
+        matches = search_gallery.match(face_embeddings)
+        
+        # Optionally retry unmatched faces against everyone
+        outside_course = set()
+        if global_fallback and search_gallery is not gallery:
+            unmatched = [i for i, (match, similarity) in enumerate(matches) if not match or similarity <= threshold]
+            if unmatched:
+                global_matches = gallery.match([face_embeddings[i] for i in unmatched])
+                for i, global_match in zip(unmatched, global_matches):
+                    if global_match[0] and global_match[1] > threshold:
+                        matches[i] = global_match
+                        outside_course.add(i)
+        
+        # Check attendance eligibility for all recognized students at once
+        recognized = [
+            i for i, (best_match, best_similarity) in enumerate(matches)
+            if best_match and best_similarity > threshold
+        ]
+        attendance_checks = {}
+        if course_code:
+            attendance_checks = can_mark_attendance_for_course_batch(
+                reg_numbers=[matches[i][0]["reg_number"] for i in recognized if i not in outside_course],
+                course_code=course_code,
+                current_time=current_time
+            )
+        
+        # Students marked by an earlier face in this frame
+        marked_in_frame = {}
+        pending_attendance = []
+        
+        for i, (best_match, best_similarity) in enumerate(matches):
             if best_match and best_similarity > threshold:
                 confidence = round(best_similarity * 100, 2)
                 reg_number = best_match["reg_number"]
                 
                 # Check attendance eligibility based on course schedule
-                if course_code:
-                    # Use the new course-based attendance logic
-                    attendance_check = can_mark_attendance_for_course(
-                        reg_number=reg_number,
-                        course_code=course_code,
-                        current_time=current_time
-                    )
+                if i in outside_course:
+                    attendance_check = {
+                        "can_mark": False,
+                        "status": None,
+                        "message": f"Student is not enrolled in course {course_code}"
+                    }
+                elif reg_number in marked_in_frame:
+                    attendance_check = marked_in_frame[reg_number]
+                elif course_code:
+                    attendance_check = attendance_checks[reg_number]
                 else:
                     # Fallback to the original attendance logic when no course is specified
                     attendance_check = can_mark_attendance(reg_number)
@@ -185,29 +639,26 @@ def recognize_faces(image_base64: str, location: Optional[str] = None,
                     "can_mark_attendance": attendance_check.get("can_mark", False),
                     "attendance_message": attendance_check.get("message", ""),
                     "attendance_status": attendance_status,
-                    "face_location": face_locations[i] if i < len(face_locations) else None
+                    "face_location": face_locations[i] if i < len(face_locations) else None,
+                    "face_index": i
                 }
                 
                 recognized_students.append(recognized_student)
                 
-                # Mark attendance if eligible
+                # Queue attendance if eligible
                 if attendance_check.get("can_mark", False):
                     # Use the determined status (present/late) for logging
-                    status = attendance_check.get("status", "present")
-                    
-                    attendance_result = log_attendance(
-                        reg_number=reg_number,
-                        method="face_recognition",  # Using your original default
-                        status=status,  # Use the status from attendance check (present/late)
-                        location=location,
-                        course_code=course_code
-                    )
-                    attendance_results.append({
+                    status = attendance_check.get("status") or "present"
+                    pending_attendance.append({
                         "reg_number": reg_number,
                         "name": best_match.get("name", "Unknown"),
-                        "status": status,
-                        "attendance_result": attendance_result
+                        "status": status
                     })
+                    marked_in_frame[reg_number] = {
+                        "can_mark": False,
+                        "status": None,
+                        "message": "Attendance already marked for this course today"
+                    }
             else:
                 unknown_faces.append({
                     "face_index": i,
@@ -217,6 +668,23 @@ def recognize_faces(image_base64: str, location: Optional[str] = None,
                     "message": "Unknown person - below recognition threshold"
                 })
         
+        # Mark attendance for all eligible students with a single insert.
+        # The course was already looked up by the eligibility check.
+        logged = log_attendance_batch(
+            entries=pending_attendance,
+            method="face_recognition",  # Using your original default
+            location=location,
+            course_code=course_code,
+            validate_course=False
+        )
+        for pending in pending_attendance:
+            attendance_results.append({
+                "reg_number": pending["reg_number"],
+                "name": pending["name"],
+                "status": pending["status"],
+                "attendance_result": logged[pending["reg_number"]]
+            })
+        
         response = {
             "success": True,
             "total_faces_detected": len(face_embeddings),
@@ -227,18 +695,7 @@ def recognize_faces(image_base64: str, location: Optional[str] = None,
             "attendance_results": attendance_results
         }
         
-        if len(recognized_students) > 0:
-            response["message"] = f"Recognized {len(recognized_students)} student(s)"
-            if len(unknown_faces) > 0:
-                response["message"] += f" and detected {len(unknown_faces)} unknown face(s)"
-        elif len(unknown_faces) > 0:
-            response["message"] = f"Detected {len(unknown_faces)} face(s), but none matched registered students"
-            response["success"] = False
-        else:
-            response["message"] = "No registered students recognized in the image"
-            response["success"] = False
-            
-        return response
+        return _summarize_recognition(response)
         
     except Exception as e:
         print(f"Error recognizing faces: {e}")
@@ -249,6 +706,168 @@ def recognize_faces(image_base64: str, location: Optional[str] = None,
             "unknown_faces": [],
             "attendance_results": []
         }
+
+
+def _summarize_recognition(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the message and success flag of a recognition response from its counts"""
+    recognized_count = response["recognized_count"]
+    unknown_count = response["unknown_count"]
+    
+    if recognized_count > 0:
+        response["message"] = f"Recognized {recognized_count} student(s)"
+        if unknown_count > 0:
+            response["message"] += f" and detected {unknown_count} unknown face(s)"
+    elif unknown_count > 0:
+        response["message"] = f"Detected {unknown_count} face(s), but none matched registered students"
+        response["success"] = False
+    else:
+        response["message"] = "No registered students recognized in the image"
+        response["success"] = False
+    
+    return response
+
+
+def encode_tracked_faces(image_base64: Optional[str] = None, image_bytes=None,
+                         tracks: List[Tuple[int, Tuple[int, int, int, int], bool]] = (),
+                         iou_threshold: float = TRACK_IOU_THRESHOLD, **detection) -> List[Dict[str, Any]]:
+    """
+    Detect faces and encode only those a FaceTracker cannot vouch for
+    
+    Faces are linked to the tracker's tracks by IoU. Faces on a trusted
+    track are returned without an embedding; all others are encoded. Like
+    encode_faces_base64 this touches no shared state and can run in a
+    worker process.
+    
+    Args:
+        image_base64: Base64 encoded image
+        image_bytes: Raw JPEG/PNG bytes, used instead of image_base64
+        tracks: FaceTracker.snapshot() of the connection's tracker
+        iou_threshold: Minimum IoU to link a face to a track
+        **detection: Detection options for detect_faces
+        
+    Returns:
+        One dictionary per detected face with box, track_id (None for a
+        new face) and embedding (None when the face was not encoded)
+    """
+    image = decode_image_bytes(image_bytes) if image_bytes is not None else decode_base64_image(image_base64)
+    face_locations = detect_faces(image, **detection)
+    if not face_locations:
+        return []
+    
+    assigned = associate(face_locations, [box for _, box, _ in tracks], iou_threshold)
+    
+    faces = []
+    to_encode = []
+    for i, (box, j) in enumerate(zip(face_locations, assigned)):
+        track_id, trusted = (tracks[j][0], tracks[j][2]) if j is not None else (None, False)
+        faces.append({"box": list(box), "track_id": track_id, "embedding": None})
+        if not trusted:
+            to_encode.append(i)
+    
+    if to_encode:
+        encodings = face_recognition.face_encodings(image, [face_locations[i] for i in to_encode])
+        for i, encoding in zip(to_encode, encodings):
+            faces[i]["embedding"] = encoding.tolist()
+    
+    return faces
+
+
+def match_tracked_faces(tracker: FaceTracker, faces: List[Dict[str, Any]],
+                        location: Optional[str] = None, course_code: Optional[str] = None,
+                        threshold: float = 0.6, global_fallback: bool = False) -> Dict[str, Any]:
+    """
+    Tracked counterpart of match_faces
+    
+    Faces on a trusted track reuse the track's last result and skip
+    matching, the attendance eligibility check and logging. Only encoded
+    faces go through match_faces, and their results update the tracker.
+    
+    Args:
+        tracker: The connection's FaceTracker
+        faces: Result of encode_tracked_faces for this frame
+        location: Optional location information for attendance logging
+        course_code: Optional course code for attendance
+        threshold: Similarity threshold (lower is more strict)
+        global_fallback: See recognize_faces
+        
+    Returns:
+        Dictionary with recognized students, as match_faces, plus the
+        number of faces answered from tracks in tracked_count
+    """
+    tracker.new_frame()
+    
+    reused = []   # (face index, track)
+    encoded = []  # (face index, track)
+    for i, face in enumerate(faces):
+        if face["embedding"] is None:
+            track = tracker.reuse(face["track_id"], face["box"])
+            if track is not None:
+                reused.append((i, track))
+            continue
+        encoded.append((i, tracker.observe(face["track_id"], face["box"], face["embedding"])))
+    
+    tracker.prune()
+    
+    if not faces:
+        return {"success": False, "message": "No face detected in the image", "students": []}
+    
+    result = {"students": [], "unknown_faces": [], "attendance_results": []}
+    if encoded:
+        result = match_faces(
+            face_embeddings=[faces[i]["embedding"] for i, _ in encoded],
+            face_locations=[faces[i]["box"] for i, _ in encoded],
+            location=location,
+            course_code=course_code,
+            threshold=threshold,
+            global_fallback=global_fallback
+        )
+        if "total_faces_detected" not in result:
+            # Matching failed as a whole (e.g. empty gallery)
+            return result
+    
+    students = []
+    for student in result["students"]:
+        i, track = encoded[student["face_index"]]
+        student["face_index"] = i
+        student["track_id"] = track.track_id
+        students.append(student)
+        
+        cached = dict(student)
+        if student["can_mark_attendance"]:
+            # Marked in this frame; later frames must not mark again
+            cached["can_mark_attendance"] = False
+            cached["attendance_message"] = "Attendance already marked for this course today"
+            cached["attendance_status"] = cached["attendance_message"]
+        tracker.identify(track, cached, student["confidence"] / 100)
+    
+    for unknown in result["unknown_faces"]:
+        i, track = encoded[unknown["face_index"]]
+        unknown["face_index"] = i
+        unknown["track_id"] = track.track_id
+    
+    for i, track in reused:
+        student = dict(track.student)
+        student["face_index"] = i
+        student["face_location"] = faces[i]["box"]
+        student["track_id"] = track.track_id
+        student["tracked"] = True
+        students.append(student)
+    
+    students.sort(key=lambda student: student["face_index"])
+    
+    response = {
+        "success": True,
+        "total_faces_detected": len(faces),
+        "recognized_count": len(students),
+        "unknown_count": len(result["unknown_faces"]),
+        "tracked_count": len(reused),
+        "students": students,
+        "unknown_faces": result["unknown_faces"],
+        "attendance_results": result["attendance_results"]
+    }
+    
+    return _summarize_recognition(response)
+
     
 # def recognize_faces(image_base64: str, location: Optional[str] = None, 
 #                     threshold: float = 0.6, course_code: Optional[str] = None) -> Dict[str, Any]:
@@ -0,0 +1,177 @@
+import asyncio
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+from config import (
+    TRACK_IOU_THRESHOLD,
+    TRACK_CONFIDENCE_DECAY,
+    TRACK_MIN_CONFIDENCE,
+    TRACK_MAX_MISSED_FRAMES,
+    TRACK_IDENTITY_DISTANCE
+)
+
+# Face boxes use face_recognition's (top, right, bottom, left) order
+Box = Tuple[int, int, int, int]
+
+
+def box_iou(a: Sequence[int], b: Sequence[int]) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    intersection = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return intersection / float(area_a + area_b - intersection)
+
+
+def associate(boxes: Sequence[Sequence[int]], track_boxes: Sequence[Sequence[int]],
+              iou_threshold: float = TRACK_IOU_THRESHOLD) -> List[Optional[int]]:
+    """
+    Greedily pair detected boxes with track boxes by IoU
+
+    Args:
+        boxes: Boxes detected in the current frame
+        track_boxes: Last known box of each track
+        iou_threshold: Minimum IoU for a pair
+
+    Returns:
+        For each detected box, the index of its track in track_boxes, or None
+    """
+    pairs = sorted(
+        (
+            (box_iou(box, track_box), i, j)
+            for i, box in enumerate(boxes)
+            for j, track_box in enumerate(track_boxes)
+        ),
+        reverse=True
+    )
+
+    assigned: List[Optional[int]] = [None] * len(boxes)
+    used_tracks = set()
+    for iou, i, j in pairs:
+        if iou < iou_threshold:
+            break
+        if assigned[i] is None and j not in used_tracks:
+            assigned[i] = j
+            used_tracks.add(j)
+    return assigned
+
+
+class Track:
+    """A face followed across frames"""
+
+    def __init__(self, track_id: int, box: Box, frame: int):
+        self.track_id = track_id
+        self.box = box
+        self.embedding: Optional[np.ndarray] = None
+        self.student: Optional[Dict[str, Any]] = None  # recognized student entry, None if unknown
+        self.confidence = 0.0
+        self.last_seen = frame
+
+    @property
+    def identified(self) -> bool:
+        return self.student is not None
+
+
+class FaceTracker:
+    """
+    Per-connection face tracker for the realtime recognition path.
+
+    Detected faces are linked to tracks by IoU with the previous frame. A
+    track whose identity is known keeps it while its confidence (the match
+    similarity, decayed every frame) stays above ``min_confidence``; such
+    faces are not re-encoded, re-matched or re-checked for attendance. New
+    faces, unknown faces and tracks whose confidence has decayed go through
+    the full pipeline again. When a re-encoded face no longer looks like
+    its track (embedding distance above ``identity_distance``) the track
+    starts over as a new person.
+    """
+
+    def __init__(self, iou_threshold: float = TRACK_IOU_THRESHOLD,
+                 confidence_decay: float = TRACK_CONFIDENCE_DECAY,
+                 min_confidence: float = TRACK_MIN_CONFIDENCE,
+                 max_missed_frames: int = TRACK_MAX_MISSED_FRAMES,
+                 identity_distance: float = TRACK_IDENTITY_DISTANCE):
+        self.iou_threshold = iou_threshold
+        self.confidence_decay = confidence_decay
+        self.min_confidence = min_confidence
+        self.max_missed_frames = max_missed_frames
+        self.identity_distance = identity_distance
+        self.tracks: Dict[int, Track] = {}
+        self.frame = 0
+        self._next_id = 1
+        # Frames of one connection must update the tracker in order
+        self.lock = asyncio.Lock()
+
+    def is_trusted(self, track: Track) -> bool:
+        return track.identified and track.confidence >= self.min_confidence
+
+    def snapshot(self) -> List[Tuple[int, Box, bool]]:
+        """(track_id, box, trusted) for every live track, for the encoding worker"""
+        return [(track.track_id, track.box, self.is_trusted(track)) for track in self.tracks.values()]
+
+    def new_frame(self) -> int:
+        self.frame += 1
+        return self.frame
+
+    def reuse(self, track_id: int, box: Box) -> Optional[Track]:
+        """
+        Carry a trusted track over to the current frame without re-encoding
+
+        Returns:
+            The track, or None if it is gone or no longer trusted
+        """
+        track = self.tracks.get(track_id)
+        if track is None or not self.is_trusted(track):
+            return None
+        track.box = tuple(box)
+        track.last_seen = self.frame
+        track.confidence *= self.confidence_decay
+        return track
+
+    def observe(self, track_id: Optional[int], box: Box, embedding: List[float]) -> Track:
+        """
+        Record a freshly encoded face
+
+        Args:
+            track_id: Track the face was associated with, if any
+            box: Face box in this frame
+            embedding: Face encoding
+
+        Returns:
+            The (possibly new) track for the face
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        track = self.tracks.get(track_id) if track_id is not None else None
+
+        if track is not None and track.embedding is not None:
+            if np.linalg.norm(track.embedding - vector) > self.identity_distance:
+                # Someone else took this spot: start a new track
+                track = None
+
+        if track is None:
+            track = Track(self._next_id, tuple(box), self.frame)
+            self._next_id += 1
+            self.tracks[track.track_id] = track
+
+        track.box = tuple(box)
+        track.embedding = vector
+        track.last_seen = self.frame
+        track.student = None
+        track.confidence = 0.0
+        return track
+
+    def identify(self, track: Track, student: Dict[str, Any], similarity: float) -> None:
+        """Attach a recognized student to a track"""
+        track.student = student
+        track.confidence = similarity
+
+    def prune(self) -> None:
+        """Forget tracks that have not been seen for max_missed_frames"""
+        for track_id in [
+            track_id for track_id, track in self.tracks.items()
+            if self.frame - track.last_seen > self.max_missed_frames
+        ]:
+            del self.tracks[track_id]
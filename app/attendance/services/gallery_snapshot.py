@@ -0,0 +1,161 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set
+import numpy as np
+from utils.embedding_codec import EMBEDDING_DIM
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# 2: adds per-student sample embeddings
+SNAPSHOT_FORMAT = 2
+
+
+def _embeddings_path(path: str, generation: str) -> str:
+    base, _ = os.path.splitext(path)
+    return f"{base}.{generation}.npy"
+
+
+def _write_matrix(matrix_path: str, matrix: np.ndarray) -> None:
+    tmp_matrix_path = f"{matrix_path}.tmp"
+    with open(tmp_matrix_path, "wb") as f:
+        np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_matrix_path, matrix_path)
+
+
+def _snapshot_files(path: str) -> Set[str]:
+    """Matrix files named by the snapshot metadata currently at path"""
+    try:
+        with open(path) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    directory = os.path.dirname(os.path.abspath(path))
+    return {os.path.join(directory, metadata[key]) for key in ("embeddings_file", "samples_file") if metadata.get(key)}
+
+
+def save_gallery_snapshot(path: str, reg_numbers: List[str], names: List[str],
+                          embeddings: np.ndarray, stamp: Optional[str],
+                          samples: Optional[np.ndarray] = None,
+                          sample_counts: Optional[np.ndarray] = None) -> bool:
+    """
+    Write the face gallery to a local snapshot
+
+    The snapshot is a JSON metadata file at ``path`` plus a .npy embedding
+    matrix next to it. Each write creates a new matrix file and then
+    atomically replaces the metadata, so readers only ever see a complete
+    snapshot. The matrices of the replaced snapshot are then deleted;
+    processes still mapping them keep a valid mapping.
+
+    Args:
+        path: Metadata file path
+        reg_numbers: Registration number of each row
+        names: Student name of each row
+        embeddings: (N, 128) float32 embedding matrix
+        stamp: Newest Face_embeddings.updated_at included in the snapshot
+        samples: Optional (S, 128) sample embeddings, student by student
+        sample_counts: Number of samples of each row
+
+    Returns:
+        True if the snapshot was written
+    """
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        generation = uuid.uuid4().hex[:12]
+        matrix_path = _embeddings_path(path, generation)
+        _write_matrix(matrix_path, embeddings)
+        samples_path = _embeddings_path(path, f"{generation}-samples")
+        if samples is None or sample_counts is None:
+            samples = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+            sample_counts = [0] * len(reg_numbers)
+        _write_matrix(samples_path, samples)
+
+        metadata = {
+            "format": SNAPSHOT_FORMAT,
+            "stamp": stamp,
+            "written_at": datetime.now().isoformat(),
+            "count": len(reg_numbers),
+            "embeddings_file": os.path.basename(matrix_path),
+            "samples_file": os.path.basename(samples_path),
+            "sample_counts": [int(count) for count in sample_counts],
+            "reg_numbers": list(reg_numbers),
+            "names": list(names)
+        }
+        tmp_path = f"{path}.{generation}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Workers on the same host may write at the same time: swap the
+        # metadata and drop the matrices it named as one step, and only
+        # those, so no writer deletes files another writer's metadata uses
+        with open(f"{path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            replaced = _snapshot_files(path)
+            os.replace(tmp_path, path)
+            for old_path in replaced - {os.path.abspath(matrix_path), os.path.abspath(samples_path)}:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+        return True
+    except Exception as e:
+        print(f"Error saving gallery snapshot to {path}: {e}")
+        return False
+
+
+def load_gallery_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Open a gallery snapshot written by save_gallery_snapshot
+
+    The embedding matrix is memory-mapped read-only, so opening is instant
+    and every process on the host that opens the same snapshot shares its
+    pages through the OS page cache.
+
+    Args:
+        path: Metadata file path
+
+    Returns:
+        Dictionary with reg_numbers, names, embeddings and samples
+        (read-only memmaps), sample_counts and stamp, or None if there is
+        no usable snapshot
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            metadata = json.load(f)
+        if metadata.get("format") != SNAPSHOT_FORMAT:
+            return None
+
+        matrix_path = os.path.join(os.path.dirname(os.path.abspath(path)), metadata["embeddings_file"])
+        embeddings = np.load(matrix_path, mmap_mode="r")
+        samples_path = os.path.join(os.path.dirname(os.path.abspath(path)), metadata["samples_file"])
+        samples = np.load(samples_path, mmap_mode="r")
+        sample_counts = np.asarray(metadata["sample_counts"], dtype=np.int64)
+        if (embeddings.shape[0] != metadata["count"] or len(metadata["reg_numbers"]) != metadata["count"]
+                or len(sample_counts) != metadata["count"] or int(sample_counts.sum()) != samples.shape[0]):
+            print(f"Gallery snapshot {path} is inconsistent, ignoring it")
+            return None
+
+        return {
+            "reg_numbers": metadata["reg_numbers"],
+            "names": metadata["names"],
+            "embeddings": embeddings,
+            "samples": samples,
+            "sample_counts": sample_counts,
+            "stamp": metadata["stamp"]
+        }
+    except Exception as e:
+        print(f"Error loading gallery snapshot from {path}: {e}")
+        return None
@@ -0,0 +1,357 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, List, Optional, Callable, Tuple, Union
+
+from config import (
+    RECOGNITION_PROCESS_WORKERS,
+    RECOGNITION_IO_WORKERS,
+    RECOGNITION_MAX_PENDING,
+    EMBEDDING_STORAGE_FORMAT,
+    BULK_REGISTRATION_MAX_IN_FLIGHT
+)
+from db.supabase import get_student_profiles
+from rabbitMQ.cache_events import publish_cache_event
+from services.cached_lookups import get_cached_student_profile
+from services.face_service import (
+    encode_faces_base64,
+    encode_faces_bytes,
+    encode_tracked_faces,
+    match_faces,
+    match_tracked_faces,
+    registration_face_error,
+    save_registered_face,
+    save_registered_faces
+)
+from services.face_tracker import FaceTracker
+from utils.embedding_codec import encode_embedding, encode_embedding_list
+
+
+class RecognitionBusy(Exception):
+    """Raised when the recognition queue is full and the caller asked not to wait"""
+
+    def __init__(self, pending: int, max_pending: int):
+        super().__init__(f"Recognition queue is full ({pending}/{max_pending} frames pending)")
+        self.pending = pending
+        self.max_pending = max_pending
+
+
+class RecognitionExecutor:
+    """
+    Runs face recognition off the asyncio event loop.
+
+    Face detection and encoding run in a process pool so they use every core
+    and never hold the event loop's GIL; matching and the blocking Supabase
+    calls run in a thread pool. At most ``max_pending`` requests are admitted
+    at once: callers either wait for a slot or get RecognitionBusy, which the
+    realtime endpoints turn into a "busy" reply so clients can back off.
+    """
+
+    def __init__(self, process_workers: int = RECOGNITION_PROCESS_WORKERS,
+                 io_workers: int = RECOGNITION_IO_WORKERS,
+                 max_pending: int = RECOGNITION_MAX_PENDING):
+        self.process_workers = process_workers
+        self.io_workers = io_workers
+        self.max_pending = max_pending
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+
+    def start(self) -> None:
+        if self._process_pool is None:
+            # spawn avoids forking a process that already runs threads and an event loop
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="recognition-io")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+    def shutdown(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=False, cancel_futures=True)
+            self._io_pool = None
+
+    @property
+    def is_busy(self) -> bool:
+        return self.pending >= self.max_pending
+
+    async def _acquire(self, wait: bool) -> None:
+        self.start()
+        if not wait and self._slots.locked():
+            raise RecognitionBusy(self.pending, self.max_pending)
+        await self._slots.acquire()
+        self.pending += 1
+
+    def _release(self) -> None:
+        self.pending -= 1
+        self._slots.release()
+
+    async def run_cpu(self, fn: Callable, *args, **kwargs):
+        """Run a picklable CPU-bound function in the process pool"""
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._process_pool, partial(fn, *args, **kwargs))
+
+    async def run_io(self, fn: Callable, *args, **kwargs):
+        """Run a blocking I/O function in the thread pool"""
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._io_pool, partial(fn, *args, **kwargs))
+
+    async def recognize(self, image_base64: Optional[str] = None, location: Optional[str] = None,
+                        course_code: Optional[str] = None, threshold: float = 0.6,
+                        global_fallback: bool = False, wait: bool = True,
+                        image_bytes=None, detection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Async equivalent of recognize_faces
+
+        Args:
+            image_base64: Base64 encoded image
+            image_bytes: Raw JPEG/PNG bytes, used instead of image_base64
+            location: Optional location information for attendance logging
+            course_code: Optional course code for attendance
+            threshold: Similarity threshold (lower is more strict)
+            global_fallback: See recognize_faces
+            wait: Wait for a free slot when the queue is full instead of
+                raising RecognitionBusy
+            detection: Optional detection options (see detection_options)
+
+        Returns:
+            Dictionary with recognized students
+        """
+        await self._acquire(wait)
+        try:
+            try:
+                if image_bytes is not None:
+                    # Worker processes receive a pickled copy, so hand over plain bytes
+                    if not isinstance(image_bytes, bytes):
+                        image_bytes = bytes(image_bytes)
+                    face_embeddings, face_locations = await self.run_cpu(encode_faces_bytes, image_bytes, **(detection or {}))
+                else:
+                    face_embeddings, face_locations = await self.run_cpu(encode_faces_base64, image_base64, **(detection or {}))
+            except Exception as e:
+                print(f"Error recognizing faces: {e}")
+                return {
+                    "success": False,
+                    "message": str(e),
+                    "students": [],
+                    "unknown_faces": [],
+                    "attendance_results": []
+                }
+
+            return await self.run_io(
+                match_faces,
+                face_embeddings=face_embeddings,
+                face_locations=face_locations,
+                location=location,
+                course_code=course_code,
+                threshold=threshold,
+                global_fallback=global_fallback
+            )
+        finally:
+            self._release()
+
+    async def recognize_tracked(self, tracker: FaceTracker, image_base64: Optional[str] = None,
+                                location: Optional[str] = None, course_code: Optional[str] = None,
+                                threshold: float = 0.6, global_fallback: bool = False,
+                                wait: bool = True, image_bytes=None,
+                                detection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        recognize() for a stream of frames followed by a FaceTracker
+
+        Only faces the tracker cannot vouch for are encoded and matched (see
+        match_tracked_faces). Frames of one tracker are processed one at a
+        time, in order.
+
+        Args:
+            tracker: The connection's FaceTracker
+            Other arguments as for recognize()
+
+        Returns:
+            Dictionary with recognized students
+        """
+        async with tracker.lock:
+            await self._acquire(wait)
+            try:
+                try:
+                    if image_bytes is not None and not isinstance(image_bytes, bytes):
+                        image_bytes = bytes(image_bytes)
+                    faces = await self.run_cpu(
+                        encode_tracked_faces,
+                        image_base64=image_base64,
+                        image_bytes=image_bytes,
+                        tracks=tracker.snapshot(),
+                        iou_threshold=tracker.iou_threshold,
+                        **(detection or {})
+                    )
+                except Exception as e:
+                    print(f"Error recognizing faces: {e}")
+                    return {
+                        "success": False,
+                        "message": str(e),
+                        "students": [],
+                        "unknown_faces": [],
+                        "attendance_results": []
+                    }
+
+                return await self.run_io(
+                    match_tracked_faces,
+                    tracker,
+                    faces,
+                    location=location,
+                    course_code=course_code,
+                    threshold=threshold,
+                    global_fallback=global_fallback
+                )
+            finally:
+                self._release()
+
+    async def register(self, reg_number: str, image_base64: str, wait: bool = True,
+                       replace: bool = False) -> Dict[str, Any]:
+        """
+        Async equivalent of register_face
+
+        Args:
+            reg_number: Student registration number
+            image_base64: Base64 encoded image
+            wait: Wait for a free slot when the queue is full instead of
+                raising RecognitionBusy
+            replace: Drop the student's previously registered photos instead
+                of adding this one to them
+
+        Returns:
+            Dictionary with operation result
+        """
+        await self._acquire(wait)
+        try:
+            student = await self.run_io(get_cached_student_profile, reg_number)
+            if not student["success"]:
+                return {"success": False, "message": "Student not found"}
+
+            try:
+                face_embeddings, _ = await self.run_cpu(encode_faces_base64, image_base64)
+            except Exception as e:
+                print(f"Error registering face: {e}")
+                return {"success": False, "message": str(e)}
+
+            result = await self.run_io(save_registered_face, reg_number, student, face_embeddings, replace)
+            if result["success"]:
+                # Let the other instances update their galleries without a reload
+                await publish_cache_event(
+                    "face_registered",
+                    reg_number=reg_number,
+                    name=student["data"].get("name"),
+                    embedding=encode_embedding(result["embedding"], EMBEDDING_STORAGE_FORMAT),
+                    samples=encode_embedding_list(result["samples"], EMBEDDING_STORAGE_FORMAT)
+                )
+            return result
+        finally:
+            self._release()
+
+    async def register_many(self, items: List[Tuple[str, Union[str, bytes]]],
+                            max_in_flight: int = BULK_REGISTRATION_MAX_IN_FLIGHT) -> Dict[str, Any]:
+        """
+        Register many faces at once, e.g. on enrollment days
+        
+        Profiles are checked with one query, images are encoded across the
+        process pool (at most ``max_in_flight`` at a time, so live
+        recognition keeps getting workers) and the embeddings are saved with
+        bulk upserts. Each encode holds one of the executor's pending slots,
+        so realtime callers get RecognitionBusy rather than queueing behind
+        a bulk load. A reg_number may appear more than once: every image
+        of the student that encodes is added to their samples, subject to
+        the usual per-student sample limit.
+        
+        Args:
+            items: (reg_number, image) pairs; image is base64 text or raw
+                JPEG/PNG bytes
+            max_in_flight: Images encoded concurrently
+        
+        Returns:
+            Dictionary with registered and failed counts and one result per
+            item, in input order
+        """
+        self.start()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        reg_numbers = list(dict.fromkeys(reg_number for reg_number, _ in items))
+        
+        profiles = await self.run_io(get_student_profiles, reg_numbers)
+        if not profiles["success"]:
+            return {"success": False, "message": profiles["message"]}
+        
+        slots = asyncio.Semaphore(max(1, max_in_flight))
+        
+        async def encode(i: int, reg_number: str, image) -> Optional[Dict[str, Any]]:
+            if reg_number not in profiles["data"]:
+                results[i] = {"reg_number": reg_number, "success": False, "message": "Student not found"}
+                return None
+            
+            async with slots:
+                # Each encode also takes one of the executor's pending slots
+                await self._acquire(True)
+                try:
+                    if isinstance(image, str):
+                        face_embeddings, _ = await self.run_cpu(encode_faces_base64, image)
+                    else:
+                        face_embeddings, _ = await self.run_cpu(encode_faces_bytes, bytes(image))
+                except Exception as e:
+                    print(f"Error registering face of {reg_number}: {e}")
+                    results[i] = {"reg_number": reg_number, "success": False, "message": str(e)}
+                    return None
+                finally:
+                    self._release()
+            
+            error = registration_face_error(face_embeddings)
+            if error:
+                results[i] = {"reg_number": reg_number, "success": False, "message": error}
+                return None
+            return {"index": i, "reg_number": reg_number, "embedding": face_embeddings[0]}
+        
+        # One entry per student holding all of their images that encoded
+        students: Dict[str, Dict[str, Any]] = {}
+        for face in await asyncio.gather(
+            *(encode(i, reg_number, image) for i, (reg_number, image) in enumerate(items))
+        ):
+            if face is None:
+                continue
+            entry = students.setdefault(face["reg_number"], {
+                "reg_number": face["reg_number"],
+                "name": profiles["data"][face["reg_number"]].get("name"),
+                "embeddings": [],
+                "indexes": []
+            })
+            entry["embeddings"].append(face["embedding"])
+            entry["indexes"].append(face["index"])
+        
+        encoded = list(students.values())
+        saved = await self.run_io(save_registered_faces, encoded) if encoded else {}
+        registered = []
+        faces_registered = 0
+        for entry in encoded:
+            for i in entry["indexes"]:
+                results[i] = {"reg_number": entry["reg_number"], **saved[entry["reg_number"]]}
+            if saved[entry["reg_number"]]["success"]:
+                registered.append(entry["reg_number"])
+                faces_registered += len(entry["indexes"])
+        
+        if registered:
+            # One event for the batch: other instances pull the new rows with an incremental sync
+            await publish_cache_event("faces_registered", reg_numbers=registered)
+        
+        return {
+            "success": True,
+            "message": f"Registered {faces_registered} of {len(items)} faces",
+            "registered": faces_registered,
+            "failed": len(items) - faces_registered,
+            "results": results
+        }
+
+
+# Shared executor for the attendance service
+recognition_executor = RecognitionExecutor()
@@ -0,0 +1,188 @@
+import numpy as np
+import pytest
+from services.ann_index import IVFIndex, load_index
+from services.face_gallery import FaceGallery
+
+DIM = 128
+
+
+def make_faces(n_people=400, per_person=5, noise=0.02, seed=0):
+    """Synthetic face-like embeddings: tight clusters around per-person centres"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.1, (n_people, DIM)).astype(np.float32)
+    gallery = np.repeat(centres, per_person, axis=0)
+    gallery += rng.normal(0, noise, gallery.shape).astype(np.float32)
+    queries = centres[rng.choice(n_people, 200)] + rng.normal(0, noise, (200, DIM)).astype(np.float32)
+    return gallery, queries
+
+
+def brute_force(gallery, queries, k=1):
+    dist = np.linalg.norm(gallery[None, :, :] - queries[:, None, :], axis=2)
+    return np.argsort(dist, axis=1)[:, :k]
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+@pytest.fixture
+def faces():
+    return make_faces()
+
+
+def test_ivf_recall_at_1(faces):
+    gallery, queries = faces
+    index = IVFIndex(nlist=32, nprobe=4)
+    index.train(gallery)
+    index.add(gallery, np.arange(len(gallery)))
+
+    ids, _ = index.search(queries, k=1)
+    assert recall_at_k(ids, brute_force(gallery, queries)) >= 0.95
+
+
+def test_ivf_recall_grows_with_nprobe(faces):
+    gallery, queries = faces
+    index = IVFIndex(nlist=64, nprobe=1)
+    index.train(gallery)
+    index.add(gallery, np.arange(len(gallery)))
+    truth = brute_force(gallery, queries, k=10)
+
+    recalls = [recall_at_k(index.search(queries, k=10, nprobe=nprobe)[0], truth) for nprobe in (1, 8, 64)]
+    assert recalls[0] <= recalls[1] <= recalls[2]
+    assert recalls[2] == 1.0  # visiting every cell is an exact search
+
+
+def test_ivf_distances_are_exact_for_found_neighbours(faces):
+    gallery, queries = faces
+    index = IVFIndex(nlist=32, nprobe=4)
+    index.train(gallery)
+    index.add(gallery, np.arange(len(gallery)))
+
+    ids, dist = index.search(queries, k=1)
+    expected = np.linalg.norm(gallery[ids[:, 0]] - queries, axis=1)
+    assert np.allclose(dist[:, 0], expected, atol=1e-4)
+
+
+def test_ivf_incremental_insert_and_replace(faces):
+    gallery, _ = faces
+    index = IVFIndex(nlist=32, nprobe=4)
+    index.train(gallery)
+    index.add(gallery, np.arange(len(gallery)))
+
+    new_face = np.full(DIM, 0.3, dtype=np.float32)
+    index.add(new_face[None, :], [len(gallery)])
+    ids, dist = index.search(new_face[None, :], k=1)
+    assert ids[0, 0] == len(gallery)
+    assert dist[0, 0] == pytest.approx(0.0, abs=1e-3)
+
+    # Re-adding an existing id moves it instead of duplicating it
+    index.add(new_face[None, :], [0])
+    assert len(index) == len(gallery) + 1
+    ids, _ = index.search(new_face[None, :], k=2)
+    assert set(ids[0]) == {0, len(gallery)}
+
+
+def test_ivf_persistence_roundtrip(faces, tmp_path):
+    gallery, queries = faces
+    index = IVFIndex(nlist=32, nprobe=4)
+    index.train(gallery)
+    index.add(gallery, np.arange(len(gallery)))
+    path = str(tmp_path / "face_index.npz")
+    index.save(path)
+
+    restored = load_index(path)
+    assert isinstance(restored, IVFIndex)
+    assert len(restored) == len(index)
+    assert np.array_equal(restored.search(queries, k=3)[0], index.search(queries, k=3)[0])
+
+
+def test_untrained_ivf_returns_no_neighbours():
+    ids, dist = IVFIndex().search(np.zeros((2, DIM), dtype=np.float32), k=1)
+    assert (ids == -1).all()
+    assert np.isinf(dist).all()
+
+
+def make_records(gallery):
+    return [
+        {"reg_number": f"EG/{i:05d}", "name": f"Student {i}", "embedding": vector.tolist()}
+        for i, vector in enumerate(gallery)
+    ]
+
+
+def test_gallery_uses_exact_search_below_min_size(faces):
+    gallery, queries = faces
+    face_gallery = FaceGallery(index_type="ivf", index_min_size=len(gallery) + 1, index_path=None)
+    face_gallery.load(make_records(gallery))
+    assert face_gallery._ann is None
+
+    truth = brute_force(gallery, queries)[:, 0]
+    matches = face_gallery.match(queries.tolist())
+    assert [m[0]["reg_number"] for m in matches] == [f"EG/{i:05d}" for i in truth]
+
+
+def test_gallery_ivf_recall_and_persisted_quantizer(faces, tmp_path):
+    gallery, queries = faces
+    path = str(tmp_path / "face_index.npz")
+    face_gallery = FaceGallery(index_type="ivf", index_min_size=100, nlist=32, nprobe=4, index_path=path)
+    face_gallery.load(make_records(gallery))
+    assert face_gallery._ann is not None
+
+    truth = brute_force(gallery, queries)[:, 0]
+    matches = face_gallery.match(queries.tolist())
+    found = np.array([int(m[0]["reg_number"][3:]) for m in matches])
+    assert (found == truth).mean() >= 0.95
+
+    # A restarted gallery reuses the stored centroids instead of retraining
+    centroids = face_gallery._ann.centroids.copy()
+    restarted = FaceGallery(index_type="ivf", index_min_size=100, nlist=32, nprobe=4, index_path=path)
+    restarted.load(make_records(gallery))
+    assert np.array_equal(restarted._ann.centroids, centroids)
+
+
+def test_gallery_upsert_is_searchable_through_index(faces):
+    gallery, _ = faces
+    face_gallery = FaceGallery(index_type="ivf", index_min_size=100, nlist=32, nprobe=4, index_path=None)
+    face_gallery.load(make_records(gallery))
+
+    new_face = np.full(DIM, 0.3, dtype=np.float32)
+    face_gallery.upsert("EG/NEW", new_face.tolist(), "New Student")
+    best_match, similarity = face_gallery.match([new_face.tolist()])[0]
+    assert best_match["reg_number"] == "EG/NEW"
+    assert similarity == pytest.approx(1.0, abs=1e-3)
+
+
+def test_gallery_upserts_are_persisted_and_build_the_index(faces, tmp_path):
+    gallery, _ = faces
+    path = str(tmp_path / "face_index.npz")
+    face_gallery = FaceGallery(index_type="ivf", index_min_size=len(gallery), nlist=32, nprobe=4, index_path=path)
+    face_gallery.load(make_records(gallery[:-1]))
+    assert face_gallery._ann is None
+
+    # Crossing index_min_size builds and saves the index
+    face_gallery.upsert("EG/LAST", gallery[-1].tolist(), "Last Student")
+    assert face_gallery._ann is not None and len(face_gallery._ann) == len(gallery)
+    assert len(load_index(path)) == len(gallery)
+
+    face_gallery.upsert("EG/NEW", np.full(DIM, 0.3).tolist(), "New Student")
+    assert len(load_index(path)) == len(gallery) + 1
+
+
+def test_gallery_keeps_upserts_made_while_a_load_trains(faces):
+    gallery, _ = faces
+    face_gallery = FaceGallery(index_type="ivf", index_min_size=100, nlist=32, nprobe=4, index_path=None)
+    new_face = np.full(DIM, 0.3, dtype=np.float32)
+    build_index = face_gallery._build_index
+
+    def build_during_upsert(state):
+        # A face_registered event lands while k-means runs
+        face_gallery.upsert("EG/NEW", new_face.tolist(), "New Student")
+        return build_index(state)
+
+    face_gallery._build_index = build_during_upsert
+    face_gallery.load(make_records(gallery))
+
+    assert len(face_gallery) == len(gallery) + 1
+    best_match, _ = face_gallery.match([new_face.tolist()])[0]
+    assert best_match["reg_number"] == "EG/NEW"
+    assert len(face_gallery._ann) == len(gallery) + 1
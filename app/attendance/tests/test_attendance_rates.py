@@ -0,0 +1,42 @@
+import pytest
+from utils.attendance_rates import percentage, summarize_counters, with_percentage
+
+
+@pytest.mark.parametrize("part, whole, expected", [
+    (0, 0, 0.0),
+    (3, 0, 0.0),
+    (1, 3, 33.33),
+    (2, 3, 66.67),
+    (5, 5, 100.0),
+])
+def test_percentage(part, whole, expected):
+    assert percentage(part, whole) == expected
+
+
+@pytest.mark.parametrize("rows, expected", [
+    ([], {"present": 0, "late": 0, "absent": 0, "excused": 0, "total": 0,
+          "attendance_rate": 0.0, "late_rate": 0.0}),
+    ([{"present": 3, "late": 1, "absent": 1, "excused": 0, "total": 5}],
+     {"present": 3, "late": 1, "absent": 1, "excused": 0, "total": 5,
+      "attendance_rate": 80.0, "late_rate": 20.0}),
+    ([{"present": 1, "late": None, "total": 2}, {"present": 2, "late": 1, "absent": 1, "total": 4}],
+     {"present": 3, "late": 1, "absent": 1, "excused": 0, "total": 6,
+      "attendance_rate": 66.67, "late_rate": 16.67}),
+])
+def test_summarize_counters(rows, expected):
+    assert summarize_counters(rows) == expected
+
+
+@pytest.mark.parametrize("row, sessions, attended, late_rate", [
+    ({"present": 0, "late": 0, "total": 0}, 0, 0.0, 0.0),
+    ({"present": 6, "late": 2, "total": 10}, 10, 80.0, 20.0),
+    # Sessions the student has no record for still count against them
+    ({"present": 4, "late": None, "total": 4}, 8, 50.0, 0.0),
+])
+def test_with_percentage(row, sessions, attended, late_rate):
+    result = with_percentage(row, sessions)
+
+    assert result["sessions"] == sessions
+    assert result["attendance_percentage"] == attended
+    assert result["late_rate"] == late_rate
+    assert result["present"] == row["present"]
@@ -0,0 +1,47 @@
+import pytest
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.run_benchmarks import measure, parse_args
+from benchmarks.synthetic import synthetic_gallery, synthetic_queries
+from services.face_gallery import FaceGallery
+
+
+def test_fake_supabase_filters_and_orders():
+    client = FakeSupabase()
+    client.table("Attendance logs").insert([
+        {"reg_number": "EG/1", "course_code": "C1", "timestamp": "2026-01-01T09:00:00"},
+        {"reg_number": "EG/2", "course_code": "C1", "timestamp": "2026-01-01T10:00:00"},
+        {"reg_number": "EG/3", "course_code": "C2", "timestamp": "2026-01-01T11:00:00"},
+    ]).execute()
+
+    result = client.table("Attendance logs").select("*") \
+        .eq("course_code", "C1") \
+        .gte("timestamp", "2026-01-01T00:00:00") \
+        .in_("reg_number", ["EG/1", "EG/2"]) \
+        .order("timestamp", desc=True) \
+        .execute()
+
+    assert [row["reg_number"] for row in result.data] == ["EG/2", "EG/1"]
+    assert client.round_trips == 2
+
+
+def test_synthetic_queries_match_their_gallery():
+    records = synthetic_gallery(200)
+    gallery = FaceGallery(index_type="exact", index_path=None)
+    gallery.load(records)
+
+    queries = synthetic_queries(records, frames=5, faces_per_frame=4, unknown_ratio=0.0)
+    for frame in queries:
+        for best_match, similarity in gallery.match(frame):
+            assert similarity > 0.6
+
+
+def test_measure_reports_percentiles_and_memory():
+    result = measure(lambda i: [0] * 1000, iterations=10, items_per_call=2)
+    assert result["iterations"] == 10
+    assert result["p50_ms"] <= result["p99_ms"] <= result["max_ms"]
+    assert result["peak_memory_bytes"] > 0
+
+
+def test_parse_args_rejects_unknown_stage():
+    with pytest.raises(SystemExit):
+        parse_args(["--stages", "match,bogus"])
@@ -0,0 +1,66 @@
+import json
+import numpy as np
+import pytest
+from utils.embedding_codec import (
+    EMBEDDING_DIM,
+    encode_embedding,
+    decode_embedding,
+    decode_embeddings,
+    encode_embedding_list,
+    storage_format_of,
+    storage_formats_of_list
+)
+
+
+@pytest.fixture
+def embedding():
+    return np.random.default_rng(0).normal(0, 0.1, EMBEDDING_DIM).astype(np.float32)
+
+
+@pytest.mark.parametrize("storage_format, tolerance, max_size", [
+    ("json", 1e-6, 4000),
+    ("float32", 0, 700),
+    ("float16", 1e-3, 350),
+    ("int8", 3e-3, 180),
+])
+def test_round_trip(embedding, storage_format, tolerance, max_size):
+    stored = encode_embedding(embedding, storage_format)
+    assert storage_format_of(stored) == storage_format
+    assert len(stored) <= max_size
+    np.testing.assert_allclose(decode_embedding(stored), embedding, atol=tolerance)
+
+
+def test_reads_legacy_json_rows(embedding):
+    legacy = json.dumps(embedding.tolist())
+    np.testing.assert_allclose(decode_embedding(legacy), embedding, atol=1e-6)
+    np.testing.assert_allclose(decode_embedding(embedding.tolist()), embedding, atol=1e-6)
+
+
+def test_decodes_into_preallocated_matrix(embedding):
+    stored = [encode_embedding(embedding * k, storage_format) for k, storage_format in
+              enumerate(["json", "float32", "float16", "int8"], start=1)]
+    matrix = np.zeros((6, EMBEDDING_DIM), dtype=np.float32)
+
+    result = decode_embeddings(stored, out=matrix)
+
+    assert result.shape == (4, EMBEDDING_DIM)
+    assert np.shares_memory(result, matrix)
+    np.testing.assert_allclose(matrix[1], embedding * 2)
+    assert not matrix[4:].any()
+
+
+def test_rejects_unknown_encoding():
+    with pytest.raises(ValueError):
+        decode_embedding("f64:AAAA")
+    with pytest.raises(ValueError):
+        encode_embedding([0.0] * EMBEDDING_DIM, "float64")
+
+
+def test_storage_formats_of_sample_lists(embedding):
+    samples = np.stack([embedding, embedding * 2])
+    mixed = ";".join([encode_embedding(embedding, "json"), encode_embedding(embedding, "int8")])
+
+    assert storage_formats_of_list(None) == set()
+    assert storage_formats_of_list("") == set()
+    assert storage_formats_of_list(encode_embedding_list(samples, "float16")) == {"float16"}
+    assert storage_formats_of_list(mixed) == {"json", "int8"}
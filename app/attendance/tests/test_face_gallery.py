@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+from services.face_gallery import FaceGallery, CourseGalleryCache
+
+DIM = 128
+
+
+@pytest.fixture
+def gallery():
+    rng = np.random.default_rng(1)
+    face_gallery = FaceGallery(index_type="exact", index_path=None)
+    face_gallery.load([
+        {"reg_number": f"EG/{i:03d}", "name": f"Student {i}", "embedding": rng.normal(0, 0.1, DIM).tolist()}
+        for i in range(50)
+    ])
+    return face_gallery
+
+
+def embedding_of(gallery, reg_number):
+    state = gallery._state
+    return state.embeddings[state.index[reg_number]].tolist()
+
+
+def test_match_returns_closest_student(gallery):
+    best_match, similarity = gallery.match([embedding_of(gallery, "EG/007")])[0]
+    assert best_match == {"reg_number": "EG/007", "name": "Student 7"}
+    assert similarity == pytest.approx(1.0, abs=1e-3)
+
+
+def test_subset_only_contains_requested_students(gallery):
+    view = gallery.subset(["EG/001", "EG/002", "EG/999"])
+    assert len(view) == 2
+
+    # A face outside the subset can only match someone inside it
+    best_match, _ = view.match([embedding_of(gallery, "EG/007")])[0]
+    assert best_match["reg_number"] in {"EG/001", "EG/002"}
+
+
+def test_course_cache_reuses_enrollments_until_invalidated(gallery):
+    calls = []
+
+    def load_enrollments(course_code):
+        calls.append(course_code)
+        return ["EG/001", "EG/002"]
+
+    cache = CourseGalleryCache(gallery, ttl_seconds=60)
+    assert len(cache.get("CS101", load_enrollments)) == 2
+    assert len(cache.get("CS101", load_enrollments)) == 2
+    assert calls == ["CS101"]
+
+    cache.invalidate("CS101")
+    cache.get("CS101", load_enrollments)
+    assert calls == ["CS101", "CS101"]
+
+
+def test_course_cache_picks_up_new_faces_without_reloading(gallery):
+    cache = CourseGalleryCache(gallery, ttl_seconds=60)
+    enrolled = ["EG/001", "EG/NEW"]
+    assert len(cache.get("CS101", lambda course_code: enrolled)) == 1
+
+    gallery.upsert("EG/NEW", [0.2] * DIM, "New Student")
+    view = cache.get("CS101", lambda course_code: pytest.fail("enrollments reloaded"))
+    assert len(view) == 2
+
+
+def test_course_cache_returns_none_when_enrollments_unavailable(gallery):
+    cache = CourseGalleryCache(gallery)
+    assert cache.get("CS101", lambda course_code: None) is None
+
+
+def test_refine_matches_against_samples_of_close_candidates():
+    rng = np.random.default_rng(2)
+    centroids = rng.normal(0, 0.1, (30, DIM)).astype(np.float32)
+    # EG/000 registered two quite different photos; their mean is far from both
+    photos = np.stack([centroids[0] + 0.25, centroids[0] - 0.25]).astype(np.float32)
+    centroids[0] = photos.mean(axis=0)
+    reg_numbers = [f"EG/{i:03d}" for i in range(30)]
+
+    refined = FaceGallery(index_type="exact", index_path=None, refine_candidates=30)
+    refined.load_matrix(reg_numbers, reg_numbers, centroids, photos, [2] + [0] * 29)
+    centroid_only = FaceGallery(index_type="exact", index_path=None)
+    centroid_only.load_matrix(reg_numbers, reg_numbers, centroids)
+
+    best_match, similarity = refined.match([photos[1].tolist()])[0]
+    assert best_match["reg_number"] == "EG/000"
+    assert similarity == pytest.approx(1.0, abs=1e-3)
+    assert centroid_only.match([photos[1].tolist()])[0][1] < similarity
+
+
+def test_upsert_replaces_samples_and_subset_keeps_them(gallery):
+    photos = np.full((3, DIM), 0.3, dtype=np.float32)
+    photos[1] += 0.1
+    gallery.upsert("EG/001", photos.mean(axis=0), samples=photos)
+    gallery.upsert("EG/002", photos.mean(axis=0), samples=photos[:1])
+    gallery.upsert("EG/001", photos[2], samples=photos[2:])
+
+    state = gallery.snapshot()
+    assert state.sample_counts[state.index["EG/001"]] == 1
+    samples, counts = gallery.packed_samples()
+    assert len(samples) == counts.sum() == 2
+
+    view = gallery.subset(["EG/001", "EG/002"])
+    view_samples, view_counts = view.packed_samples()
+    assert view_counts.tolist() == [1, 1]
+    np.testing.assert_array_equal(view_samples, [photos[2], photos[0]])
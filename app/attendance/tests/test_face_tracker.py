@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from services.face_tracker import FaceTracker, associate, box_iou
+
+DIM = 128
+
+
+def test_box_iou():
+    box = (10, 60, 60, 10)
+    assert box_iou(box, box) == pytest.approx(1.0)
+    assert box_iou(box, (100, 160, 160, 100)) == 0.0
+    # Shifted by half its width
+    assert box_iou(box, (10, 85, 60, 35)) == pytest.approx(1 / 3)
+
+
+def test_associate_pairs_each_track_once():
+    tracks = [(10, 60, 60, 10), (10, 160, 60, 110)]
+    boxes = [(12, 162, 62, 112), (11, 61, 61, 11), (300, 350, 350, 300)]
+    assert associate(boxes, tracks, iou_threshold=0.3) == [1, 0, None]
+    # Two faces over one track: only the better overlap gets it
+    assert associate([(10, 60, 60, 10), (15, 65, 65, 15)], tracks[:1], iou_threshold=0.3) == [0, None]
+
+
+def test_identified_track_is_reused_until_confidence_decays():
+    tracker = FaceTracker(confidence_decay=0.9, min_confidence=0.5)
+    box = (10, 60, 60, 10)
+    embedding = np.zeros(DIM).tolist()
+
+    tracker.new_frame()
+    track = tracker.observe(None, box, embedding)
+    tracker.identify(track, {"reg_number": "EG/001"}, similarity=0.65)
+    assert tracker.snapshot() == [(track.track_id, box, True)]
+
+    reused = 0
+    while True:
+        tracker.new_frame()
+        if tracker.reuse(track.track_id, box) is None:
+            break
+        reused += 1
+    # 0.65 * 0.9^3 = 0.474 < 0.5
+    assert reused == 3
+    assert tracker.snapshot() == [(track.track_id, box, False)]
+
+
+def test_different_face_on_a_track_starts_a_new_track():
+    tracker = FaceTracker(identity_distance=0.6)
+    box = (10, 60, 60, 10)
+
+    tracker.new_frame()
+    track = tracker.observe(None, box, np.zeros(DIM).tolist())
+    tracker.identify(track, {"reg_number": "EG/001"}, similarity=0.9)
+
+    tracker.new_frame()
+    same = tracker.observe(track.track_id, box, np.full(DIM, 0.01).tolist())
+    assert same is track and not same.identified
+
+    tracker.new_frame()
+    other = tracker.observe(track.track_id, box, np.full(DIM, 0.5).tolist())
+    assert other.track_id != track.track_id
+
+
+def test_lost_tracks_are_pruned():
+    tracker = FaceTracker(max_missed_frames=2)
+    tracker.new_frame()
+    tracker.observe(None, (10, 60, 60, 10), np.zeros(DIM).tolist())
+    for _ in range(3):
+        tracker.new_frame()
+    tracker.prune()
+    assert tracker.tracks == {}
@@ -0,0 +1,30 @@
+import pytest
+from utils.frame_codec import build_binary_frame, parse_binary_frame
+
+
+def test_roundtrip_keeps_metadata_and_image():
+    image = b"\xff\xd8\xff\xe0fake-jpeg-bytes"
+    frame = build_binary_frame({"course_code": "CS101", "threshold": 0.55}, image)
+
+    metadata, image_view = parse_binary_frame(frame)
+    assert metadata == {"course_code": "CS101", "threshold": 0.55}
+    assert isinstance(image_view, memoryview)
+    assert image_view.tobytes() == image
+
+
+def test_image_is_a_view_of_the_message():
+    frame = bytearray(build_binary_frame({}, b"abc"))
+    _, image_view = parse_binary_frame(frame)
+    frame[-1] = ord("z")
+    assert image_view.tobytes() == b"abz"
+
+
+@pytest.mark.parametrize("frame", [b"", b"\x00\x00", b"\x00\x00\x00\x10{}"])
+def test_rejects_truncated_frames(frame):
+    with pytest.raises(ValueError):
+        parse_binary_frame(frame)
+
+
+def test_rejects_non_object_metadata():
+    with pytest.raises(ValueError):
+        parse_binary_frame(b"\x00\x00\x00\x02[]")
@@ -0,0 +1,117 @@
+import numpy as np
+from services.face_gallery import FaceGallery
+from services.gallery_snapshot import save_gallery_snapshot, load_gallery_snapshot
+
+DIM = 128
+
+
+def make_gallery(size=20, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"EG/{i:03d}" for i in range(size)], [f"Student {i}" for i in range(size)], \
+        rng.normal(0, 0.1, (size, DIM)).astype(np.float32)
+
+
+def test_snapshot_round_trip_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "gallery.json")
+    reg_numbers, names, embeddings = make_gallery()
+
+    assert save_gallery_snapshot(path, reg_numbers, names, embeddings, "2026-01-01T00:00:00+00:00")
+    snapshot = load_gallery_snapshot(path)
+
+    assert snapshot["stamp"] == "2026-01-01T00:00:00+00:00"
+    assert snapshot["reg_numbers"] == reg_numbers
+    assert isinstance(snapshot["embeddings"], np.memmap)
+    np.testing.assert_array_equal(snapshot["embeddings"], embeddings)
+
+
+def test_rewrite_replaces_old_matrix(tmp_path):
+    path = str(tmp_path / "gallery.json")
+    reg_numbers, names, embeddings = make_gallery()
+    save_gallery_snapshot(path, reg_numbers, names, embeddings, "a")
+    save_gallery_snapshot(path, reg_numbers[:5], names[:5], embeddings[:5], "b")
+
+    snapshot = load_gallery_snapshot(path)
+    assert snapshot["stamp"] == "b"
+    assert len(snapshot["embeddings"]) == 5
+    assert len(list(tmp_path.glob("*.npy"))) == 2  # centroids and samples
+
+
+def test_rewrite_keeps_matrices_of_other_writers(tmp_path):
+    path = str(tmp_path / "gallery.json")
+    reg_numbers, names, embeddings = make_gallery()
+    save_gallery_snapshot(path, reg_numbers, names, embeddings, "a")
+    # Another worker has written its matrix but not yet its metadata
+    in_progress = tmp_path / "gallery.0123456789ab.npy"
+    np.save(str(in_progress), embeddings)
+
+    save_gallery_snapshot(path, reg_numbers, names, embeddings, "b")
+
+    assert in_progress.exists()
+    assert len(list(tmp_path.glob("*.npy"))) == 3
+    assert load_gallery_snapshot(path)["stamp"] == "b"
+
+
+def test_missing_or_corrupt_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "gallery.json"
+    assert load_gallery_snapshot(str(path)) is None
+    path.write_text("{not json")
+    assert load_gallery_snapshot(str(path)) is None
+
+
+def test_gallery_on_snapshot_applies_changes_without_touching_the_map(tmp_path):
+    path = str(tmp_path / "gallery.json")
+    reg_numbers, names, embeddings = make_gallery()
+    save_gallery_snapshot(path, reg_numbers, names, embeddings, "a")
+    snapshot = load_gallery_snapshot(path)
+
+    gallery = FaceGallery(index_type="exact", index_path=None)
+    gallery.load_matrix(snapshot["reg_numbers"], snapshot["names"], snapshot["embeddings"])
+    assert np.shares_memory(gallery.snapshot().embeddings, snapshot["embeddings"])
+
+    changed = np.full((2, DIM), 0.05, dtype=np.float32)
+    gallery.upsert_many(["EG/003", "EG/999"], [None, "New"], changed)
+
+    assert len(gallery) == 21
+    assert gallery.match([changed[0].tolist()])[0][0]["reg_number"] in ("EG/003", "EG/999")
+    assert gallery.snapshot().names[3] == "Student 3"
+    np.testing.assert_array_equal(snapshot["embeddings"], embeddings)
+
+
+def test_snapshot_keeps_samples(tmp_path):
+    path = str(tmp_path / "gallery.json")
+    reg_numbers, names, embeddings = make_gallery(size=3)
+    samples = np.random.default_rng(1).normal(0, 0.1, (4, DIM)).astype(np.float32)
+    save_gallery_snapshot(path, reg_numbers, names, embeddings, "a", samples, [2, 0, 2])
+
+    snapshot = load_gallery_snapshot(path)
+    assert snapshot["sample_counts"].tolist() == [2, 0, 2]
+    np.testing.assert_array_equal(snapshot["samples"], samples)
+
+
+def test_gallery_goes_back_to_the_map_after_a_rewrite(tmp_path):
+    path = str(tmp_path / "gallery.json")
+    reg_numbers, names, embeddings = make_gallery()
+    save_gallery_snapshot(path, reg_numbers, names, embeddings, "a")
+    snapshot = load_gallery_snapshot(path)
+    gallery = FaceGallery(index_type="exact", index_path=None)
+    gallery.load_matrix(snapshot["reg_numbers"], snapshot["names"], snapshot["embeddings"],
+                        snapshot["samples"], snapshot["sample_counts"])
+
+    # Replacing a student twice leaves a hole in the private samples matrix
+    sample = np.full((1, DIM), 0.05, dtype=np.float32)
+    gallery.upsert_many(["EG/003"], [None], sample, sample, [1])
+    gallery.upsert_many(["EG/003"], [None], sample, sample, [1])
+    gallery.upsert_many(["EG/004"], [None], sample * 2, sample * 2, [1])
+    state = gallery.snapshot()
+    assert len(state.samples) == 3
+    samples, counts = gallery.packed_samples(state)
+    save_gallery_snapshot(path, state.reg_numbers, state.names, state.embeddings, "b", samples, counts)
+    rewritten = load_gallery_snapshot(path)
+    expected = gallery.match([embeddings[7].tolist(), (sample[0] * 2).tolist()])
+
+    assert gallery.use_mapped(state, rewritten["embeddings"], rewritten["samples"])
+    assert np.shares_memory(gallery.snapshot().embeddings, rewritten["embeddings"])
+    assert np.shares_memory(gallery.snapshot().samples, rewritten["samples"])
+    assert gallery.match([embeddings[7].tolist(), (sample[0] * 2).tolist()]) == expected
+    # A state the gallery has since moved on from is left alone
+    assert not gallery.use_mapped(state, rewritten["embeddings"], rewritten["samples"])
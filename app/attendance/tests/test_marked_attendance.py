@@ -0,0 +1,46 @@
+from datetime import date
+from db.marked_attendance import MarkedAttendance
+
+
+def test_seed_and_mark():
+    marked = MarkedAttendance(today=lambda: date(2024, 3, 4))
+    assert not marked.is_seeded("CS101")
+
+    marked.seed("CS101", [("EG/1", "2024-03-04T09:10:00"), ("EG/1", "2024-03-04T08:00:00")])
+    marked.mark("CS101", "EG/2", "2024-03-04T09:20:00")
+
+    assert marked.is_seeded("CS101")
+    assert marked.last_marked("CS101", "EG/1") == "2024-03-04T09:10:00"
+    assert marked.last_marked("CS101", "EG/2") == "2024-03-04T09:20:00"
+    assert marked.last_marked("CS101", "EG/3") is None
+    assert marked.last_marked("CS102", "EG/1") is None
+    assert marked.stats()["students"] == 2
+
+
+def test_marks_before_seed_are_kept():
+    marked = MarkedAttendance(today=lambda: date(2024, 3, 4))
+    marked.mark("CS101", "EG/2", "2024-03-04T09:20:00")
+    marked.seed("CS101", [])
+
+    assert marked.last_marked("CS101", "EG/2") == "2024-03-04T09:20:00"
+
+
+def test_rolls_over_at_midnight():
+    today = [date(2024, 3, 4)]
+    marked = MarkedAttendance(today=lambda: today[0])
+    marked.seed("CS101", [("EG/1", "2024-03-04T09:10:00")])
+
+    today[0] = date(2024, 3, 5)
+
+    assert not marked.is_seeded("CS101")
+    assert marked.last_marked("CS101", "EG/1") is None
+
+
+def test_invalidate_course():
+    marked = MarkedAttendance(today=lambda: date(2024, 3, 4))
+    marked.seed("CS101", [("EG/1", "2024-03-04T09:10:00")])
+    marked.seed("CS102", [])
+    marked.invalidate("CS101")
+
+    assert not marked.is_seeded("CS101")
+    assert marked.is_seeded("CS102")
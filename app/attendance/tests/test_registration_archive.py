@@ -0,0 +1,30 @@
+import base64
+import io
+import zipfile
+import pytest
+from utils.registration_archive import read_registration_archive
+
+
+def make_archive(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_reg_number_is_path_without_extension():
+    archive = make_archive({
+        "EG/2020/1234.jpg": b"a",
+        "EG2021_0001.PNG": b"b",
+        "notes.txt": b"c",
+        "__MACOSX/EG/2020/._1234.jpg": b"d",
+        ".DS_Store": b"e",
+    })
+
+    assert read_registration_archive(archive) == [("EG/2020/1234", b"a"), ("EG2021_0001", b"b")]
+
+
+def test_rejects_non_zip():
+    with pytest.raises(zipfile.BadZipFile):
+        read_registration_archive(base64.b64encode(b"not a zip").decode())
@@ -0,0 +1,37 @@
+import csv
+import io
+import json
+from utils.report_stream import csv_lines, ndjson_lines, stream_lines
+
+
+ROWS = [
+    {"reg_number": "EG/1", "status": "present", "location": "Hall, A", "extra": 1},
+    {"reg_number": "EG/2", "status": "late", "location": None},
+]
+
+
+def test_ndjson_one_object_per_line():
+    lines = list(ndjson_lines(ROWS))
+
+    assert len(lines) == 2
+    assert all(line.endswith("\n") for line in lines)
+    assert json.loads(lines[1]) == ROWS[1]
+
+
+def test_csv_header_and_rows():
+    lines = list(csv_lines(ROWS, ["reg_number", "status", "location"]))
+
+    assert len(lines) == 3
+    parsed = list(csv.reader(io.StringIO("".join(lines))))
+    assert parsed[0] == ["reg_number", "status", "location"]
+    assert parsed[1] == ["EG/1", "present", "Hall, A"]
+    assert parsed[2] == ["EG/2", "late", ""]
+
+
+def test_stream_lines_is_lazy():
+    def rows():
+        yield ROWS[0]
+        raise AssertionError("read past the first row")
+
+    lines = stream_lines(rows(), "ndjson", [])
+    assert json.loads(next(lines))["reg_number"] == "EG/1"
@@ -0,0 +1,66 @@
+import time
+from utils.ttl_cache import TTLCache, cache_stats
+
+
+def test_hits_misses_and_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache("test_expiry", ttl_seconds=10)
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return {"success": True, "key": key}
+
+    assert cache.get("a", loader)["key"] == "a"
+    assert cache.get("a", loader)["key"] == "a"
+    now[0] += 11
+    cache.get("a", loader)
+
+    assert loads == ["a", "a"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 0.3333
+
+
+def test_failed_loads_are_not_cached():
+    cache = TTLCache("test_failures", ttl_seconds=60)
+    cache.get("missing", lambda key: {"success": False}, cache_if=lambda result: result["success"])
+    assert len(cache) == 0
+
+
+def test_invalidate_records_lag():
+    cache = TTLCache("test_invalidate", ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.invalidate("a", changed_at=time.time() - 2)
+    assert cache.get("b", lambda key: None) == 2
+    assert cache.get("a", lambda key: "reloaded") == "reloaded"
+    assert cache.stats()["last_invalidation_lag_seconds"] >= 2
+
+    cache.invalidate()
+    assert len(cache) == 0
+    assert "test_invalidate" in cache_stats()
+
+
+def test_invalidation_during_a_load_is_not_overwritten():
+    cache = TTLCache("test_load_race", ttl_seconds=60)
+
+    def loader(key):
+        # The row changes, and its invalidation arrives, while this load runs
+        cache.invalidate(key)
+        return "stale"
+
+    assert cache.get("a", loader) == "stale"
+    assert len(cache) == 0
+    assert cache.get("a", lambda key: "fresh") == "fresh"
+    assert cache.get("a", lambda key: None) == "fresh"
+
+
+def test_max_size_evicts_oldest():
+    cache = TTLCache("test_eviction", ttl_seconds=60, max_size=2)
+    for key in "abc":
+        cache.set(key, key)
+    assert cache.get("a", lambda key: "reloaded") == "reloaded"
+    assert cache.get("c", lambda key: None) == "c"
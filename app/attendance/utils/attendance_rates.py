@@ -0,0 +1,35 @@
+from typing import Dict, Any, List
+
+COUNTERS = ("present", "late", "absent", "excused", "total")
+
+
+def percentage(part: int, whole: int) -> float:
+    """part / whole as a percentage rounded to 2 places, 0 when whole is 0"""
+    return round(part / whole * 100, 2) if whole else 0.0
+
+
+def summarize_counters(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Add up counter rows and derive rates
+    
+    Args:
+        rows: Rows with present/late/absent/excused/total counters
+        
+    Returns:
+        Summed counters with attendance_rate ((present + late) / total) and
+        late_rate (late / total) as percentages
+    """
+    totals = {name: sum(row.get(name) or 0 for row in rows) for name in COUNTERS}
+    totals["attendance_rate"] = percentage(totals["present"] + totals["late"], totals["total"])
+    totals["late_rate"] = percentage(totals["late"], totals["total"])
+    return totals
+
+
+def with_percentage(row: Dict[str, Any], sessions: int) -> Dict[str, Any]:
+    """A student's counters with the share of the course's sessions attended"""
+    return dict(
+        row,
+        sessions=sessions,
+        attendance_percentage=percentage((row.get("present") or 0) + (row.get("late") or 0), sessions),
+        late_rate=percentage(row.get("late") or 0, row.get("total") or 0)
+    )
@@ -0,0 +1,142 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Set
+import numpy as np
+
+# Stored embedding layout (text, so it fits the existing column):
+#   "[0.1, -0.2, ...]"       legacy JSON list of floats
+#   "f32:" + base64(...)     128 little-endian float32 (512 bytes)
+#   "f16:" + base64(...)     128 little-endian float16 (256 bytes)
+#   "i8:"  + base64(...)     float32 scale followed by 128 int8 (132 bytes);
+#                            value = int8 * scale
+# A list of embeddings (Face_embeddings.face_samples) joins encoded
+# embeddings with ";"
+EMBEDDING_DIM = 128
+LIST_SEPARATOR = ";"
+FORMAT_PREFIXES = {
+    "float32": "f32",
+    "float16": "f16",
+    "int8": "i8"
+}
+STORAGE_FORMATS = ["json"] + list(FORMAT_PREFIXES)
+_PREFIX_FORMATS = {prefix: storage_format for storage_format, prefix in FORMAT_PREFIXES.items()}
+
+
+def encode_embedding(embedding: Sequence[float], storage_format: str = "float32") -> str:
+    """
+    Encode a face embedding for the face_embedding column
+
+    Args:
+        embedding: The face embedding
+        storage_format: "float32", "float16", "int8" or "json"
+
+    Returns:
+        The encoded embedding
+    """
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+
+    if storage_format == "json":
+        return json.dumps(vector.tolist())
+    if storage_format == "float32":
+        payload = vector.astype("<f4").tobytes()
+    elif storage_format == "float16":
+        payload = vector.astype("<f2").tobytes()
+    elif storage_format == "int8":
+        # Symmetric per-vector quantization
+        scale = float(np.abs(vector).max()) / 127 or 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        payload = np.float32(scale).astype("<f4").tobytes() + quantized.tobytes()
+    else:
+        raise ValueError(f"Unknown embedding storage format: {storage_format}")
+
+    return f"{FORMAT_PREFIXES[storage_format]}:{base64.b64encode(payload).decode('ascii')}"
+
+
+def storage_format_of(value: Any) -> str:
+    """Storage format of a stored embedding ("json" for legacy rows)"""
+    if isinstance(value, list) or value.lstrip().startswith("["):
+        return "json"
+    prefix = value.partition(":")[0]
+    if prefix not in _PREFIX_FORMATS:
+        raise ValueError(f"Unknown embedding encoding: {prefix!r}")
+    return _PREFIX_FORMATS[prefix]
+
+
+def decode_embedding_into(value: Any, out: np.ndarray) -> None:
+    """
+    Decode a stored embedding into an existing float32 array
+
+    Args:
+        value: Stored embedding in any supported format. Lists (e.g. from a
+            JSON column) are accepted as legacy rows.
+        out: (128,) float32 array to write to, typically a row of a
+            preallocated gallery matrix
+    """
+    storage_format = storage_format_of(value)
+
+    if storage_format == "json":
+        out[:] = value if isinstance(value, list) else json.loads(value)
+        return
+
+    raw = base64.b64decode(value.partition(":")[2])
+    if storage_format == "float32":
+        out[:] = np.frombuffer(raw, dtype="<f4")
+    elif storage_format == "float16":
+        out[:] = np.frombuffer(raw, dtype="<f2")
+    else:
+        scale = np.frombuffer(raw, dtype="<f4", count=1)[0]
+        np.multiply(np.frombuffer(raw, dtype=np.int8, offset=4), scale, out=out)
+
+
+def decode_embedding(value: Any) -> np.ndarray:
+    """Decode a stored embedding into a new (128,) float32 array"""
+    out = np.empty(EMBEDDING_DIM, dtype=np.float32)
+    decode_embedding_into(value, out)
+    return out
+
+
+def decode_embeddings(values: List[Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Decode stored embeddings into a (len(values), 128) float32 matrix
+
+    Args:
+        values: Stored embeddings
+        out: Optional preallocated matrix with at least len(values) rows
+
+    Returns:
+        The filled matrix (out[:len(values)] when out is given)
+    """
+    if out is None:
+        out = np.empty((len(values), EMBEDDING_DIM), dtype=np.float32)
+    for row, value in enumerate(values):
+        decode_embedding_into(value, out[row])
+    return out[:len(values)]
+
+
+def encode_embedding_list(embeddings: np.ndarray, storage_format: str = "float32") -> str:
+    """Encode several embeddings for the face_samples column"""
+    vectors = np.asarray(embeddings, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+    return LIST_SEPARATOR.join(encode_embedding(vector, storage_format) for vector in vectors)
+
+
+def decode_embedding_list(value: Optional[str]) -> np.ndarray:
+    """
+    Decode a face_samples value
+
+    Args:
+        value: Value written by encode_embedding_list, or None/"" for rows
+            without samples
+
+    Returns:
+        (K, 128) float32 matrix, K = 0 for rows without samples
+    """
+    if not value:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    return decode_embeddings(value.split(LIST_SEPARATOR))
+
+
+def storage_formats_of_list(value: Optional[str]) -> Set[str]:
+    """Storage formats used by a face_samples value (empty for rows without samples)"""
+    if not value:
+        return set()
+    return {storage_format_of(item) for item in value.split(LIST_SEPARATOR)}
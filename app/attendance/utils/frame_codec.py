@@ -0,0 +1,54 @@
+import json
+import struct
+from typing import Any, Dict, Tuple, Union
+
+# Binary frame layout:
+#   4 bytes   big-endian unsigned length N of the metadata
+#   N bytes   UTF-8 JSON metadata (threshold, location, course_code, ...)
+#   rest      raw JPEG/PNG image bytes
+PREAMBLE = struct.Struct(">I")
+MAX_METADATA_SIZE = 64 * 1024
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def parse_binary_frame(data: BytesLike) -> Tuple[Dict[str, Any], memoryview]:
+    """
+    Split a binary frame into its metadata and image bytes
+
+    Args:
+        data: The whole binary message
+
+    Returns:
+        Tuple of (metadata dictionary, memoryview over the image bytes).
+        The image is not copied.
+    """
+    view = memoryview(data)
+    if len(view) < PREAMBLE.size:
+        raise ValueError("Binary frame is too short")
+
+    (metadata_size,) = PREAMBLE.unpack_from(view)
+    if metadata_size > MAX_METADATA_SIZE or PREAMBLE.size + metadata_size > len(view):
+        raise ValueError("Invalid binary frame metadata length")
+
+    metadata_end = PREAMBLE.size + metadata_size
+    metadata = json.loads(bytes(view[PREAMBLE.size:metadata_end])) if metadata_size else {}
+    if not isinstance(metadata, dict):
+        raise ValueError("Binary frame metadata must be a JSON object")
+
+    return metadata, view[metadata_end:]
+
+
+def build_binary_frame(metadata: Dict[str, Any], image_bytes: BytesLike) -> bytes:
+    """
+    Build a binary frame, e.g. for clients and tests
+
+    Args:
+        metadata: JSON-serialisable metadata
+        image_bytes: Encoded JPEG/PNG image
+
+    Returns:
+        The binary message
+    """
+    encoded = json.dumps(metadata).encode("utf-8") if metadata else b""
+    return PREAMBLE.pack(len(encoded)) + encoded + bytes(image_bytes)
@@ -0,0 +1,58 @@
+import base64
+import io
+import posixpath
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+# Refuse archives that would expand past this many bytes
+MAX_ARCHIVE_SIZE = 512 * 1024 * 1024
+
+
+def read_registration_archive(archive_base64: str) -> List[Tuple[str, bytes]]:
+    """
+    Read (reg_number, image bytes) pairs from a base64 encoded zip archive
+
+    Each image's path inside the archive, without its extension, is the
+    student's registration number, so "EG/2020/1234.jpg" (a nested folder)
+    registers EG/2020/1234. Non-image entries and macOS metadata are skipped.
+
+    Args:
+        archive_base64: Base64 encoded zip file
+
+    Returns:
+        List of (reg_number, image bytes) in archive order
+    """
+    archive = zipfile.ZipFile(io.BytesIO(base64.b64decode(archive_base64)))
+    entries = [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and not posixpath.basename(info.filename).startswith(".")
+        and posixpath.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS
+    ]
+    if sum(info.file_size for info in entries) > MAX_ARCHIVE_SIZE:
+        raise ValueError("Registration archive is too large")
+
+    return [
+        (posixpath.splitext(info.filename)[0].strip("/"), archive.read(info))
+        for info in entries
+    ]
+
+
+def registration_items(faces: List[Dict[str, Any]],
+                       archive_base64: Optional[str] = None) -> List[Tuple[str, Any]]:
+    """
+    Collect the (reg_number, image) pairs of a bulk registration request
+
+    Args:
+        faces: Dictionaries with reg_number and image_base64
+        archive_base64: Optional zip archive (see read_registration_archive)
+
+    Returns:
+        List of (reg_number, base64 text or image bytes), listed faces first
+    """
+    items = [(face["reg_number"], face["image_base64"]) for face in faces]
+    if archive_base64:
+        items.extend(read_registration_archive(archive_base64))
+    return items
@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Content type of each streaming report format
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+def ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """One JSON object per line"""
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+def csv_lines(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[str]:
+    """
+    A header line followed by one CSV line per row
+
+    Args:
+        rows: Row dictionaries; keys outside ``columns`` are dropped
+        columns: Column order of the output
+
+    Yields:
+        CSV text, a line at a time
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    writer.writeheader()
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def stream_lines(rows: Iterable[Dict[str, Any]], report_format: str, columns: List[str]) -> Iterator[str]:
+    """Serialize rows as NDJSON or CSV"""
+    if report_format == "csv":
+        return csv_lines(rows, columns)
+    return ndjson_lines(rows)
@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Every TTLCache by name, for the cache metrics endpoint
+CACHES: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """
+    Small thread-safe cache with per-entry expiry and hit/staleness metrics.
+
+    Entries expire ``ttl_seconds`` after they were loaded, which bounds how
+    stale a value can get if an invalidation event is lost. Invalidations
+    can carry the time the underlying row changed, so the cache can report
+    how long it took for changes to reach it.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_size: int = 10000):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # key -> (value, loaded at (monotonic))
+        self._entries: Dict[Hashable, Any] = {}
+        # Bumped by every invalidation, so loads that raced one are not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.last_invalidation_lag: Optional[float] = None
+        self.max_invalidation_lag: Optional[float] = None
+        CACHES[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, loader: Callable[[Hashable], Any],
+            cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Get a value, loading it on a miss or after it expired
+
+        The loader runs without the lock. If the cache is invalidated while
+        it runs, the value it returns may predate the change, so it is
+        returned but not cached.
+
+        Args:
+            key: Cache key
+            loader: Called with the key to load the value
+            cache_if: Only cache loaded values for which this returns True
+                (e.g. skip error results)
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() - entry[1] < self.ttl_seconds:
+                self.hits += 1
+                return entry[0]
+            self.expirations += 1
+
+        self.misses += 1
+        generation = self._generation
+        value = loader(key)
+        if cache_if is None or cache_if(value):
+            with self._lock:
+                if generation == self._generation:
+                    self._set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._set(key, value)
+
+    def _set(self, key: Hashable, value: Any) -> None:
+        """Store a value (lock must be held)"""
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        while len(self._entries) > self.max_size:
+            # Dicts keep insertion order, so the first entry is the oldest
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, key: Optional[Hashable] = None, changed_at: Optional[float] = None) -> None:
+        """
+        Drop one entry, or every entry
+
+        Args:
+            key: Key to drop (default: all keys)
+            changed_at: Unix time the underlying data changed, used for the
+                invalidation lag metrics
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._generation += 1
+            self.invalidations += 1
+
+            if changed_at is not None:
+                lag = max(0.0, time.time() - changed_at)
+                self.last_invalidation_lag = lag
+                self.max_invalidation_lag = max(lag, self.max_invalidation_lag or 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        requests = self.hits + self.misses
+        oldest = min((loaded_at for _, loaded_at in list(self._entries.values())), default=None)
+        return {
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else None,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            # Worst case staleness of anything currently cached
+            "oldest_entry_age_seconds": round(now - oldest, 3) if oldest is not None else None,
+            "last_invalidation_lag_seconds": self.last_invalidation_lag,
+            "max_invalidation_lag_seconds": self.max_invalidation_lag
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats of every TTLCache"""
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -1,10 +1,11 @@
 import asyncio
 import json
+import time
 import uuid
 import aio_pika
 from aio_pika import Message, connect_robust
 from aio_pika.abc import AbstractChannel, AbstractConnection
-from app.config import RABBITMQ_URL
+from app.config import RABBITMQ_URL, CACHE_EVENTS_EXCHANGE
 import os
 
 # Define retry parameters
@@ -81,4 +82,23 @@ async def publish_message_with_reply(queue_name: str, payload: dict, timeout: in
     try:
         return await asyncio.wait_for(future, timeout=timeout)
     except asyncio.TimeoutError:
-        raise TimeoutError("Request timed out")
\ No newline at end of file
+        raise TimeoutError("Request timed out")
+
+async def publish_cache_event(event: str, **data):
+    """
+    Broadcast a cache invalidation event (e.g. enrollment_changed) to the
+    services caching course data. Failures are logged, never raised, so a
+    broker hiccup cannot fail the write that triggered the event.
+    """
+    try:
+        if not channel:
+            raise RuntimeError("RabbitMQ channel not initialized")
+
+        exchange = await channel.declare_exchange(CACHE_EVENTS_EXCHANGE, aio_pika.ExchangeType.FANOUT, durable=True)
+        body = {"event": event, "origin": "course-enrollment", "timestamp": time.time(), **data}
+        await exchange.publish(
+            Message(body=json.dumps(body).encode(), content_type='application/json'),
+            routing_key=""
+        )
+    except Exception as e:
+        print(f"Failed to publish cache event {event}: {str(e)}")
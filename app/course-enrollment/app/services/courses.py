@@ -1,6 +1,7 @@
 from app.supabase.supabaseClient import supabase
 from app.services.lecturers import assign_course_to_lecturer
 from app.models.course_models import AddCourseRequestModel
+from app.rabbitmq.rabbitMQ_service import publish_cache_event
 
 async def get_enrolled_courses(data: dict):
     reg_number = data.get("reg_number")
@@ -263,6 +264,8 @@ async def add_new_course(data: dict):
         # if response.error:
         #     raise Exception(f"Error adding new course: {response.status_code} - {response.error}")
 
+        await publish_cache_event("course_updated", course_code=course_code)
+
         # Assign the course to the lecturer
         for lecturer_reg_number in lecturer_reg_numbers:
             print(f"Assigning course {course_code} to lecturer {lecturer_reg_number}")
@@ -1,5 +1,5 @@
 from app.supabase.supabaseClient import supabase
-from app.rabbitmq.rabbitMQ_service import publish_message_with_reply
+from app.rabbitmq.rabbitMQ_service import publish_message_with_reply, publish_cache_event
 from app.config import COURSES_NOTIFICATIONS_QUEUE
 
 async def enroll(data: dict):
@@ -32,6 +32,8 @@ async def enroll(data: dict):
         # if response.error:
         #     raise Exception(f"Error enrolling in course: {response.status_code} - {response.error}")
 
+        await publish_cache_event("enrollment_changed", course_code=course_id, reg_number=reg_number)
+
         # getting sender_id from faculty_member_profiles
 
         sender_id = (
@@ -105,6 +107,8 @@ async def unenroll(data: dict):
         # if response.error:
         #     raise Exception(f"Error unenrolling from course: {response.status_code} - {response.error}")
 
+        await publish_cache_event("enrollment_changed", course_code=course_id, reg_number=reg_number)
+
         return {"message": "Successfully unenrolled from the course."}
 
     except Exception as e:
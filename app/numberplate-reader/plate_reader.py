@@ -6,11 +6,18 @@ from datetime import datetime
 import numpy as np
 import requests
 import json
+import os
 
 # Initialize models
 vehicle_model = YOLO('yolov8n.pt')
 plate_reader = easyocr.Reader(['en'], gpu=True)  # Enable GPU if available
 
+# Images run through the vehicle model together; the per-call overhead of
+# YOLO dominates on CPU, so batching several images is much faster
+PLATE_BATCH_SIZE = int(os.getenv('PLATE_BATCH_SIZE', '8'))
+# Headless: no boxes are drawn on frames and no windows are opened
+HEADLESS = os.getenv('HEADLESS', 'false').lower() == 'true'
+
 # Sri Lankan plate pattern (with all common variations)
 SRI_LANKAN_PATTERN = re.compile(
     r'^([A-Z]{2,3}\s?-?\s?\d{4}|'      # ABC-1234 or ABC 1234
@@ -58,13 +65,21 @@ def send_plate_number(plate_number):
         print(f"Error sending plate number: {e}")
         return False
 
+def detect_plates_batch(frames):
+    """Detect vehicles in several frames with one model call, then read each frame's plates"""
+    print(f"Starting vehicle detection on {len(frames)} frame(s)...")
+    results = vehicle_model(list(frames), verbose=False)
+    for frame, result in zip(frames, results):
+        read_plates(frame, result)
+    return frames
+
 def detect_plates(frame):
-    print("Starting vehicle detection...")
-    results = vehicle_model(frame)
-    plates = []
-    
-    print(f"Found {len(results[0].boxes)} potential objects")
-    for box in results[0].boxes:
+    return detect_plates_batch([frame])[0]
+
+def read_plates(frame, result):
+    """Read the plates of the vehicles in one frame's detection result"""
+    print(f"Found {len(result.boxes)} potential objects")
+    for box in result.boxes:
         class_name = vehicle_model.names[int(box.cls)]
         print(f"Detected object: {class_name}")
         if class_name in ['car', 'truck', 'bus']:
@@ -170,9 +185,10 @@ def detect_plates(frame):
                     send_plate_number(std_plate)
                     
                     # Draw on frame
-                    cv2.rectangle(frame, (x1,y1), (x2,y2), (0,255,0), 2)
-                    cv2.putText(frame, f"{std_plate} ({confidence:.2f})", (x1, y1-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,255), 2)
+                    if not HEADLESS:
+                        cv2.rectangle(frame, (x1,y1), (x2,y2), (0,255,0), 2)
+                        cv2.putText(frame, f"{std_plate} ({confidence:.2f})", (x1, y1-10), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,255), 2)
                 else:
                     print(f"Invalid plate format: {raw_text}")
             else:
@@ -182,25 +198,35 @@ def detect_plates(frame):
 
 def process_image(image_path):
     """Process a single image and return the frame with detected plates"""
-    frame = cv2.imread(image_path)
-    if frame is None:
-        print(f"Error: Could not read image from {image_path}")
-        return None
-    
-    frame = detect_plates(frame)
-    return frame
+    return process_images([image_path])[0]
+
+def process_images(image_paths, batch_size=PLATE_BATCH_SIZE):
+    """Process images in batches of batch_size; unreadable images give None"""
+    frames = []
+    for image_path in image_paths:
+        frame = cv2.imread(image_path)
+        if frame is None:
+            print(f"Error: Could not read image from {image_path}")
+        frames.append(frame)
+
+    readable = [frame for frame in frames if frame is not None]
+    for start in range(0, len(readable), batch_size):
+        detect_plates_batch(readable[start:start + batch_size])
+    return frames
 
 if __name__ == "__main__":
     import sys
     
-    if len(sys.argv) != 2:
-        print("Usage: python plate_reader.py <image_path>")
+    if len(sys.argv) < 2:
+        print("Usage: python plate_reader.py <image_path> [<image_path> ...]")
         sys.exit(1)
     
-    image_path = sys.argv[1]
-    frame = process_image(image_path)
+    frames = process_images(sys.argv[1:])
+    if HEADLESS:
+        sys.exit(0)
     
-    if frame is not None:
-        cv2.imshow('Sri Lankan Plate Recognition', frame)
-        cv2.waitKey(0)
-        cv2.destroyAllWindows()
\ No newline at end of file
+    for image_path, frame in zip(sys.argv[1:], frames):
+        if frame is not None:
+            cv2.imshow(f'Sri Lankan Plate Recognition - {image_path}', frame)
+            cv2.waitKey(0)
+    cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Measure engine throughput for several inference batch sizes
+
+Synthetic cameras push random frames as fast as the engine takes them, and
+the real YOLO model (YOLO_MODEL_PATH) runs on them, so the numbers reflect
+this machine. Example:
+
+    python benchmark.py --cameras 4 --batch-sizes 1,4,8 --seconds 20
+"""
+import argparse
+import threading
+import time
+from typing import List
+import numpy as np
+from camera import Frame, FrameRingBuffer
+from config import YOLO_MODEL_PATH, INFERENCE_MAX_WAIT_MS
+from detector import Detection, Detector
+from engine import SurveillanceEngine
+
+
+class NullDetector(Detector):
+    """Asks for detections and ignores them"""
+
+    name = "null"
+
+    def process(self, frame: Frame, detections: List[Detection]) -> None:
+        pass
+
+
+class SyntheticReader(threading.Thread):
+    """Stands in for CameraReader, pushing random frames at up to `fps`"""
+
+    def __init__(self, camera: str, buffer: FrameRingBuffer, width: int, height: int, fps: float):
+        super().__init__(name=f"synthetic-{camera}", daemon=True)
+        self.camera = camera
+        self.buffer = buffer
+        self.interval = 1 / fps if fps > 0 else 0.0
+        self.frames_read = 0
+        self.frames_idle = 0
+        self._image = np.random.default_rng(len(camera)).integers(0, 255, (height, width, 3), dtype=np.uint8)
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.frames_read += 1
+            self.buffer.push(Frame(self.camera, self.frames_read, time.time(), self._image))
+            self._stop_event.wait(self.interval or 0.001)
+
+
+def run(cameras: int, batch_size: int, seconds: float, width: int, height: int, fps: float,
+        model_path: str, max_wait_ms: float) -> dict:
+    sources = {f"cam{i}": i for i in range(cameras)}
+    engine = SurveillanceEngine(sources, [NullDetector()], model_path=model_path,
+                                batch_size=batch_size, max_wait_ms=max_wait_ms, motion_gate=False)
+    engine.readers = [SyntheticReader(camera, engine.buffers[camera], width, height, fps) for camera in sources]
+
+    thread = threading.Thread(target=engine.run, daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    engine.stop()
+    thread.join()
+    return engine.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--batch-sizes", default="1,4,8", help="Comma-separated batch sizes to compare")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Run time per batch size")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=float, default=30.0, help="Frames per second per camera (0 = unlimited)")
+    parser.add_argument("--model", default=YOLO_MODEL_PATH)
+    parser.add_argument("--max-wait-ms", type=float, default=INFERENCE_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    for batch_size in (int(value) for value in args.batch_sizes.split(",") if value.strip()):
+        stats = run(args.cameras, batch_size, args.seconds, args.width, args.height, args.fps,
+                    args.model, args.max_wait_ms)
+        print(f"batch size {batch_size}: {stats['fps']} fps, average batch {stats['average_batch_size']}, "
+              f"dropped {sum(stats['frames_dropped'].values())} frames")
+
+
+if __name__ == "__main__":
+    main()
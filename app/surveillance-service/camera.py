@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+import cv2
+import numpy as np
+from config import CAMERA_RECONNECT_DELAY
+
+
+class Frame(NamedTuple):
+    """A frame read from a camera"""
+    camera: str
+    index: int
+    timestamp: float
+    image: np.ndarray
+    # Set by the camera's motion gate: idle frames skip YOLO, and region is
+    # the (x1, y1, x2, y2) part of the image to run it on (None = all of it)
+    idle: bool = False
+    region: Optional[Tuple[int, int, int, int]] = None
+
+
+def parse_camera_sources(value: str) -> Dict[str, Union[int, str]]:
+    """
+    Parse CAMERA_SOURCES
+
+    Args:
+        value: "name=source" pairs separated by ";". Numeric sources are
+            device indexes, anything else is passed to cv2.VideoCapture as is.
+
+    Returns:
+        Dictionary of camera name to source, in configuration order
+    """
+    sources = {}
+    for entry in value.split(";"):
+        if not entry.strip():
+            continue
+        name, separator, source = entry.partition("=")
+        if not separator or "://" in name:
+            # A bare source is named after itself
+            name, source = entry, entry
+        name, source = name.strip(), source.strip()
+        sources[name] = int(source) if source.isdigit() else source
+    return sources
+
+
+def parse_camera_names(value: str) -> Optional[List[str]]:
+    """Parse a ";"-separated camera list (None when empty, meaning all cameras)"""
+    names = [name.strip() for name in value.split(";") if name.strip()]
+    return names or None
+
+
+class FrameRingBuffer:
+    """
+    Bounded buffer of the latest frames of one camera
+
+    The reader thread never blocks: when the buffer is full the oldest frame
+    is dropped, and the consumer may drop stale frames too (see take), so
+    the newest frame wins. Buffers may share a condition so one consumer can
+    wait for a frame from any camera.
+    """
+
+    def __init__(self, capacity: int, condition: Optional[threading.Condition] = None):
+        self._frames = deque(maxlen=max(1, capacity))
+        self.condition = condition or threading.Condition()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def push(self, frame: Frame) -> None:
+        with self.condition:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self.condition.notify_all()
+
+    def peek(self) -> List[Frame]:
+        """The buffered frames, oldest first, without taking them"""
+        with self.condition:
+            return list(self._frames)
+
+    def take(self, counted: Optional[Callable[[Frame], bool]] = None, keep: int = 0) -> List[Frame]:
+        """
+        Take every buffered frame, oldest first
+
+        Args:
+            counted: Optional filter for the frames that compete for batch
+                slots. Only the newest `keep` of those are returned; the
+                older ones are stale and dropped. Other frames are always
+                returned.
+            keep: Counted frames to return
+        """
+        with self.condition:
+            frames = list(self._frames)
+            self._frames.clear()
+            if counted is None:
+                return frames
+            stale = sum(1 for frame in frames if counted(frame)) - keep
+            taken = []
+            for frame in frames:
+                if stale > 0 and counted(frame):
+                    stale -= 1
+                    self.dropped += 1
+                    continue
+                taken.append(frame)
+            return taken
+
+
+class CameraReader(threading.Thread):
+    """
+    Reads one camera source into a FrameRingBuffer
+
+    Devices and streams are reopened after CAMERA_RECONNECT_DELAY when they
+    fail. Video files are played at their own frame rate and looped, so they
+    can stand in for a camera when testing locally. An optional motion gate
+    (see motion_gate.MotionGate) runs here, on the reader thread, so idle
+    cameras never cost inference time.
+    """
+
+    def __init__(self, camera: str, source: Union[int, str], buffer: FrameRingBuffer,
+                 reconnect_delay: float = CAMERA_RECONNECT_DELAY, gate: Optional[Any] = None):
+        super().__init__(name=f"camera-{camera}", daemon=True)
+        self.camera = camera
+        self.source = source
+        self.buffer = buffer
+        self.reconnect_delay = reconnect_delay
+        self.gate = gate
+        self.frames_read = 0
+        self.frames_idle = 0
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+
+        while not self._stop_event.is_set():
+            capture = cv2.VideoCapture(self.source)
+            if not capture.isOpened():
+                print(f"[WARN] Camera {self.camera}: could not open {self.source}, "
+                      f"retrying in {self.reconnect_delay}s")
+                self._stop_event.wait(self.reconnect_delay)
+                continue
+
+            print(f"[INFO] Camera {self.camera}: reading from {self.source}")
+            try:
+                read = self._read(capture, is_file)
+            finally:
+                capture.release()
+
+            if self._stop_event.is_set():
+                break
+            # Loop files straight away; wait before reopening a lost stream
+            if not (is_file and read):
+                print(f"[WARN] Camera {self.camera}: stream ended, reconnecting in {self.reconnect_delay}s")
+                self._stop_event.wait(self.reconnect_delay)
+
+    def _read(self, capture: cv2.VideoCapture, is_file: bool) -> int:
+        """Read frames until the capture fails, returning how many were read"""
+        frame_interval = 0.0
+        if is_file:
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            frame_interval = 1 / fps if fps > 0 else 1 / 25
+
+        read = 0
+        next_frame = time.monotonic()
+        while not self._stop_event.is_set():
+            ok, image = capture.read()
+            if not ok:
+                break
+            read += 1
+            self.frames_read += 1
+            timestamp = time.time()
+            idle, region = self._gate(image, timestamp)
+            self.buffer.push(Frame(self.camera, self.frames_read, timestamp, image, idle, region))
+
+            if frame_interval:
+                next_frame += frame_interval
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    next_frame = time.monotonic()
+        return read
+
+    def _gate(self, image: np.ndarray, timestamp: float) -> Tuple[bool, Optional[Tuple[int, int, int, int]]]:
+        if self.gate is None:
+            return False, None
+        try:
+            idle, region = self.gate.inspect(image, timestamp)
+        except Exception as e:
+            print(f"Error in motion gate for camera {self.camera}: {e}")
+            return False, None
+        if idle:
+            self.frames_idle += 1
+        return idle, region
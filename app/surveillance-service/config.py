@@ -0,0 +1,66 @@
+import os
+
+# Cameras as "name=source" pairs separated by ";". A source is a device
+# index ("0"), an RTSP/HTTP URL or a video file (looped, for local testing).
+# The camera name is used as the alert location.
+CAMERA_SOURCES = os.getenv("CAMERA_SOURCES", "Gate A=0")
+
+# Frames kept per camera; older frames are dropped when inference falls behind
+FRAME_BUFFER_SIZE = int(os.getenv("FRAME_BUFFER_SIZE", "2"))
+CAMERA_RECONNECT_DELAY = float(os.getenv("CAMERA_RECONNECT_DELAY", "5"))
+
+# Shared YOLO model used for every camera
+YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "yolov8n.pt")
+YOLO_CONFIDENCE = float(os.getenv("YOLO_CONFIDENCE", "0.25"))
+
+# Micro-batching: frames from all cameras are run through YOLO together, up
+# to INFERENCE_BATCH_SIZE frames, waiting at most INFERENCE_MAX_WAIT_MS after
+# the first frame of a batch arrives for the batch to fill
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "20"))
+
+# Motion gate in front of YOLO: each camera's reader compares its frames,
+# downscaled to GATE_WIDTH, with a running-average background inside the
+# camera's regions of interest. YOLO only runs on frames with motion (and
+# for GATE_HOLD_SECONDS after it), on a crop around the moving area. A full
+# ROI pass still runs every GATE_KEYFRAME_INTERVAL seconds.
+MOTION_GATE = os.getenv("MOTION_GATE", "true").lower() == "true"
+# Regions of interest as "camera=x1,y1,x2,y2|x1,y1,x2,y2" entries separated by
+# ";", in frame pixels. Cameras without ROIs watch the whole frame.
+CAMERA_ROIS = os.getenv("CAMERA_ROIS", "")
+GATE_WIDTH = int(os.getenv("GATE_WIDTH", "320"))
+GATE_MIN_AREA = int(os.getenv("GATE_MIN_AREA", "900"))  # frame pixels
+GATE_LEARNING_RATE = float(os.getenv("GATE_LEARNING_RATE", "0.05"))
+GATE_HOLD_SECONDS = float(os.getenv("GATE_HOLD_SECONDS", "2"))
+GATE_KEYFRAME_INTERVAL = float(os.getenv("GATE_KEYFRAME_INTERVAL", "30"))
+GATE_PADDING = int(os.getenv("GATE_PADDING", "32"))
+GATE_MIN_CROP = int(os.getenv("GATE_MIN_CROP", "224"))
+
+# Cameras each detector watches, as ";"-separated camera names (empty = all)
+PERSON_CAMERAS = os.getenv("PERSON_CAMERAS", "")
+MOTION_CAMERAS = os.getenv("MOTION_CAMERAS", "")
+VEHICLE_CAMERAS = os.getenv("VEHICLE_CAMERAS", "")
+
+# Person alerts
+PERSON_ALERT_COOLDOWN = float(os.getenv("PERSON_ALERT_COOLDOWN", "15"))
+
+# Motion alerts, only between MOTION_START_HOUR and MOTION_END_HOUR (inclusive)
+MOTION_START_HOUR = int(os.getenv("MOTION_START_HOUR", "1"))
+MOTION_END_HOUR = int(os.getenv("MOTION_END_HOUR", "5"))
+MOTION_MIN_AREA = int(os.getenv("MOTION_MIN_AREA", "900"))
+MOTION_ALERT_COOLDOWN = float(os.getenv("MOTION_ALERT_COOLDOWN", "15"))
+
+# Vehicle alerts; a crop of each alerted vehicle is saved to VEHICLE_IMAGE_DIR
+VEHICLE_ALERT_COOLDOWN = float(os.getenv("VEHICLE_ALERT_COOLDOWN", "15"))
+VEHICLE_IMAGE_DIR = os.getenv("VEHICLE_IMAGE_DIR", "vehicle_images")
+
+# Annotated previews, produced off the detection thread at most once every
+# PREVIEW_INTERVAL seconds per camera. PREVIEW_OUTPUTS is a ","-separated
+# list of "mjpeg" (HTTP stream on PREVIEW_PORT), "files" (latest JPEG per
+# camera in PREVIEW_DIR) and "window" (local cv2 windows, needs a display).
+# Empty runs headless: frames are never annotated or rendered.
+PREVIEW_OUTPUTS = os.getenv("PREVIEW_OUTPUTS", "")
+PREVIEW_INTERVAL = float(os.getenv("PREVIEW_INTERVAL", "1"))
+PREVIEW_DIR = os.getenv("PREVIEW_DIR", "previews")
+PREVIEW_PORT = int(os.getenv("PREVIEW_PORT", "8000"))
+PREVIEW_JPEG_QUALITY = int(os.getenv("PREVIEW_JPEG_QUALITY", "80"))
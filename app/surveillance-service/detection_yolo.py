@@ -1,51 +1,32 @@
-from ultralytics import YOLO
-import cv2
-import time
+from typing import Iterable, List, Optional
+from camera import Frame
+from config import PERSON_ALERT_COOLDOWN
+from detector import Detection, Detector
 from publisher import publish_alert
 
-def run_yolo_detection():
-    model = YOLO("yolov8n.pt")
-    cap = cv2.VideoCapture(0)
 
-    last_alert_time = 0
-    cooldown = 15  
+class PersonDetector(Detector):
+    """Alerts when the shared YOLO model sees a person"""
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    name = "person"
 
-        results = model(frame)
-        boxes = results[0].boxes
+    def __init__(self, cameras: Optional[Iterable[str]] = None, cooldown: float = PERSON_ALERT_COOLDOWN):
+        super().__init__(cameras)
+        self.cooldown = cooldown
 
-        person_detected = False
-        for box in boxes:
-            cls_id = int(box.cls[0])
-            label = model.names[cls_id]
-            if label == "person":
-                person_detected = True
-                confidence = float(box.conf[0])
-                break  # Only care about the first person detected
+    def process(self, frame: Frame, detections: List[Detection]) -> None:
+        people = [detection for detection in detections if detection.label == "person"]
+        if not people:
+            return
 
-        current_time = time.time()
-        if person_detected:
-            if current_time - last_alert_time > cooldown:
-                publish_alert({
-                    "type": "suspicious_activity",
-                    "label": "person",
-                    "confidence": confidence,
-                    "location": "Gate A",
-                })
-                print("🔔 Alert sent for suspicious activity (person).")
-                last_alert_time = current_time
-            else:
-                print("⏳ Person detected but alert suppressed (cooldown).")
-
-        annotated = results[0].plot()
-        cv2.imshow("YOLOv8 Detection", annotated)
-
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
+        if self.ready_to_alert(frame.camera, self.cooldown):
+            person = max(people, key=lambda detection: detection.confidence)
+            publish_alert({
+                "type": "suspicious_activity",
+                "label": "person",
+                "confidence": person.confidence,
+                "location": frame.camera,
+            })
+            print(f"🔔 Alert sent for suspicious activity (person) at {frame.camera}.")
+        else:
+            print(f"⏳ Person detected at {frame.camera} but alert suppressed (cooldown).")
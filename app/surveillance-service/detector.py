@@ -0,0 +1,43 @@
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from camera import Frame
+
+
+class Detection(NamedTuple):
+    """An object found by the shared YOLO model"""
+    label: str
+    confidence: float
+    box: Tuple[int, int, int, int]  # x1, y1, x2, y2 in frame pixels
+
+
+class Detector(ABC):
+    """
+    Base class of the detectors the engine fans frames out to
+
+    process() runs on the inference thread for every frame of a watched
+    camera, so it should only do cheap work and publish alerts.
+    """
+
+    name = "detector"
+    # Cameras whose detectors all set this to False skip YOLO inference
+    needs_detections = True
+
+    def __init__(self, cameras: Optional[Iterable[str]] = None):
+        self.cameras = set(cameras) if cameras else None
+        self._last_alert: Dict[str, float] = {}
+
+    def watches(self, camera: str) -> bool:
+        return self.cameras is None or camera in self.cameras
+
+    def ready_to_alert(self, camera: str, cooldown: float) -> bool:
+        """Whether the camera is out of its alert cooldown (and start a new one if so)"""
+        now = time.time()
+        if now - self._last_alert.get(camera, 0) <= cooldown:
+            return False
+        self._last_alert[camera] = now
+        return True
+
+    @abstractmethod
+    def process(self, frame: Frame, detections: List[Detection]) -> None:
+        """Handle one frame and the YOLO detections found in it"""
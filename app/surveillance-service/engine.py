@@ -0,0 +1,243 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+import numpy as np
+from ultralytics import YOLO
+from camera import Frame, FrameRingBuffer, CameraReader
+from config import (FRAME_BUFFER_SIZE, YOLO_MODEL_PATH, YOLO_CONFIDENCE,
+                    INFERENCE_BATCH_SIZE, INFERENCE_MAX_WAIT_MS, MOTION_GATE)
+from detector import Detection, Detector
+from motion_gate import MotionGate
+from preview import PreviewPublisher
+
+
+def to_detections(result: Any, offset: Tuple[int, int] = (0, 0)) -> List[Detection]:
+    """
+    Convert an ultralytics result into plain Detection tuples
+
+    Args:
+        result: Result for one image
+        offset: (x, y) of the image within the frame when YOLO ran on a
+            crop, so boxes come out in frame coordinates
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+    xyxy = boxes.xyxy.cpu().numpy().astype(int) + np.array([offset[0], offset[1], offset[0], offset[1]])
+    confidences = boxes.conf.cpu().numpy()
+    classes = boxes.cls.cpu().numpy().astype(int)
+    return [
+        Detection(result.names[class_id], float(confidence), tuple(int(v) for v in box))
+        for box, confidence, class_id in zip(xyxy, confidences, classes)
+    ]
+
+
+class SurveillanceEngine:
+    """
+    Capture and inference engine for all cameras
+
+    Each camera has a reader thread filling its own small ring buffer. The
+    engine loop micro-batches frames across cameras (see _next_batch), runs
+    the frames that need detections through one shared YOLO model as a
+    single batch, and fans each frame and its detections out to every
+    detector watching that camera. Per-call overhead is paid once per batch,
+    so throughput grows with the batch size rather than dropping with the
+    number of cameras. When inference is slower than the cameras, stale
+    frames are dropped by the ring buffers instead of queueing up.
+
+    With the motion gate on, each reader thread marks frames without motion
+    in the camera's ROIs as idle and the rest with the region that moved.
+    Idle frames never take a batch slot or reach YOLO, and gated frames are
+    cropped to their region before inference.
+
+    Without a preview the engine is fully headless: nothing is annotated or
+    rendered. With one, frames are only offered to it; annotation happens
+    on the preview thread.
+    """
+
+    def __init__(self, sources: Dict[str, Union[int, str]], detectors: List[Detector],
+                 model_path: str = YOLO_MODEL_PATH, buffer_size: int = FRAME_BUFFER_SIZE,
+                 preview: Optional[PreviewPublisher] = None, batch_size: int = INFERENCE_BATCH_SIZE,
+                 max_wait_ms: float = INFERENCE_MAX_WAIT_MS, motion_gate: bool = MOTION_GATE,
+                 rois: Optional[Dict[str, List[Tuple[int, int, int, int]]]] = None):
+        self.model = YOLO(model_path)
+        self.detectors = detectors
+        self.preview = preview
+        if preview:
+            preview.on_quit = self.stop
+            preview.camera_names = set(sources)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000
+
+        # Shared by all buffers so the loop can wait for any camera
+        self._frames_ready = threading.Condition()
+        self.buffers = {camera: FrameRingBuffer(buffer_size, self._frames_ready) for camera in sources}
+        # Only cameras that go through YOLO need a gate
+        detection_cameras = self._detection_cameras()
+        rois = rois or {}
+        self.readers = [
+            CameraReader(camera, source, self.buffers[camera],
+                         gate=MotionGate(rois.get(camera)) if motion_gate and camera in detection_cameras else None)
+            for camera, source in sources.items()
+        ]
+        self._running = False
+        # Camera the next batch starts from, so small batches rotate fairly
+        self._next_camera = 0
+
+        self.frames_processed = 0
+        self.frames_inferred = 0
+        self.batches = 0
+        self.started_at: Optional[float] = None
+
+    def _detection_cameras(self) -> set:
+        return {camera for camera in self.buffers
+                if any(detector.needs_detections and detector.watches(camera) for detector in self.detectors)}
+
+    def _take_frames(self, buffers: List[FrameRingBuffer], detection_cameras: set,
+                     slots: int, batch: List[Frame]) -> int:
+        """
+        Move frames from the buffers into the batch, using at most `slots` inference slots
+
+        Slots are handed out round-robin, one per camera per pass, so every
+        camera gets its newest frame in before any camera gets a second one.
+        A camera's older frames only get slots left over by a full pass, and
+        the ones that get none are dropped as stale. Cameras left without a
+        slot keep their frames for the next batch.
+
+        Returns:
+            The number of slots used
+        """
+        def counted(frame: Frame) -> bool:
+            return frame.camera in detection_cameras and not frame.idle
+
+        waiting = [sum(1 for frame in buffer.peek() if counted(frame)) for buffer in buffers]
+        allotted = [0] * len(buffers)
+        used = 0
+        while used < slots and any(a < w for a, w in zip(allotted, waiting)):
+            for offset in range(len(buffers)):
+                position = (self._next_camera + offset) % len(buffers)
+                if allotted[position] < waiting[position]:
+                    allotted[position] += 1
+                    used += 1
+                    if used == slots:
+                        # The next batch starts after the last camera served
+                        self._next_camera = (position + 1) % len(buffers)
+                        break
+
+        for buffer, wanted, keep in zip(buffers, waiting, allotted):
+            if wanted and not keep:
+                continue
+            batch.extend(buffer.take(counted, keep))
+        return used
+
+    def _next_batch(self, detection_cameras: set, idle_timeout: float = 0.5) -> List[Frame]:
+        """
+        Collect the next micro-batch of frames
+
+        Frames are taken until batch_size of them need inference or max_wait
+        has passed since the first frame of the batch was taken, with slots
+        shared round-robin across cameras (see _take_frames). Idle frames and
+        frames of cameras without YOLO detectors ride along without counting
+        towards the batch size.
+
+        Args:
+            detection_cameras: Cameras whose frames go through YOLO
+            idle_timeout: How long to wait for a first frame before returning
+
+        Returns:
+            The frames, possibly several per camera, in order per camera
+        """
+        buffers = list(self.buffers.values())
+        batch = []
+        inference = 0
+        deadline = None
+        with self._frames_ready:
+            while self._running:
+                inference += self._take_frames(buffers, detection_cameras, self.batch_size - inference, batch)
+                if inference >= self.batch_size:
+                    break
+
+                now = time.monotonic()
+                if batch and deadline is None:
+                    deadline = now + self.max_wait
+                if deadline is None:
+                    self._frames_ready.wait(idle_timeout)
+                    if not any(len(buffer) for buffer in buffers):
+                        break
+                elif now >= deadline:
+                    break
+                else:
+                    self._frames_ready.wait(deadline - now)
+        return batch
+
+    def _process(self, frames: List[Frame], detection_cameras: set) -> None:
+        inference_frames = [frame for frame in frames if frame.camera in detection_cameras and not frame.idle]
+        results = {}
+        if inference_frames:
+            images = [frame.image if frame.region is None
+                      else frame.image[frame.region[1]:frame.region[3], frame.region[0]:frame.region[2]]
+                      for frame in inference_frames]
+            batch = self.model(images, conf=YOLO_CONFIDENCE, verbose=False)
+            results = {(frame.camera, frame.index): result for frame, result in zip(inference_frames, batch)}
+            self.frames_inferred += len(inference_frames)
+            self.batches += 1
+
+        for frame in frames:
+            result = results.get((frame.camera, frame.index))
+            detections = []
+            if result is not None:
+                detections = to_detections(result, frame.region[:2] if frame.region else (0, 0))
+            for detector in self.detectors:
+                if not detector.watches(frame.camera):
+                    continue
+                try:
+                    detector.process(frame, detections)
+                except Exception as e:
+                    print(f"Error in {detector.name} detector for {frame.camera}: {e}")
+
+            if self.preview:
+                self.preview.offer(frame, detections)
+        self.frames_processed += len(frames)
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        return {
+            "frames_processed": self.frames_processed,
+            "frames_inferred": self.frames_inferred,
+            "frames_idle": sum(reader.frames_idle for reader in self.readers),
+            "batches": self.batches,
+            "average_batch_size": round(self.frames_inferred / self.batches, 2) if self.batches else 0.0,
+            "fps": round(self.frames_processed / elapsed, 2) if elapsed else 0.0,
+            "frames_dropped": {camera: buffer.dropped for camera, buffer in self.buffers.items()},
+        }
+
+    def run(self) -> None:
+        """Start the camera readers and process frames until stop() (or q in a preview window)"""
+        for reader in self.readers:
+            reader.start()
+        if self.preview:
+            self.preview.start()
+        self._running = True
+        self.started_at = time.monotonic()
+        detection_cameras = self._detection_cameras()
+        print(f"[INFO] Engine running on {len(self.readers)} camera(s), "
+              f"{len(detection_cameras)} with YOLO inference, batches of up to {self.batch_size} "
+              f"frames within {self.max_wait * 1000:.0f} ms")
+
+        try:
+            while self._running:
+                frames = self._next_batch(detection_cameras)
+                if frames:
+                    self._process(frames, detection_cameras)
+        finally:
+            self._running = False
+            for reader in self.readers:
+                reader.stop()
+            if self.preview:
+                self.preview.stop()
+            print(f"[INFO] Engine stopped: {self.stats()}")
+
+    def stop(self) -> None:
+        self._running = False
+        with self._frames_ready:
+            self._frames_ready.notify_all()
@@ -1,37 +1,89 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 import cv2
+import numpy as np
+from camera import Frame
+from config import MOTION_START_HOUR, MOTION_END_HOUR, MOTION_MIN_AREA, MOTION_ALERT_COOLDOWN
+from detector import Detection, Detector
 from publisher import publish_alert
 
-def detect_motion():
-    cap = cv2.VideoCapture(0)
-    _, frame1 = cap.read()
-    _, frame2 = cap.read()
-
-    while cap.isOpened():
-        diff = cv2.absdiff(frame1, frame2)
-        gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5,5), 0)
-        _, thresh = cv2.threshold(blur, 20, 255, cv2.THRESH_BINARY)
-        dilated = cv2.dilate(thresh, None, iterations=3)
-        contours, _ = cv2.findContours(dilated, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-
-        for contour in contours:
-            if cv2.contourArea(contour) < 900:
-                continue
-            print("[ALERT] Motion Detected!")
-            publish_alert({
-                "type": "motion_after_hours",
-                "location": "Zone B",
-                "timestamp": "auto",  # You can use datetime.now().isoformat() instead
-            })
 
-        frame1 = frame2
-        ret, frame2 = cap.read()
-        if not ret:
-            break
+def find_motion(previous: np.ndarray, current: np.ndarray, min_area: float,
+                mask: Optional[np.ndarray] = None) -> List[Tuple[int, int, int, int]]:
+    """
+    Regions that changed between two blurred grayscale frames
+
+    Args:
+        previous: Earlier frame (or background) as blurred uint8 grayscale
+        current: Current frame, same shape
+        min_area: Smallest changed contour area to report, in pixels
+        mask: Optional uint8 mask; changes outside it (0) are ignored
+
+    Returns:
+        (x1, y1, x2, y2) boxes of the changed regions
+    """
+    diff = cv2.absdiff(previous, current)
+    _, thresh = cv2.threshold(diff, 20, 255, cv2.THRESH_BINARY)
+    if mask is not None:
+        thresh = cv2.bitwise_and(thresh, mask)
+    dilated = cv2.dilate(thresh, None, iterations=3)
+    contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        if cv2.contourArea(contour) < min_area:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        boxes.append((x, y, x + w, y + h))
+    return boxes
+
+
+class MotionDetector(Detector):
+    """
+    Alerts on motion after hours by differencing consecutive frames
+
+    Works on the frames alone, so cameras only watched by this detector
+    never go through YOLO.
+    """
 
-        cv2.imshow("Motion Detection", frame2)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+    name = "motion"
+    needs_detections = False
 
-    cap.release()
-    cv2.destroyAllWindows()
+    def __init__(self, cameras: Optional[Iterable[str]] = None,
+                 start_hour: int = MOTION_START_HOUR, end_hour: int = MOTION_END_HOUR,
+                 min_area: int = MOTION_MIN_AREA, cooldown: float = MOTION_ALERT_COOLDOWN):
+        super().__init__(cameras)
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.min_area = min_area
+        self.cooldown = cooldown
+        # Blurred grayscale of the previous frame of each camera
+        self._previous: Dict[str, np.ndarray] = {}
+
+    def is_active(self, now: datetime) -> bool:
+        """Whether now is within the after-hours window (which may wrap midnight)"""
+        if self.start_hour <= self.end_hour:
+            return self.start_hour <= now.hour <= self.end_hour
+        return now.hour >= self.start_hour or now.hour <= self.end_hour
+
+    def process(self, frame: Frame, detections: List[Detection]) -> None:
+        now = datetime.now()
+        if not self.is_active(now):
+            self._previous.pop(frame.camera, None)
+            return
+
+        gray = cv2.GaussianBlur(cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous = self._previous.get(frame.camera)
+        self._previous[frame.camera] = gray
+        if previous is None or previous.shape != gray.shape:
+            return
+
+        if not find_motion(previous, gray, self.min_area):
+            return
+
+        if self.ready_to_alert(frame.camera, self.cooldown):
+            print(f"[ALERT] Motion Detected at {frame.camera}!")
+            publish_alert({
+                "type": "motion_after_hours",
+                "location": frame.camera,
+                "timestamp": now.isoformat(),
+            })
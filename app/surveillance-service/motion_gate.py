@@ -0,0 +1,168 @@
+import math
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from config import (GATE_WIDTH, GATE_MIN_AREA, GATE_LEARNING_RATE, GATE_HOLD_SECONDS,
+                    GATE_KEYFRAME_INTERVAL, GATE_PADDING, GATE_MIN_CROP)
+from motion_detection import find_motion
+
+Box = Tuple[int, int, int, int]
+
+# Crops covering more than this share of the watched area run on the whole area
+FULL_AREA_RATIO = 0.6
+
+
+def parse_camera_rois(value: str) -> Dict[str, List[Box]]:
+    """
+    Parse CAMERA_ROIS
+
+    Args:
+        value: "camera=x1,y1,x2,y2|x1,y1,x2,y2" entries separated by ";"
+
+    Returns:
+        Dictionary of camera name to list of (x1, y1, x2, y2) boxes
+    """
+    rois = {}
+    for entry in value.split(";"):
+        camera, separator, boxes = entry.partition("=")
+        if not separator or not camera.strip():
+            continue
+        parsed = []
+        for box in boxes.split("|"):
+            try:
+                x1, y1, x2, y2 = (int(v) for v in box.split(","))
+            except ValueError:
+                print(f"[WARN] Ignoring invalid ROI {box!r} for camera {camera.strip()}")
+                continue
+            if x2 > x1 and y2 > y1:
+                parsed.append((x1, y1, x2, y2))
+        if parsed:
+            rois[camera.strip()] = parsed
+    return rois
+
+
+class MotionGate:
+    """
+    Cheap motion check that decides whether a frame needs YOLO, and where
+
+    One gate per camera, run on the camera's reader thread. Each frame is
+    downscaled to `width`, blurred and compared with a running-average
+    background (cv2.accumulateWeighted) inside the ROIs, using the same
+    differencing as the motion detector. Frames without motion are idle
+    and skip YOLO. Frames with motion get a region: the padded bounding box
+    of the moving areas, clipped to the ROIs, for YOLO to run on instead
+    of the whole frame.
+
+    After motion stops, the last region keeps being inspected for `hold`
+    seconds so objects that stop moving are still seen. A full pass over
+    the ROIs runs every `keyframe_interval` seconds so slow changes that
+    blend into the background are not missed forever.
+    """
+
+    def __init__(self, rois: Optional[List[Box]] = None, width: int = GATE_WIDTH,
+                 min_area: int = GATE_MIN_AREA, learning_rate: float = GATE_LEARNING_RATE,
+                 hold: float = GATE_HOLD_SECONDS, keyframe_interval: float = GATE_KEYFRAME_INTERVAL,
+                 padding: int = GATE_PADDING, min_crop: int = GATE_MIN_CROP):
+        self.rois = list(rois or [])
+        self.width = width
+        self.min_area = min_area
+        self.learning_rate = learning_rate
+        self.hold = hold
+        self.keyframe_interval = keyframe_interval
+        self.padding = padding
+        self.min_crop = min_crop
+
+        self._background: Optional[np.ndarray] = None
+        self._mask: Optional[np.ndarray] = None
+        self._scale = 1.0
+        self._frame_size: Optional[Tuple[int, int]] = None
+        self._bounds: Optional[Box] = None
+        self._last_motion = -math.inf
+        self._last_region: Optional[Box] = None
+        self._last_keyframe = -math.inf
+
+    def _reset(self, image: np.ndarray, gray: np.ndarray) -> None:
+        """Start over for a new stream or resolution"""
+        height, width = image.shape[:2]
+        self._background = gray.astype(np.float32)
+        self._frame_size = (width, height)
+        self._bounds = (0, 0, width, height)
+        self._mask = None
+        if self.rois:
+            boxes = [(max(0, x1), max(0, y1), min(width, x2), min(height, y2)) for x1, y1, x2, y2 in self.rois]
+            boxes = [box for box in boxes if box[2] > box[0] and box[3] > box[1]]
+            if boxes:
+                self._bounds = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                                max(b[2] for b in boxes), max(b[3] for b in boxes))
+                self._mask = np.zeros(gray.shape, dtype=np.uint8)
+                for x1, y1, x2, y2 in boxes:
+                    self._mask[int(y1 * self._scale):math.ceil(y2 * self._scale),
+                               int(x1 * self._scale):math.ceil(x2 * self._scale)] = 255
+        self._last_region = None
+
+    def _watched_region(self) -> Optional[Box]:
+        """Region covering all ROIs (None for the whole frame)"""
+        return self._bounds if self.rois else None
+
+    def _crop_region(self, boxes: List[Box]) -> Optional[Box]:
+        """Padded full-resolution region around the moving boxes, within the ROIs"""
+        bx1, by1, bx2, by2 = self._bounds
+        x1 = min(b[0] for b in boxes) / self._scale - self.padding
+        y1 = min(b[1] for b in boxes) / self._scale - self.padding
+        x2 = max(b[2] for b in boxes) / self._scale + self.padding
+        y2 = max(b[3] for b in boxes) / self._scale + self.padding
+
+        # Grow small regions so YOLO gets some context
+        if x2 - x1 < self.min_crop:
+            grow = (self.min_crop - (x2 - x1)) / 2
+            x1, x2 = x1 - grow, x2 + grow
+        if y2 - y1 < self.min_crop:
+            grow = (self.min_crop - (y2 - y1)) / 2
+            y1, y2 = y1 - grow, y2 + grow
+
+        region = (max(bx1, int(x1)), max(by1, int(y1)), min(bx2, math.ceil(x2)), min(by2, math.ceil(y2)))
+        area = (region[2] - region[0]) * (region[3] - region[1])
+        if area >= FULL_AREA_RATIO * (bx2 - bx1) * (by2 - by1):
+            return self._watched_region()
+        return region
+
+    def inspect(self, image: np.ndarray, now: float) -> Tuple[bool, Optional[Box]]:
+        """
+        Gate one frame
+
+        Args:
+            image: BGR frame
+            now: Frame time in seconds
+
+        Returns:
+            (idle, region): idle is True when YOLO can skip the frame;
+            otherwise region is the (x1, y1, x2, y2) part of the frame to
+            run YOLO on, or None for the whole frame
+        """
+        height, width = image.shape[:2]
+        scale = min(1.0, self.width / width)
+        small = image
+        if scale < 1.0:
+            small = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self._background is None or self._frame_size != (width, height):
+            self._scale = scale
+            self._reset(image, gray)
+            self._last_keyframe = now
+            return False, self._watched_region()
+
+        boxes = find_motion(cv2.convertScaleAbs(self._background), gray,
+                            self.min_area * scale * scale, self._mask)
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+
+        if boxes:
+            self._last_motion = now
+            self._last_region = self._crop_region(boxes)
+            return False, self._last_region
+        if now - self._last_motion <= self.hold:
+            return False, self._last_region
+        if now - self._last_keyframe >= self.keyframe_interval:
+            self._last_keyframe = now
+            return False, self._watched_region()
+        return True, None
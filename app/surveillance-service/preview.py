@@ -0,0 +1,216 @@
+import html
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+import cv2
+import numpy as np
+from camera import Frame
+from config import PREVIEW_INTERVAL, PREVIEW_DIR, PREVIEW_PORT, PREVIEW_JPEG_QUALITY
+from detector import Detection
+
+PREVIEW_SINKS = {"mjpeg", "files", "window"}
+
+
+def parse_preview_outputs(value: str) -> List[str]:
+    """Parse PREVIEW_OUTPUTS, ignoring unknown outputs"""
+    sinks = []
+    for sink in (part.strip().lower() for part in value.split(",")):
+        if not sink:
+            continue
+        if sink not in PREVIEW_SINKS:
+            print(f"[WARN] Unknown preview output {sink!r}, expected one of {sorted(PREVIEW_SINKS)}")
+            continue
+        sinks.append(sink)
+    return sinks
+
+
+def annotate(image: np.ndarray, detections: List[Detection]) -> np.ndarray:
+    """Copy of the image with the detections drawn on it"""
+    annotated = image.copy()
+    for detection in detections:
+        x1, y1, x2, y2 = detection.box
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(annotated, f"{detection.label} {detection.confidence:.2f}", (x1, max(12, y1 - 6)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+    return annotated
+
+
+class PreviewPublisher(threading.Thread):
+    """
+    Rate-limited annotated previews, produced off the detection thread
+
+    The engine offers every processed frame; offer() only keeps the frame
+    when the camera's preview is at least `interval` seconds old, so the
+    detection thread never annotates, encodes or renders. This thread
+    annotates the kept frames, encodes them to JPEG once, and hands them to
+    the configured outputs:
+
+    - "mjpeg": multipart MJPEG stream per camera at http://<host>:<port>/<camera>
+    - "files": latest preview of each camera written to <directory>/<camera>.jpg
+      (rewritten atomically, so readers never see a partial image)
+    - "window": local cv2 windows (needs a display)
+    """
+
+    def __init__(self, sinks: List[str], interval: float = PREVIEW_INTERVAL,
+                 directory: str = PREVIEW_DIR, port: int = PREVIEW_PORT,
+                 on_quit: Optional[Callable[[], None]] = None):
+        super().__init__(name="preview", daemon=True)
+        self.sinks = set(sinks)
+        self.interval = interval
+        self.directory = directory
+        self.port = port
+        self.on_quit = on_quit
+        # Configured camera names, set by the engine (None = any camera with a preview)
+        self.camera_names: Optional[Set[str]] = None
+
+        self._condition = threading.Condition()
+        self._pending: Dict[str, Tuple[Frame, List[Detection]]] = {}
+        self._last_offer: Dict[str, float] = {}
+        # Latest encoded preview of each camera, with a generation counter
+        # so MJPEG clients can wait for the next one
+        self._jpegs: Dict[str, Tuple[int, bytes]] = {}
+        self._running = False
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def offer(self, frame: Frame, detections: List[Detection]) -> None:
+        """Queue a frame for preview if its camera is due one (cheap, never blocks on encoding)"""
+        if frame.timestamp - self._last_offer.get(frame.camera, 0) < self.interval:
+            return
+        self._last_offer[frame.camera] = frame.timestamp
+        with self._condition:
+            self._pending[frame.camera] = (frame, detections)
+            self._condition.notify_all()
+
+    def latest_jpeg(self, camera: str, after: int = 0, timeout: float = 5.0) -> Optional[Tuple[int, bytes]]:
+        """Wait for a preview of the camera newer than generation `after`"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._running:
+                latest = self._jpegs.get(camera)
+                if latest and latest[0] > after:
+                    return latest
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+        return None
+
+    def cameras(self) -> List[str]:
+        with self._condition:
+            return list(self._jpegs)
+
+    def has_camera(self, camera: str) -> bool:
+        """Whether a preview of the camera can be streamed"""
+        if self.camera_names is not None:
+            return camera in self.camera_names
+        return camera in self.cameras()
+
+    def run(self) -> None:
+        self._running = True
+        if "mjpeg" in self.sinks:
+            self._start_server()
+        # Windows only repaint inside waitKey, so poll them often
+        poll = 0.05 if "window" in self.sinks else 1.0
+
+        try:
+            while self._running:
+                with self._condition:
+                    if not self._pending:
+                        self._condition.wait(poll)
+                    pending, self._pending = self._pending, {}
+                for frame, detections in pending.values():
+                    try:
+                        self._publish(frame, annotate(frame.image, detections))
+                    except Exception as e:
+                        print(f"Error publishing preview for {frame.camera}: {e}")
+
+                if "window" in self.sinks and cv2.waitKey(1) & 0xFF == ord("q") and self.on_quit:
+                    self.on_quit()
+        finally:
+            if self._server:
+                self._server.shutdown()
+                self._server.server_close()
+            if "window" in self.sinks:
+                cv2.destroyAllWindows()
+
+    def stop(self) -> None:
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+
+    def _publish(self, frame: Frame, annotated: np.ndarray) -> None:
+        if "window" in self.sinks:
+            cv2.imshow(f"Surveillance - {frame.camera}", annotated)
+        if not self.sinks & {"mjpeg", "files"}:
+            return
+
+        ok, encoded = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY])
+        if not ok:
+            print(f"Error encoding preview for {frame.camera}")
+            return
+        jpeg = encoded.tobytes()
+
+        if "mjpeg" in self.sinks:
+            with self._condition:
+                generation = self._jpegs.get(frame.camera, (0, b""))[0] + 1
+                self._jpegs[frame.camera] = (generation, jpeg)
+                self._condition.notify_all()
+        if "files" in self.sinks:
+            os.makedirs(self.directory, exist_ok=True)
+            name = re.sub(r"[^\w.-]+", "_", frame.camera)
+            path = os.path.join(self.directory, f"{name}.jpg")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(jpeg)
+            os.replace(tmp_path, path)
+
+    def _start_server(self) -> None:
+        preview = self
+
+        class MJPEGHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                camera = unquote(self.path.strip("/"))
+                if not camera:
+                    links = "".join(f'<p>{html.escape(name)}<br><img src="/{quote(name)}"></p>'
+                                    for name in preview.cameras())
+                    body = f"<html><body>{links or 'No previews yet'}</body></html>".encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if not preview.has_camera(camera):
+                    self.send_error(404, "Unknown camera")
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.end_headers()
+                generation = 0
+                try:
+                    while preview._running:
+                        latest = preview.latest_jpeg(camera, generation)
+                        if latest is None:
+                            continue
+                        generation, jpeg = latest
+                        self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n"
+                                         + f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer(("0.0.0.0", self.port), MJPEGHandler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="preview-http", daemon=True).start()
+            print(f"[INFO] MJPEG preview on http://0.0.0.0:{self.port}/<camera>")
+        except OSError as e:
+            print(f"Error starting MJPEG preview server on port {self.port}: {e}")
+            self._server = None
@@ -1,68 +1,253 @@
 import pika
 import json
 import os
-import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
 
 # Define the RabbitMQ host using an environment variable, defaulting to 'rabbitmq'
 RABBITMQ_HOST = os.getenv('RABBITMQ_HOST', 'rabbitmq')
-RETRY_ATTEMPTS = 10
-RETRY_DELAY = 5
+ALERT_QUEUE = 'surveillance.alerts'
 
-def get_connection():
-    """Helper function to establish RabbitMQ connection with retries."""
-    for attempt in range(RETRY_ATTEMPTS):
+# Alerts waiting to be published; when full the oldest alert is dropped
+ALERT_OUTBOX_SIZE = int(os.getenv('ALERT_OUTBOX_SIZE', '1000'))
+# The outbox is flushed every ALERT_FLUSH_INTERVAL seconds, at most
+# ALERT_FLUSH_BATCH_SIZE alerts at a time
+ALERT_FLUSH_INTERVAL = float(os.getenv('ALERT_FLUSH_INTERVAL', '0.1'))
+ALERT_FLUSH_BATCH_SIZE = int(os.getenv('ALERT_FLUSH_BATCH_SIZE', '100'))
+# Reconnect backoff, doubling from RETRY_DELAY up to RETRY_MAX_DELAY
+RETRY_DELAY = 1
+RETRY_MAX_DELAY = 30
+
+def get_connection_parameters():
+    """Connection parameters for Docker networking"""
+    credentials = pika.PlainCredentials('guest', 'guest')
+    return pika.ConnectionParameters(
+        host=RABBITMQ_HOST,
+        port=5672,
+        virtual_host='/',
+        credentials=credentials,
+        heartbeat=600,  # 10 minutes
+        blocked_connection_timeout=300,
+        socket_timeout=5
+    )
+
+class AlertPublisher(threading.Thread):
+    """
+    Long-lived RabbitMQ publisher for surveillance alerts
+
+    publish() only appends the alert to a bounded in-memory outbox, so
+    detectors never wait on the broker. This thread owns one connection
+    (pika's asynchronous SelectConnection on its own I/O loop) and every
+    ALERT_FLUSH_INTERVAL publishes the outbox in batches with publisher
+    confirms enabled. Alerts stay tracked until the broker confirms them;
+    nacked alerts and alerts unconfirmed when the connection drops go back
+    to the front of the outbox. Lost connections are re-established in the
+    background with exponential backoff.
+    """
+
+    def __init__(self, queue: str = ALERT_QUEUE, outbox_size: int = ALERT_OUTBOX_SIZE,
+                 flush_interval: float = ALERT_FLUSH_INTERVAL, batch_size: int = ALERT_FLUSH_BATCH_SIZE):
+        super().__init__(name='alert-publisher', daemon=True)
+        self.queue = queue
+        self.outbox_size = max(1, outbox_size)
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+
+        self._lock = threading.Lock()
+        self._outbox = deque()
+        # Published but not yet confirmed, by delivery tag (JSON bodies)
+        self._unconfirmed: Dict[int, str] = OrderedDict()
+        self._delivery_tag = 0
+        self._connection = None
+        self._channel = None
+        self._connected = False
+        self._stopping = False
+        self._stop_event = threading.Event()
+
+        self.confirmed = 0
+        self.nacked = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    def publish(self, message: dict) -> bool:
+        """
+        Queue an alert for publishing (never blocks on the broker)
+
+        The alert is serialized here, so an alert that is not JSON
+        serializable is rejected at once instead of failing a later flush.
+
+        Returns:
+            True if the alert was queued
+        """
         try:
-            print(f"Attempt {attempt + 1}/{RETRY_ATTEMPTS}: Connecting to RabbitMQ at {RABBITMQ_HOST}")
-            
-            # Configure connection parameters for Docker networking
-            credentials = pika.PlainCredentials('guest', 'guest')
-            parameters = pika.ConnectionParameters(
-                host=RABBITMQ_HOST,
-                port=5672,
-                virtual_host='/',
-                credentials=credentials,
-                heartbeat=600,  # 10 minutes
-                blocked_connection_timeout=300,
-                connection_attempts=3,
-                retry_delay=5,
-                socket_timeout=5
+            body = json.dumps(message)
+        except (TypeError, ValueError) as e:
+            print(f"Error serializing surveillance alert: {str(e)}")
+            return False
+        with self._lock:
+            if len(self._outbox) >= self.outbox_size:
+                self._outbox.popleft()
+                self.dropped += 1
+            self._outbox.append(body)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'outbox': len(self._outbox),
+                'unconfirmed': len(self._unconfirmed),
+                'confirmed': self.confirmed,
+                'nacked': self.nacked,
+                'dropped': self.dropped,
+                'reconnects': self.reconnects,
+            }
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush what can be flushed within timeout, then close the connection"""
+        self._stopping = True
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        remaining = self.stats()
+        if remaining['outbox'] or remaining['unconfirmed']:
+            print(f"Alert publisher stopped with {remaining['outbox'] + remaining['unconfirmed']} "
+                  f"alert(s) not confirmed")
+
+    def run(self) -> None:
+        delay = RETRY_DELAY
+        while not self._stopping:
+            self._connected = False
+            self._connection = pika.SelectConnection(
+                get_connection_parameters(),
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_open_error,
+                on_close_callback=self._on_connection_closed
             )
-            
-            connection = pika.BlockingConnection(parameters)
-            channel = connection.channel()
-            
-            # Set QoS prefetch count
-            channel.basic_qos(prefetch_count=1)
-            
-            print("Successfully connected to RabbitMQ.")
-            return connection, channel
-        except pika.exceptions.AMQPConnectionError as e:
-            print(f"Attempt {attempt + 1}/{RETRY_ATTEMPTS}: Failed to connect to RabbitMQ at {RABBITMQ_HOST}: {str(e)}")
-            if attempt < RETRY_ATTEMPTS - 1:
-                print(f"Retrying in {RETRY_DELAY} seconds...")
-                time.sleep(RETRY_DELAY)
+            self._connection.ioloop.start()
+
+            if self._stopping:
+                break
+            if self._connected:
+                delay = RETRY_DELAY
+            print(f"Alert publisher disconnected from RabbitMQ at {RABBITMQ_HOST}, retrying in {delay}s")
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, RETRY_MAX_DELAY)
+            self.reconnects += 1
+
+    def _on_connection_open(self, connection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_open_error(self, connection, error) -> None:
+        print(f"Alert publisher could not connect to RabbitMQ at {RABBITMQ_HOST}: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason) -> None:
+        self._channel = None
+        self._requeue_unconfirmed()
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel) -> None:
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.queue_declare(queue=self.queue, durable=True, callback=self._on_queue_declared)
+
+    def _on_channel_closed(self, channel, reason) -> None:
+        print(f"Alert publisher channel closed: {reason}")
+        self._channel = None
+        if self._connection.is_open:
+            self._connection.close()
+
+    def _on_queue_declared(self, frame) -> None:
+        self._delivery_tag = 0
+        self._channel.confirm_delivery(self._on_delivery_confirmation)
+        self._connected = True
+        print(f"Alert publisher connected to RabbitMQ at {RABBITMQ_HOST}")
+        self._flush()
+
+    def _on_delivery_confirmation(self, frame) -> None:
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        with self._lock:
+            if method.multiple:
+                tags = [tag for tag in self._unconfirmed if tag <= method.delivery_tag]
+            else:
+                tags = [method.delivery_tag] if method.delivery_tag in self._unconfirmed else []
+            messages = [self._unconfirmed.pop(tag) for tag in tags]
+            if acked:
+                self.confirmed += len(messages)
             else:
-                print("Max retry attempts reached. Could not establish initial connection to RabbitMQ.")
-                raise
+                self.nacked += len(messages)
+                self._requeue(messages)
+
+    def _requeue(self, messages: List[str]) -> None:
+        """Put messages back at the front of the outbox (caller holds the lock)"""
+        self._outbox.extendleft(reversed(messages))
+        while len(self._outbox) > self.outbox_size:
+            self._outbox.popleft()
+            self.dropped += 1
+
+    def _requeue_unconfirmed(self) -> None:
+        with self._lock:
+            messages = list(self._unconfirmed.values())
+            self._unconfirmed.clear()
+            self._requeue(messages)
+
+    def _take_batch(self) -> List[str]:
+        with self._lock:
+            return [self._outbox.popleft() for _ in range(min(self.batch_size, len(self._outbox)))]
+
+    def _flush(self) -> None:
+        """Publish a batch from the outbox and schedule the next flush (runs on the I/O loop)"""
+        channel = self._channel
+        if channel is None or not channel.is_open:
+            return
+
+        batch = self._take_batch()
+        failed = False
+        for index, body in enumerate(batch):
+            try:
+                channel.basic_publish(
+                    exchange='',
+                    routing_key=self.queue,
+                    body=body,
+                    properties=pika.BasicProperties(
+                        delivery_mode=2,  # make message persistent
+                        content_type='application/json'
+                    )
+                )
+            except Exception as e:
+                print(f"Error publishing surveillance alert: {str(e)}")
+                with self._lock:
+                    self._requeue(batch[index:])
+                failed = True
+                break
+            self._delivery_tag += 1
+            with self._lock:
+                self._unconfirmed[self._delivery_tag] = body
+
+        with self._lock:
+            idle = not self._outbox and not self._unconfirmed
+            more = bool(self._outbox)
+        if self._stopping and idle:
+            self._connection.close()
+            return
+        # After a failure, retry at the normal interval rather than straight away
+        self._connection.ioloop.call_later(0 if more and not failed else self.flush_interval, self._flush)
+
+alert_publisher: Optional[AlertPublisher] = None
+_alert_publisher_lock = threading.Lock()
+
+def get_alert_publisher() -> AlertPublisher:
+    """The process-wide alert publisher, started on first use"""
+    global alert_publisher
+    with _alert_publisher_lock:
+        if alert_publisher is None:
+            alert_publisher = AlertPublisher()
+            alert_publisher.start()
+        return alert_publisher
 
 def publish_alert(message: dict):
-    try:
-        connection, channel = get_connection()
-        if not connection:
-            raise Exception("Failed to establish RabbitMQ connection")
-
-        channel.queue_declare(queue='surveillance.alerts', durable=True)
-        
-        channel.basic_publish(
-            exchange='',
-            routing_key='surveillance.alerts',
-            body=json.dumps(message),
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # make message persistent
-                content_type='application/json'
-            )
-        )
-        print("[INFO] Alert published:", message)
-    except Exception as e:
-        print(f"Error publishing surveillance alert: {str(e)}")
-        raise
\ No newline at end of file
+    """Queue a surveillance alert; it is published in the background"""
+    if get_alert_publisher().publish(message):
+        print("[INFO] Alert queued:", message)
@@ -1,30 +1,44 @@
-import threading
-from datetime import datetime
-from detection_yolo import run_yolo_detection
-from motion_detection import detect_motion
-from vehicle_detection import run_vehicle_detection
+from camera import parse_camera_sources, parse_camera_names
+from config import (CAMERA_SOURCES, CAMERA_ROIS, PERSON_CAMERAS, MOTION_CAMERAS, VEHICLE_CAMERAS,
+                    PREVIEW_OUTPUTS)
+from detection_yolo import PersonDetector
+from engine import SurveillanceEngine
+from motion_detection import MotionDetector
+from motion_gate import parse_camera_rois
+from preview import PreviewPublisher, parse_preview_outputs
+from publisher import get_alert_publisher
+from vehicle_detection import VehicleDetector
 
 def main():
     print("[INFO] Starting Surveillance Service...")
 
-    # Run YOLO detection for vehicle/person detection
-    yolo_thread = threading.Thread(target=run_yolo_detection)
-    yolo_thread.start()
+    sources = parse_camera_sources(CAMERA_SOURCES)
+    if not sources:
+        print("[ERROR] No cameras configured (CAMERA_SOURCES is empty)")
+        return
 
-    # Run vehicle detection for main entrance
-    vehicle_thread = threading.Thread(target=run_vehicle_detection)
-    vehicle_thread.start()
+    # One engine reads every camera and shares a single YOLO model between
+    # the person and vehicle detectors; motion detection (after hours only)
+    # works on the same frames
+    detectors = [
+        PersonDetector(parse_camera_names(PERSON_CAMERAS)),
+        VehicleDetector(parse_camera_names(VEHICLE_CAMERAS)),
+        MotionDetector(parse_camera_names(MOTION_CAMERAS)),
+    ]
+    preview_outputs = parse_preview_outputs(PREVIEW_OUTPUTS)
+    preview = PreviewPublisher(preview_outputs) if preview_outputs else None
+    if not preview:
+        print("[INFO] Running headless (no PREVIEW_OUTPUTS configured)")
+    engine = SurveillanceEngine(sources, detectors, preview=preview, rois=parse_camera_rois(CAMERA_ROIS))
 
-    # Check if it's after hours (1 AM - 5 AM)
-    current_hour = datetime.now().hour
-    if current_hour >= 1 or current_hour <= 5:  # Between 1 AM and 5 AM
-        print("[INFO] Motion detection activated (after hours)...")
-        motion_thread = threading.Thread(target=detect_motion)
-        motion_thread.start()
-
-    # Wait for the YOLO thread to finish
-    yolo_thread.join()
-    vehicle_thread.join()
+    # Connect to RabbitMQ in the background before the first alert
+    alert_publisher = get_alert_publisher()
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        engine.stop()
+    finally:
+        alert_publisher.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,73 @@
+import threading
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("pika")
+pytest.importorskip("ultralytics")
+from camera import Frame, FrameRingBuffer
+from engine import SurveillanceEngine
+
+IMAGE = np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+def make_engine(cameras, batch_size, buffer_size=4):
+    """Engine with the batching state only, so no model or camera is opened"""
+    engine = SurveillanceEngine.__new__(SurveillanceEngine)
+    engine._frames_ready = threading.Condition()
+    engine.buffers = {camera: FrameRingBuffer(buffer_size, engine._frames_ready) for camera in cameras}
+    engine.batch_size = batch_size
+    engine.max_wait = 0.0
+    engine._running = True
+    engine._next_camera = 0
+    return engine
+
+
+def push(engine, camera, indexes, idle=False):
+    for index in indexes:
+        engine.buffers[camera].push(Frame(camera, index, 0.0, IMAGE, idle))
+
+
+def taken(batch):
+    return [(frame.camera, frame.index) for frame in batch]
+
+
+def test_batch_takes_newest_frame_of_each_camera_first():
+    engine = make_engine(["a", "b", "c"], batch_size=2)
+    push(engine, "a", [1, 2, 3])
+    push(engine, "b", [1, 2])
+    push(engine, "c", [1])
+
+    assert taken(engine._next_batch({"a", "b", "c"})) == [("a", 3), ("b", 2)]
+    # Older frames of the served cameras are stale; c keeps its frame for the next batch
+    assert engine.buffers["a"].dropped == 2 and engine.buffers["b"].dropped == 1
+    assert taken(engine._next_batch({"a", "b", "c"})) == [("c", 1)]
+
+
+def test_spare_slots_take_older_frames_in_order():
+    engine = make_engine(["a", "b"], batch_size=8)
+    push(engine, "a", [1, 2, 3])
+    push(engine, "b", [1])
+
+    assert taken(engine._next_batch({"a", "b"})) == [("a", 1), ("a", 2), ("a", 3), ("b", 1)]
+
+
+def test_small_batches_rotate_across_cameras():
+    engine = make_engine(["a", "b", "c"], batch_size=1)
+    served = []
+    for _ in range(6):
+        for camera in "abc":
+            push(engine, camera, [len(served)])
+        served.extend(frame.camera for frame in engine._next_batch({"a", "b", "c"}))
+
+    assert served == ["a", "b", "c", "a", "b", "c"]
+
+
+def test_idle_and_undetected_frames_do_not_take_slots():
+    engine = make_engine(["a", "b"], batch_size=1)
+    push(engine, "a", [1, 2], idle=True)
+    push(engine, "a", [3])
+    push(engine, "b", [1, 2])
+
+    # b has no YOLO detectors, so all its frames ride along
+    assert taken(engine._next_batch({"a"})) == [("a", 1), ("a", 2), ("a", 3), ("b", 1), ("b", 2)]
@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("pika")  # motion_detection publishes alerts
+from motion_gate import FULL_AREA_RATIO, MotionGate, parse_camera_rois
+
+
+def test_parse_camera_rois():
+    rois = parse_camera_rois(" Gate A = 0,0,100,50|10,10,20,20 ; Hall=5,5,6,6")
+
+    assert rois == {"Gate A": [(0, 0, 100, 50), (10, 10, 20, 20)], "Hall": [(5, 5, 6, 6)]}
+
+
+@pytest.mark.parametrize("value", ["", ";", "Gate A", "=0,0,1,1", "Gate A=1,2,3", "Gate A=a,b,c,d",
+                                   "Gate A=10,10,5,20", "Gate A=0,0,0,10"])
+def test_parse_camera_rois_skips_invalid_entries(value):
+    assert parse_camera_rois(value) == {}
+
+
+def test_parse_camera_rois_keeps_valid_boxes_of_a_camera():
+    assert parse_camera_rois("Gate A=0,0,10,10|bad|20,20,10,10") == {"Gate A": [(0, 0, 10, 10)]}
+
+
+def make_gate(bounds=(0, 0, 1000, 800), scale=0.5, rois=None, padding=10, min_crop=100):
+    gate = MotionGate(rois=rois, padding=padding, min_crop=min_crop)
+    gate._bounds = bounds
+    gate._scale = scale
+    return gate
+
+
+def test_crop_region_maps_and_pads_boxes():
+    gate = make_gate()
+
+    # Boxes are in downscaled pixels; the region is in frame pixels
+    assert gate._crop_region([(50, 50, 150, 100), (120, 80, 200, 150)]) == (90, 90, 410, 310)
+
+
+def test_crop_region_grows_small_regions():
+    gate = make_gate(min_crop=100)
+
+    x1, y1, x2, y2 = gate._crop_region([(100, 100, 102, 101)])
+
+    assert x2 - x1 >= 100 and y2 - y1 >= 100
+    # Grown around the moving area
+    assert (x1 + x2) / 2 == pytest.approx(202, abs=1)
+    assert (y1 + y2) / 2 == pytest.approx(201, abs=1)
+
+
+@pytest.mark.parametrize("box, expected", [
+    ((0, 0, 20, 20), (0, 0, 50, 50)),
+    ((480, 380, 500, 400), (950, 750, 1000, 800)),
+])
+def test_crop_region_is_clipped_to_the_frame(box, expected):
+    gate = make_gate(min_crop=0)
+
+    assert gate._crop_region([box]) == expected
+
+
+def test_crop_region_is_clipped_to_the_rois():
+    gate = make_gate(bounds=(200, 100, 600, 500), rois=[(200, 100, 600, 500)], min_crop=0)
+
+    assert gate._crop_region([(90, 40, 120, 70)]) == (200, 100, 250, 150)
+
+
+def test_crop_region_covering_most_of_the_area_uses_the_whole_area():
+    gate = make_gate(min_crop=0, padding=0)
+    assert gate._crop_region([(0, 0, 500, 400)]) is None
+
+    gate = make_gate(bounds=(200, 100, 600, 500), rois=[(200, 100, 600, 500)], min_crop=0, padding=0)
+    side = int(400 * FULL_AREA_RATIO ** 0.5) + 2
+    assert gate._crop_region([(100, 50, 100 + side // 2, 50 + side // 2)]) == (200, 100, 600, 500)
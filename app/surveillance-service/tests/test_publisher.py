@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+import pytest
+
+pika = pytest.importorskip("pika")
+from publisher import AlertPublisher
+
+
+def confirmation(method, delivery_tag, multiple=False):
+    return SimpleNamespace(method=method(delivery_tag=delivery_tag, multiple=multiple))
+
+
+def make_publisher(unconfirmed, outbox=(), outbox_size=10):
+    publisher = AlertPublisher(outbox_size=outbox_size)
+    publisher._unconfirmed.update(unconfirmed)
+    publisher._outbox.extend(outbox)
+    return publisher
+
+
+def test_ack_confirms_one_alert():
+    publisher = make_publisher({1: "a", 2: "b"})
+
+    publisher._on_delivery_confirmation(confirmation(pika.spec.Basic.Ack, 2))
+
+    assert list(publisher._unconfirmed) == [1]
+    assert publisher.confirmed == 1
+
+
+def test_multiple_ack_confirms_up_to_the_tag():
+    publisher = make_publisher({1: "a", 2: "b", 3: "c"})
+
+    publisher._on_delivery_confirmation(confirmation(pika.spec.Basic.Ack, 2, multiple=True))
+
+    assert list(publisher._unconfirmed) == [3]
+    assert publisher.confirmed == 2
+
+
+def test_nack_requeues_alerts_at_the_front_in_order():
+    publisher = make_publisher({1: "a", 2: "b", 3: "c"}, outbox=["d"])
+
+    publisher._on_delivery_confirmation(confirmation(pika.spec.Basic.Nack, 2, multiple=True))
+
+    assert list(publisher._outbox) == ["a", "b", "d"]
+    assert list(publisher._unconfirmed) == [3]
+    assert publisher.nacked == 2 and publisher.confirmed == 0
+
+
+def test_unknown_delivery_tag_is_ignored():
+    publisher = make_publisher({1: "a"})
+
+    publisher._on_delivery_confirmation(confirmation(pika.spec.Basic.Ack, 5))
+
+    assert list(publisher._unconfirmed) == [1]
+    assert publisher.confirmed == 0
+
+
+def test_requeue_drops_oldest_alerts_when_the_outbox_is_full():
+    publisher = make_publisher({}, outbox=["c", "d"], outbox_size=3)
+
+    publisher._requeue(["a", "b"])
+
+    assert list(publisher._outbox) == ["b", "c", "d"]
+    assert publisher.dropped == 1
+
+
+def test_publish_rejects_alerts_that_are_not_json():
+    publisher = make_publisher({})
+
+    assert not publisher.publish({"when": object()})
+    assert publisher.publish({"location": "Gate A"})
+    assert list(publisher._outbox) == ['{"location": "Gate A"}']
@@ -0,0 +1,57 @@
+import os
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional
+import cv2
+from camera import Frame
+from config import VEHICLE_ALERT_COOLDOWN, VEHICLE_IMAGE_DIR
+from detector import Detection, Detector
+from publisher import publish_alert
+
+VEHICLE_LABELS = {"car", "truck", "bus", "motorcycle"}
+
+
+class VehicleDetector(Detector):
+    """Alerts when a vehicle enters a watched camera and saves a crop of it"""
+
+    name = "vehicle"
+
+    def __init__(self, cameras: Optional[Iterable[str]] = None,
+                 cooldown: float = VEHICLE_ALERT_COOLDOWN, image_dir: str = VEHICLE_IMAGE_DIR):
+        super().__init__(cameras)
+        self.cooldown = cooldown
+        self.image_dir = image_dir
+
+    def process(self, frame: Frame, detections: List[Detection]) -> None:
+        vehicles = [detection for detection in detections if detection.label in VEHICLE_LABELS]
+        if not vehicles or not self.ready_to_alert(frame.camera, self.cooldown):
+            return
+
+        vehicle = max(vehicles, key=lambda detection: detection.confidence)
+        publish_alert({
+            "type": "vehicle_detected",
+            "label": vehicle.label,
+            "confidence": vehicle.confidence,
+            "location": frame.camera,
+            "image": self._save_crop(frame, vehicle),
+        })
+        print(f"🚗 Vehicle ({vehicle.label}) detected at {frame.camera}.")
+
+    def _save_crop(self, frame: Frame, vehicle: Detection) -> Optional[str]:
+        """Save the vehicle crop for the plate reader, returning its path"""
+        x1, y1, x2, y2 = vehicle.box
+        crop = frame.image[max(0, y1):y2, max(0, x1):x2]
+        if crop.size == 0:
+            return None
+
+        stamp = datetime.fromtimestamp(frame.timestamp).strftime("%Y%m%d_%H%M%S")
+        camera = re.sub(r"\W+", "_", frame.camera).strip("_").lower()
+        path = os.path.join(self.image_dir, f"vehicle_{stamp}_{camera}.jpg")
+        try:
+            os.makedirs(self.image_dir, exist_ok=True)
+            if not cv2.imwrite(path, crop):
+                raise OSError("cv2.imwrite failed")
+            return path
+        except Exception as e:
+            print(f"Error saving vehicle image {path}: {e}")
+            return None